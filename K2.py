@@ -1,76 +1,85 @@
 import os
-import bcrypt
-import jdatetime
 import streamlit as st
 import pandas as pd
 import pathlib
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 import random
 import base64
 import streamlit.components.v1 as components
-import time
+import json
 import sqlite3
 import re
 import html
+from core.assets import font_face_css
+from core.cache import named_cache
+from core.db import bulk_insert, sqlite_pool
+from core.history import load_history, mark_stale
+from core.jalali import canonical_jalali, date_to_jalali, jalali_to_date
+from core.migrations import run_migrations
+from core.passwords import HasherBusy, password_hasher
+from core.styles import style_injector, style_registry
+from core.throttle import login_throttle
+from core.tokens import session_tokens
+from core.week_html import week_html_cache
+from core.weeks import week_index
 
 # --------------------------
 # مسیرهای پروژه
 # --------------------------
 DATA_DIR = pathlib.Path("data")
 DB_FILE = DATA_DIR / "k2.db"
-FONTS_DIR = pathlib.Path("fonts")
 IMAGES_DIR = pathlib.Path("images")
+STATIC_DIR = pathlib.Path("static")  # سرو با server.enableStaticServing در مسیر app/static
+FONTS_DIR = STATIC_DIR / "fonts"
 DATA_DIR.mkdir(exist_ok=True)
-FONTS_DIR.mkdir(exist_ok=True)
+FONTS_DIR.mkdir(parents=True, exist_ok=True)
 IMAGES_DIR.mkdir(exist_ok=True)
 
 
 # --------------------------
 # ایجاد جداول SQLite
 # --------------------------
+def get_connection():
+    """گرفتن اتصال از استخر مشترک SQLite (در پایان commit و به استخر برگردانده می‌شود)"""
+    return sqlite_pool(DB_FILE).connection()
+
+
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+    """ساخت/به‌روزرسانی طرح پایگاه داده با اجرای مهاجرت‌های باقی‌مانده (یک‌بار در هر پردازه)"""
+    run_migrations(sqlite_pool(DB_FILE))
 
-    # جدول کاربران
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            role TEXT DEFAULT 'user',
-            created_at TEXT NOT NULL
-        )
-    """
-    )
 
-    # جدول فعالیت‌ها
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS user_activities (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT NOT NULL,
-            week_start TEXT NOT NULL,
-            week_end TEXT NOT NULL,
-            name TEXT NOT NULL,
-            target INTEGER NOT NULL,
-            done INTEGER NOT NULL,
-            percent INTEGER NOT NULL,
-            note TEXT,
-            saved_at TEXT NOT NULL,
-            week_feedback TEXT,
-            week_total_score INTEGER NOT NULL,
-            progress_diff INTEGER DEFAULT 0 
-        )
-    """
-    )
+init_db()
 
-    conn.commit()
-    conn.close()
 
+# --------------------------
+# کش تاریخچه
+# --------------------------
+# مشترک بین همهٔ نشست‌ها؛ کلید نام کاربر است (None = نمای همهٔ کاربران برای ادمین).
+# هر مسیر نوشتن باید کلیدهای کاربر و None را با `mark_stale` علامت بزند.
+HISTORY_CACHE = named_cache("user_history", max_bytes=64 * 1024 * 1024, ttl=3600)
+HISTORY_REFRESH_SECONDS = 15  # فاصلهٔ گرفتن delta (فقط ردیف‌های جدید)
+HISTORY_RECONCILE_SECONDS = 600  # فاصلهٔ بارگذاری کامل برای دیدن حذف‌ها
+# SQLite نوشتن‌ها را پشت سر هم commit می‌کند، پس idها به ترتیب commit دیده می‌شوند
+HISTORY_ID_OVERLAP = 0
+# آمار خلاصهٔ تاریخچه (نوار آمار)؛ کلید نام کاربر یا None برای آمار کل
+STATS_CACHE = named_cache("history_stats", max_bytes=1024 * 1024, ttl=300)
+# HTML رسم‌شدهٔ هر هفته با کلید هش محتوا؛ مشترک بین نشست‌ها (ر.ک. core.week_html)
+WEEK_HTML = week_html_cache()
 
-init_db()
+
+# --------------------------
+# تقویم هفته‌ها
+# --------------------------
+# بازهٔ نمایهٔ هفته‌های شنبه تا جمعه، نسبت به سال شمسی جاری
+WEEK_CALENDAR_YEARS_BACK = 5
+WEEK_CALENDAR_YEARS_AHEAD = 1
+
+
+def calendar_weeks():
+    """نمایهٔ مشترک هفته‌ها حول سال شمسی جاری؛ بعد از نوروز نمایهٔ بازهٔ جدید ساخته می‌شود."""
+    year = int(date_to_jalali(date.today())[:4])
+    return week_index(year - WEEK_CALENDAR_YEARS_BACK, year + WEEK_CALENDAR_YEARS_AHEAD)
 
 
 # --------------------------
@@ -86,84 +95,257 @@ def sanitize_username(username: str) -> str:
 # --------------------------
 # هش ایمن رمز عبور
 # --------------------------
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+# کارهای bcrypt روی استخر thread محدود و مشترک اجرا می‌شوند (ر.ک. core.passwords)؛
+# هش‌هایی که ضریبشان با BCRYPT_ROUNDS فرق دارد در اولین ورود موفق دوباره ساخته می‌شوند.
+BCRYPT_ROUNDS = int(os.environ.get("K2_BCRYPT_ROUNDS", "12"))
+PASSWORD_HASHER = password_hasher(
+    rounds=BCRYPT_ROUNDS,
+    max_workers=int(os.environ.get("K2_BCRYPT_WORKERS", "0")) or None,
+    max_queue=int(os.environ.get("K2_BCRYPT_QUEUE", "32")),
+)
 
 
-def verify_password(password: str, stored_hash: str) -> bool:
-    return bcrypt.checkpw(password.encode("utf-8"), stored_hash.encode("utf-8"))
+def hash_password(password: str) -> str:
+    return PASSWORD_HASHER.hash(password)
 
 
 # --------------------------
 # توابع مدیریت کاربر
 # --------------------------
+# کش مشترک رکورد کاربران (فقط username، password_hash و role). نام‌های ناموجود هم با عمر
+# کوتاه‌تر کش می‌شوند تا تلاش‌های تکراری با نام اشتباه به پایگاه داده نرسند.
+# create_user، store_password_hash و change_password کلید کاربر را باطل می‌کنند.
+USER_CACHE = named_cache("users", max_bytes=4 * 1024 * 1024, ttl=300)
+USER_MISS_TTL = 30
+# فهرست نام کاربران برای فیلتر فید ادمین؛ create_user آن را باطل می‌کند.
+USERNAMES_CACHE = named_cache("usernames", max_bytes=256 * 1024, ttl=300)
+
+
 def get_user(username: str):
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT username, password_hash, role FROM users WHERE username = ?",
-        (username,),
-    )
-    row = cursor.fetchone()
-    conn.close()
-    return (
-        {"username": row[0], "password_hash": row[1], "role": row[2]} if row else None
-    )
+    """رکورد کاربر {"username", "password_hash", "role"} از کش مشترک؛ اگر کاربر نباشد None."""
+    def load():
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT username, password_hash, role FROM users WHERE username = ?",
+                (username,),
+            )
+            row = cursor.fetchone()
+        return (
+            {"username": row[0], "password_hash": row[1], "role": row[2]} if row else None
+        )
+
+    user = USER_CACHE.get_or_load(username, load, miss_ttl=USER_MISS_TTL)
+    return dict(user) if user else None
 
 
 def create_user(username: str, password: str, role: str = "user"):
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+    password_hash = hash_password(password)
     try:
-        cursor.execute(
-            """
-            INSERT INTO users (username, password_hash, role, created_at)
-            VALUES (?, ?, ?, ?)
-        """,
-            (
-                username,
-                hash_password(password),
-                role,
-                datetime.now(timezone.utc).isoformat(),
-            ),
-        )
-        conn.commit()
+        with get_connection() as conn:
+            conn.cursor().execute(
+                """
+                INSERT INTO users (username, password_hash, role, created_at)
+                VALUES (?, ?, ?, ?)
+            """,
+                (
+                    username,
+                    password_hash,
+                    role,
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
         return True
     except sqlite3.IntegrityError:
         return False  # نام کاربری تکراری
     finally:
-        conn.close()
+        USER_CACHE.invalidate(username)  # مدخل منفی احتمالی
+        USERNAMES_CACHE.invalidate(None)
+
+
+def store_password_hash(username: str, password_hash: str):
+    with get_connection() as conn:
+        conn.cursor().execute(
+            "UPDATE users SET password_hash = ? WHERE username = ?",
+            (password_hash, username),
+        )
+    USER_CACHE.invalidate(username)
 
 
 def change_password(username: str, new_password: str):
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE users SET password_hash = ? WHERE username = ?",
-        (hash_password(new_password), username),
-    )
-    conn.commit()
-    conn.close()
+    """تغییر رمز و بالا بردن نسل توکن کاربر تا توکن‌های «مرا به خاطر بسپار» قبلی باطل شوند."""
+    new_hash = hash_password(new_password)
+    with get_connection() as conn:
+        conn.cursor().execute(
+            "UPDATE users SET password_hash = ?, token_generation = token_generation + 1 WHERE username = ?",
+            (new_hash, username),
+        )
+    USER_CACHE.invalidate(username)
+    TOKEN_GENERATIONS.invalidate(username)
+
+
+def check_login_password(user: dict, password: str) -> bool:
+    """بررسی رمز ورود؛ اگر ضریب هش ذخیره‌شده با BCRYPT_ROUNDS فرق کند، هش تازه ذخیره می‌شود."""
+    ok, new_hash = PASSWORD_HASHER.verify_and_rehash(password, user["password_hash"])
+    if new_hash is not None:
+        store_password_hash(user["username"], new_hash)
+    return ok
+
+
+# --------------------------
+# نشست ماندگار («مرا به خاطر بسپار»)
+# --------------------------
+# بعد از refresh مرورگر، توکن امضاشدهٔ کوکی به‌جای get_user و bcrypt بررسی می‌شود (ر.ک. core.tokens)
+SESSION_COOKIE = "k2_session"
+REMEMBER_ME_DAYS = 30
+# نسل توکن هر کاربر؛ تغییر رمز کلید همین پردازه را باطل می‌کند و بقیهٔ پردازه‌ها بعد از ttl می‌بینند
+TOKEN_GENERATIONS = named_cache("token_generations", max_bytes=256 * 1024, ttl=60)
+
+
+def _token_secret():
+    """کلید HMAC از st.secrets["auth"]["token_secret"] یا K2_TOKEN_SECRET؛ در نبودِ هر دو None (کلید تصادفی پردازه)."""
+    try:
+        secret = st.secrets["auth"]["token_secret"]
+    except Exception:
+        secret = os.environ.get("K2_TOKEN_SECRET")
+    return secret.encode("utf-8") if secret else None
+
+
+SESSION_TOKENS = session_tokens(_token_secret(), ttl=REMEMBER_ME_DAYS * 24 * 3600)
+
+
+def token_generation(username: str):
+    """نسل فعلی توکن‌های کاربر (از کش مشترک)؛ اگر کاربر وجود نداشته باشد None."""
+    def load():
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT token_generation FROM users WHERE username = ?", (username,))
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    return TOKEN_GENERATIONS.get_or_load(username, load)
+
+
+def remember_login(username: str, role: str):
+    """صدور توکن نشست؛ کوکی با `sync_session_cookie` در مرورگر نوشته می‌شود."""
+    st.session_state.session_cookie = SESSION_TOKENS.issue(username, role, token_generation(username) or 0)
+    st.session_state.remembered = True
+
+
+def logout():
+    """خروج (callback دکمهٔ خروج): ابطال توکن کوکی و پاک کردن نشست و کوکی.
+
+    خروج فقط با رویداد ویجت همین نشست انجام می‌شود، نه با پارامتر URL، تا لینکی از
+    سایت دیگر نتواند کاربر را از حساب خارج کند.
+    """
+    SESSION_TOKENS.revoke(st.context.cookies.get(SESSION_COOKIE))
+    st.session_state.update(logged_in=False, remembered=False, session_cookie="")
+
+
+def sync_session_cookie():
+    """نوشتن یا پاک کردن کوکی نشست در مرورگر، اگر تغییری در session_state منتظر باشد."""
+    value = st.session_state.pop("session_cookie", None)
+    if value is None:
+        return
+    max_age = REMEMBER_ME_DAYS * 24 * 3600 if value else 0
+    cookie = f"{SESSION_COOKIE}={value}; Max-Age={max_age}; Path=/; SameSite=Strict"
+    components.html(f"<script>parent.document.cookie = {json.dumps(cookie)};</script>", height=0)
+
+
+# --------------------------
+# محدودسازی تلاش‌های ورود
+# --------------------------
+# (ظرفیت، توکن در ثانیه): هر نام کاربری ۵ تلاش و بعد یکی در دقیقه؛ هر کلاینت ۲۰ تلاش و بعد یکی در ۶ ثانیه؛
+# همهٔ کلاینت‌هایی که شناسه‌شان معلوم نیست با هم یک سطل ۶۰ تلاشی دارند که هر ۲ ثانیه یکی پر می‌شود
+# (فقط سقف نرخ؛ شکست‌ها روی آن ثبت نمی‌شوند).
+# بعد از ۵ رمز اشتباه پشت‌سرهم، قفل ۳۰ ثانیه‌ای که با هر شکست بعدی دو برابر می‌شود (حداکثر یک ساعت).
+LOGIN_THROTTLE = login_throttle(
+    {"user": (5, 1 / 60), "client": (20, 1 / 6), "anonymous": (60, 1 / 2)},
+    max_failures=5,
+    lockout=30,
+    max_lockout=3600,
+    max_keys=10_000,
+)
+
+
+# فقط وقتی برنامه پشت یک پروکسی معتمد است (Streamlit Cloud، Render) K2_TRUST_PROXY=1 شود؛
+# بدون پروکسی، X-Forwarded-For را خود کلاینت می‌فرستد و با عوض کردنش هر بار سطل تازه می‌گیرد.
+TRUST_PROXY = os.environ.get("K2_TRUST_PROXY", "").lower() in ("1", "true", "yes")
+
+
+def login_client_id():
+    """شناسهٔ کلاینت برای محدودسازی؛ اگر معلوم نباشد None.
+
+    با `TRUST_PROXY`، IP واقعی آخرین مقدار X-Forwarded-For است که خود پروکسی اضافه
+    کرده (مقدارهای قبلی را کلاینت می‌تواند جعل کند)؛ در غیر این صورت سرآیند نادیده
+    گرفته می‌شود و `st.context.ip_address` به کار می‌رود.
+    """
+    if TRUST_PROXY:
+        forwarded = st.context.headers.get("X-Forwarded-For")
+        if forwarded:
+            return forwarded.split(",")[-1].strip()
+    return st.context.ip_address
+
+
+def login_throttle_keys(username: str) -> tuple:
+    """(کلید نام کاربری، کلید کلاینت) یک تلاش ورود برای `LOGIN_THROTTLE`.
+
+    اگر شناسهٔ کلاینت معلوم نباشد، کلید مشترک ("anonymous", "*") برگردانده می‌شود تا
+    امتحان نام‌های زیاد یا یک رمز روی حساب‌های مختلف بدون سقف نماند.
+    """
+    client = login_client_id()
+    return ("user", username), ("client", client) if client else ("anonymous", "*")
+
+
+def login_failure(user_key, client_key):
+    """ثبت رمز اشتباه برای کلیدهای `login_throttle_keys`.
+
+    کلید مشترک ("anonymous", "*") (مثلاً همهٔ کاربران روی localhost) فقط سقف نرخ است و
+    شکست روی آن ثبت نمی‌شود؛ وگرنه هر کسی با چند رمز اشتباه همه را قفل می‌کرد.
+    """
+    LOGIN_THROTTLE.failure(user_key, client_key if client_key[0] == "client" else None)
+
+
+# --------------------------
+# stylesheetها: هر قطعه یک بار در هر نشست مرورگر (ر.ک. core.styles)
+# --------------------------
+STYLES = style_registry()
+
+
+def use_style(name: str, css: str):
+    """ثبت یک قطعهٔ CSS و فرستادن آن، اگر این نشست هنوز آن را نگرفته باشد.
+
+    به‌جای `st.markdown(css, unsafe_allow_html=True)` صدا زده می‌شود. CSS کوچک‌شده با یک
+    iframe بی‌ارتفاع به سند اصلی اضافه می‌شود و بین rerunها باقی می‌ماند؛ پس هر قطعه
+    (حتی اگر داخل حلقه صدا زده شود) فقط یک بار در هر نشست روی websocket می‌رود.
+
+    Args:
+        name (str): نام پایدار قطعه.
+        css (str): CSS، با یا بدون تگ `<style>`.
+    """
+    STYLES.register(name, css)
+    sent = st.session_state.setdefault("styles_sent", set())
+    pending = STYLES.pending(sent, [name])
+    if pending:
+        components.html(style_injector(pending), height=0)
+        sent.update(digest for digest, _ in pending)
 
 
 # --------------------------
 # فونت فارسی
 # --------------------------
-font_path = FONTS_DIR / "vazir/Vazir-Medium.ttf"
-font_b64 = None
-if font_path.exists():
-    with open(font_path, "rb") as f:
-        font_data = f.read()
-        font_b64 = base64.b64encode(font_data).decode()
-    st.markdown(
-        f"""
-        <style>
-        @font-face {{
-              font-family: 'Vazir-Medium';
-              src: url(data:font/ttf;base64,{font_b64}) format('truetype');
-              font-weight: normal;
-              font-style: normal;
-        }}
+# از static/fonts با URL نسخه‌دار و کش طولانی سرو می‌شود (ر.ک. core.assets)؛
+# اگر سرو ایستا خاموش باشد، data URI فونت فقط یک بار در هر پردازه ساخته می‌شود.
+VAZIR_FONT_FACE = font_face_css(
+    "Vazir-Medium",
+    FONTS_DIR / "vazir" / "Vazir-Medium",
+    STATIC_DIR,
+    bool(st.get_option("server.enableStaticServing")),
+)
+use_style(
+    "font",
+    f"""
+        {VAZIR_FONT_FACE}
         html, body, [class*="css"], div, span, p, h1, h2, h3, h4, h5, h6,
         input, textarea, button, label, li, th, td , span {{
             font-family: 'Vazir-Medium', sans-serif !important;
@@ -171,10 +353,8 @@ if font_path.exists():
             direction: rtl;
             text-align: right;
        }} 
-        </style>
     """,
-        unsafe_allow_html=True,
-    )
+)
 
 # --------------------------
 # URL تصویر K2 (از Imgur)
@@ -378,7 +558,7 @@ div[data-testid="stPasswordInput"] label {{
 }}
 </style>
 """
-st.markdown(GLASS_THEME_CSS, unsafe_allow_html=True)
+use_style("glass", GLASS_THEME_CSS)
 
 st.set_page_config(page_title="K2 - مسیر رشد فردی", page_icon="⛰️", layout="centered")
 # --------------------------
@@ -390,7 +570,9 @@ for key, default in [
     ("username", None),
     ("role", "user"),
     ("week_set", False),
+    ("week_key", None),
     ("activities", []),
+    ("toasts", []),
 ]:
     if key not in st.session_state:
         st.session_state[key] = default
@@ -400,154 +582,47 @@ for key, default in [
 # توابع کمکی
 # --------------------------
 
-def jalali_to_gregorian(jalali_str: str) -> str:
-    """تبدیل تاریخ شمسی به میلادی برای sorting"""
-    try:
-        y, m, d = map(int, jalali_str.split('/'))
-        g_date = jdatetime.date(y, m, d).togregorian()
-        return g_date.isoformat()
-    except:
-        return jalali_str
+TOAST_ICONS = {"success": "✅", "info": "ℹ️", "error": "❌", "warning": "⚠️"}
+
 
+def timed_message(msg_type: str, message: str, duration: int = 10):
+    """افزودن یک پیام موقت به صف پیام‌های نشست.
 
-def timed_message(msg_type: str, message: str, duration: int = 10, position="inline"):
-    """نمایش یک پیام موقت و استایل‌دهی‌شده در برنامه Streamlit.
+    پیام همان لحظه رسم نمی‌شود؛ `flush_toasts` در پایان اجرای اسکریپت همهٔ پیام‌های صف را
+    با یک `st.toast` (بدون iframe) نمایش می‌دهد و مرورگر خودش بعد از `duration` ثانیه آن را
+    می‌بندد. چون صف در `session_state` است، پیامی که پیش از `st.rerun()` اضافه شده در اجرای
+    بعدی نمایش داده می‌شود و لازم نیست اسکریپت برای دیده شدن پیام صبر کند.
 
-    این تابع یک بنر پیام موقت را با استفاده از HTML، CSS و JavaScript در محیط Streamlit
-    تولید و نمایش می‌دهد. پیام به‌صورت انیمیشنی ظاهر شده، برای مدت زمان مشخصی نمایش داده می‌شود
-    و سپس به‌صورت خودکار محو و حذف می‌گردد. نوع پیام می‌تواند موفقیت، اطلاع، خطا یا هشدار باشد
-    که هر کدام رنگ و آیکون مخصوص خود را دارند.
+    فقط برای نتیجهٔ رویدادها (ذخیره، خطا، ورود و ...) است؛ راهنماهایی که در هر اجرا
+    نمایش داده می‌شوند باید درجا با `st.info`/`st.caption` رسم شوند، وگرنه هر تعامل
+    با صفحه یک toast تازه باز می‌کند.
 
     Args:
-        msg_type (str): نوع پیام برای نمایش. مقادیر مجاز عبارت‌اند از:
-            - "success": پیام موفقیت با رنگ سبز و آیکون تیک.
-            - "info": پیام اطلاع‌رسانی با رنگ آبی و آیکون ℹ️.
-            - "error": پیام خطا با رنگ قرمز و آیکون ❌.
-            - "warning": پیام هشدار با رنگ زرد و آیکون ⚠️.
-            اگر مقدار نامعتبر داده شود، مقدار پیش‌فرض "info" استفاده می‌شود.
-        message (str): محتوای متنی پیام که باید نمایش داده شود.
-        duration (int, اختیاری): مدت زمان نمایش پیام (بر حسب ثانیه) قبل از محو شدن خودکار.
-            مقدار پیش‌فرض برابر ۱۰ ثانیه است.
-        position (str, اختیاری): محل نمایش بنر در صفحه. مقادیر مجاز:
-            - "top": در بالای صفحه و به‌صورت ثابت نمایش داده می‌شود.
-            - "inline": در جریان معمول محتوای صفحه قرار می‌گیرد.
-            مقدار پیش‌فرض "inline" است.
-
-    Raises:
-        NameError: در صورتی که متغیر `font_b64` در محدوده فعلی تعریف نشده باشد.
-
-    نکات:
-        - این تابع به متغیر سراسری `font_b64` برای فونت Base64 نیاز دارد.
-        - برای نمایش HTML سفارشی از `streamlit.components.v1.html` استفاده می‌کند.
-        - طراحی آن واکنش‌گرا بوده و در دستگاه‌های موبایل نیز به‌درستی نمایش داده می‌شود.
+        msg_type (str): نوع پیام: "success"، "info"، "error" یا "warning"؛ مقدار نامعتبر
+            مثل "info" نمایش داده می‌شود.
+        message (str): متن پیام (Markdown).
+        duration (int, اختیاری): مدت نمایش پیام بر حسب ثانیه. پیش‌فرض ۱۰.
     """
-    colors = {
-        "success": {
-            "bg": "rgba(16, 185, 129, 0.15)",
-            "border": "rgba(16, 185, 129, 0.8)",
-            "text": "#a7f3d0",
-            "icon": "✅",
-        },
-        "info": {
-            "bg": "rgba(59, 130, 246, 0.15)",
-            "border": "rgba(59, 130, 246, 0.8)",
-            "text": "#bfdbfe",
-            "icon": "ℹ️",
-        },
-        "error": {
-            "bg": "rgba(239, 68, 68, 0.15)",
-            "border": "rgba(239, 68, 68, 0.8)",
-            "text": "#fecaca",
-            "icon": "❌",
-        },
-        "warning": {
-            "bg": "rgba(245, 158, 11, 0.15)",
-            "border": "rgba(245, 158, 11, 0.8)",
-            "text": "#fde68a",
-            "icon": "⚠️",
-        },
-    }
-    c = colors.get(msg_type, colors["info"])
-
-    container_style = (
-        "position:fixed;top:20px;left:0;width:100%;z-index:9999;display:flex;justify-content:center;"
-        if position == "top"
-        else "width:100%;margin-top:10px;display:flex;justify-content:center;"
+    st.session_state.toasts.append(
+        {"icon": TOAST_ICONS.get(msg_type, TOAST_ICONS["info"]), "message": message, "duration": duration}
     )
 
-    html = f"""
-    <style>
-    @font-face {{
-        font-family: 'Vazir-Medium';
-        src: url(data:font/ttf;base64,{font_b64}) format('truetype');
-        font-weight: normal;
-        font-style: normal;
-    }}
-    @keyframes fadeIn {{
-        0% {{ opacity: 0; transform: translateY(-15px) scale(0.98); }}
-        100% {{ opacity: 1; transform: translateY(0) scale(1); }}
-    }}
 
-    @keyframes fadeOut {{
-        0% {{ opacity: 1; transform: translateY(0) scale(1); }}
-        100% {{ opacity: 0; transform: translateY(-15px) scale(0.98); }}
-    }}
+def flush_toasts():
+    """نمایش همهٔ پیام‌های صف در یک toast و خالی کردن صف.
 
-    @media (max-width: 600px) {{
-        #custom-banner {{
-            width: 90% !important;
-            font-size: 14px !important;
-            padding: 10px 14px !important;
-        }}
-    }}
-    </style>
-
-    <div id="custom-banner" style="{container_style}">
-        <div style="
-            direction: rtl;
-            backdrop-filter: blur(10px) saturate(180%);
-            -webkit-backdrop-filter: blur(10px) saturate(180%);
-            background:{c['bg']};
-            border:1px solid {c['border']};
-            color:{c['text']};
-            font-family:'Vazir-Medium', sans-serif;
-            font-weight:500;
-            font-size:16px;
-            padding:16px 24px;
-            border-radius:14px;
-            box-shadow:0 8px 24px rgba(0,0,0,0.4);
-            display:flex;
-            justify-content:center;
-            align-items:center;
-            gap:12px;
-            animation: fadeIn 0.5s ease-in-out;
-            transition: all 0.5s ease-in-out;
-            max-width: 600px;
-            width: 80%;
-        ">
-            <span style="font-size:22px;">{c['icon']}</span>
-            <span style="flex:1;">{message}</span>
-        </div>
-    </div>
-
-    <script>
-        const banner = document.getElementById('custom-banner');
-        if (banner) {{
-            setTimeout(() => {{
-                banner.firstElementChild.style.animation = 'fadeOut 0.5s ease-in-out forwards';
-                setTimeout(() => banner.remove(), 600);
-            }}, {duration * 1000});
-        }}
-    </script>
+    یک بار در پایان هر اجرای کامل اسکریپت (و پیش از `st.stop()`) صدا زده می‌شود تا هر
+    rerun حداکثر یک پیام toast به مرورگر بفرستد.
     """
-    components.html(html, height=100)
-
+    toasts = st.session_state.toasts
+    if not toasts:
+        return
+    st.session_state.toasts = []
+    st.toast(
+        "  \n".join(f"{toast['icon']} {toast['message']}" for toast in toasts),
+        duration=max(toast["duration"] for toast in toasts),
+    )
 
-# ---- منطق نمایش پایدار بین rerun‌ها ----
-if "banner" in st.session_state:
-    banner_data = st.session_state.pop("banner")
-    if banner_data.get("position") == "top":
-        timed_message(**banner_data)
 
 
 def motivational_message(percent: int) -> str:
@@ -651,48 +726,19 @@ def motivational_message(percent: int) -> str:
     )
 
 
-def validate_jalali_date(text: str) -> bool:
-    """اعتبارسنجی یک رشته به‌عنوان تاریخ شمسی (جلالی).
-
-        این تابع بررسی می‌کند که آیا رشته ورودی نمایانگر یک تاریخ معتبر
-        در تقویم جلالی است یا خیر. فرمت ورودی باید به صورت "YYYY/MM/DD" باشد.
-
-        Args:
-            text (str): رشته تاریخ مورد نظر برای اعتبارسنجی.
-                می‌تواند شامل فاصله در ابتدا و انتها باشد که حذف خواهد شد.
-
-        Returns:
-            bool:
-                - True اگر رشته یک تاریخ معتبر جلالی باشد.
-                - False در غیر این صورت (فرمت اشتباه یا تاریخ نامعتبر).
-
-        Example:
-            >>> validate_jalali_date("1402/07/15")
-            True
-            >>> validate_jalali_date("1402/13/01")
-            False
-
-        Notes:
-            - تابع از ماژول `jdatetime` برای بررسی اعتبار تاریخ استفاده می‌کند.
-            - رشته باید با "/" جدا شده و شامل سال، ماه و روز باشد.
-            - مقادیر غیرمجاز یا فرمت اشتباه به False منجر می‌شوند.
-        """
-
-    try:
-        text = text.strip()
-        parts = text.split("/")
-        if len(parts) != 3:
-            return False
-        y, m, d = map(int, parts)
-        jdatetime.date(y, m, d)  # این خط خطا می‌دهد اگر تاریخ نامعتبر باشد
-        return True
-    except (ValueError, OverflowError):
-        return False
-
-
 # --------------------------
 # توابع فعالیت‌ها
 # --------------------------
+WEEK_FIELDS = (
+    "id", "username", "week_start", "week_end", "week_start_date", "week_end_date",
+    "week_feedback", "week_total_score", "progress_diff", "saved_at",
+)
+ACTIVITY_FIELDS = (
+    "id", "week_id", "username", "name", "target", "done", "percent", "note", "saved_at",
+)
+ACTIVITY_COLUMNS = ACTIVITY_FIELDS[1:]
+
+
 def append_user_history(
         username: str,
         activities: list,
@@ -700,12 +746,15 @@ def append_user_history(
         week_end: str,
         week_feedback: str,
         week_total_score: int,
-):
+        progress_diff: int = 0,
+        bulk: bool = True,
+) -> list:
     """افزودن سوابق هفتگی یک کاربر به پایگاه داده.
 
-    این تابع تمامی فعالیت‌های ارائه‌شده برای یک کاربر را در جدول
-    `user_activities` پایگاه داده ذخیره می‌کند. علاوه بر اطلاعات فعالیت،
-    بازخورد هفتگی و امتیاز کل هفته نیز ذخیره می‌شوند.
+    این تابع ابتدا یک ردیف برای هفته در جدول `user_weeks` (شامل بازخورد هفتگی،
+    امتیاز کل و تغییر نسبت به هفته قبل) ثبت می‌کند و سپس تمامی فعالیت‌های هفته را
+    با ارجاع `week_id` در جدول `user_activities` ذخیره می‌کند؛ بنابراین فیلدهای
+    سطح هفته فقط یک‌بار ذخیره می‌شوند.
 
     Args:
         username (str): نام کاربری که سوابق برای آن ثبت می‌شود.
@@ -717,14 +766,16 @@ def append_user_history(
             - "percent": درصد پیشرفت
             - "note": یادداشت مرتبط با فعالیت
             - "saved_at": تاریخ و زمان ذخیره فعالیت
-            - "progress_diff" (اختیاری): تغییر پیشرفت نسبت به هفته قبل
         week_start (str): تاریخ شروع هفته (به صورت رشته).
         week_end (str): تاریخ پایان هفته (به صورت رشته).
         week_feedback (str): بازخورد کلی هفته برای کاربر.
         week_total_score (int): امتیاز کل هفته. اگر None باشد، صفر در نظر گرفته می‌شود.
+        progress_diff (int, اختیاری): تغییر امتیاز نسبت به هفته قبل.
+        bulk (bool, اختیاری): اگر True باشد (پیش‌فرض) فعالیت‌های هفته با یک INSERT چندردیفی
+            ذخیره می‌شوند؛ در غیر این صورت برای هر فعالیت یک INSERT جدا اجرا می‌شود.
 
     Returns:
-        None
+        list: شناسه‌های ردیف‌های درج‌شده در `user_activities` به ترتیب فعالیت‌ها.
 
     Example:
         >>> append_user_history(
@@ -737,106 +788,405 @@ def append_user_history(
         ... )
 
     Notes:
-        - از ماژول `sqlite3` برای اتصال و ثبت داده‌ها استفاده می‌کند.
-        - اگر کلید "progress_diff" در دیکشنری فعالیت وجود نداشته باشد، مقدار پیش‌فرض ۰ در نظر گرفته می‌شود.
-        - تابع پس از ثبت تمامی فعالیت‌ها، تغییرات را در پایگاه داده اعمال و اتصال را می‌بندد.
+        - هفته و فعالیت‌هایش در یک تراکنش ذخیره می‌شوند؛ یا همه ثبت می‌شوند یا هیچ‌کدام.
     """
 
     if week_total_score is None:
         week_total_score = 0
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    for act in activities:
+    if not activities:
+        return []
+    start_date, end_date = jalali_to_date(week_start), jalali_to_date(week_end)
+    week_start = canonical_jalali(week_start) or week_start
+    week_end = canonical_jalali(week_end) or week_end
+    with get_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             """
-            INSERT INTO user_activities (
-                username, week_start, week_end, name, target, done, percent, note, saved_at, week_feedback, week_total_score, progress_diff
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO user_weeks (
+                username, week_start, week_end, week_start_date, week_end_date, week_feedback,
+                week_total_score, progress_diff, saved_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
             (
                 username,
                 week_start,
                 week_end,
+                start_date.isoformat() if start_date else None,
+                end_date.isoformat() if end_date else None,
+                week_feedback or "",
+                week_total_score,
+                int(progress_diff or 0),
+                activities[0]["saved_at"],
+            ),
+        )
+        week_id = cursor.lastrowid
+        rows = [
+            (
+                week_id,
+                username,
                 act["name"],
                 act["target"],
                 act["done"],
                 act["percent"],
                 act["note"],
                 act["saved_at"],
-                week_feedback or "",
-                week_total_score,
-                int(act.get("progress_diff", 0) or 0),
-            ),
+            )
+            for act in activities
+        ]
+        if bulk:
+            ids = bulk_insert(
+                conn, "user_activities", ACTIVITY_COLUMNS, rows, dialect="sqlite"
+            )
+        else:
+            ids = []
+            for row in rows:
+                cursor.execute(
+                    f"""
+                    INSERT INTO user_activities ({", ".join(ACTIVITY_COLUMNS)})
+                    VALUES ({", ".join("?" for _ in ACTIVITY_COLUMNS)})
+                """,
+                    row,
+                )
+                ids.append(cursor.lastrowid)
+    mark_stale(HISTORY_CACHE, username, None)
+    STATS_CACHE.invalidate(username, None)
+    return ids
+
+
+def _history_filters(username: str = None, after_id: int = None):
+    """شرط WHERE و پارامترهای مشترک بارگذاری هفته‌ها و فعالیت‌ها."""
+    conditions, params = [], []
+    if username is not None:
+        conditions.append("username = ?")
+        params.append(username)
+    if after_id is not None:
+        conditions.append("id > ?")
+        params.append(int(after_id))
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where, tuple(params)
+
+
+def load_user_weeks(username: str = None, after_id: int = None) -> pd.DataFrame:
+    """بارگذاری سرتیتر هفته‌ها (بدون فعالیت‌ها) از جدول `user_weeks`.
+
+    Args:
+        username (str, اختیاری): نام کاربر؛ اگر None باشد هفته‌های همه کاربران بازگردانده می‌شود.
+        after_id (int, اختیاری): فقط هفته‌های با `id` بزرگ‌تر (برای همگام‌سازی افزایشی).
+
+    Returns:
+        pd.DataFrame: یک ردیف برای هر هفته با ستون‌های `WEEK_FIELDS`، مرتب‌شده بر اساس `saved_at`.
+    """
+    where, params = _history_filters(username, after_id)
+    query = f"SELECT {', '.join(WEEK_FIELDS)} FROM user_weeks{where} ORDER BY saved_at ASC"
+    with get_connection() as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+    df["progress_diff"] = pd.to_numeric(df["progress_diff"], errors='coerce').fillna(0).astype(int)
+    return df
+
+
+def week_exists(username: str, start_date: date, end_date: date) -> bool:
+    """آیا این بازهٔ هفته قبلاً برای کاربر ثبت شده است؟
+
+    به‌جای بارگذاری کل تاریخچه، یک پرس‌وجوی `EXISTS` روی ایندکس
+    (username, week_start_date, week_end_date) اجرا می‌شود؛ پس هزینه با رشد تاریخچه
+    ثابت می‌ماند.
+
+    Args:
+        username (str): نام کاربر.
+        start_date (date): تاریخ میلادی شروع هفته (از `calendar_weeks()`).
+        end_date (date): تاریخ میلادی پایان هفته.
+
+    Returns:
+        bool: اگر هفته‌ای با همین بازه برای کاربر وجود داشته باشد True.
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM user_weeks "
+            "WHERE username = ? AND week_start_date = ? AND week_end_date = ?)",
+            (username, start_date.isoformat(), end_date.isoformat()),
         )
-    conn.commit()
-    conn.close()
+        return bool(cursor.fetchone()[0])
 
 
-def load_user_history(username: str) -> pd.DataFrame:
+def previous_week_summary(username: str, before: date):
+    """خلاصهٔ آخرین هفتهٔ ثبت‌شدهٔ کاربر پیش از یک تاریخ شروع.
+
+    مقایسه روی ستون میلادی `week_start_date` انجام می‌شود (نه رشتهٔ شمسی) و با
+    ایندکس ترکیبی (username, week_start_date, week_end_date) (مهاجرت ۷) فقط یک ردیف
+    خوانده می‌شود.
+
+    Args:
+        username (str): نام کاربر.
+        before (date): تاریخ میلادی شروع هفتهٔ جاری (از `calendar_weeks()`).
+
+    Returns:
+        dict | None: {"week_start", "week_end", "week_total_score"} هفتهٔ قبلی؛
+            اگر هفتهٔ قبلی وجود نداشته باشد None.
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT week_start, week_end, week_total_score FROM user_weeks
+            WHERE username = ? AND week_start_date < ?
+            ORDER BY week_start_date DESC LIMIT 1
+            """,
+            (username, before.isoformat()),
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return {"week_start": row[0], "week_end": row[1], "week_total_score": int(row[2] or 0)}
+
+
+def load_week_activities(week_ids=None, fields=ACTIVITY_FIELDS) -> pd.DataFrame:
+    """بارگذاری فعالیت‌های یک یا چند هفته از جدول `user_activities`.
+
+    Args:
+        week_ids (list, اختیاری): شناسه‌های هفته‌ها؛ اگر None باشد فعالیت‌های همه هفته‌ها بازگردانده می‌شود.
+        fields (tuple, اختیاری): ستون‌های خوانده‌شده (پیش‌فرض همهٔ `ACTIVITY_FIELDS`).
+
+    Returns:
+        pd.DataFrame: فعالیت‌ها با ستون‌های `fields`، مرتب‌شده بر اساس `saved_at`.
+    """
+    query = f"SELECT {', '.join(fields)} FROM user_activities"
+    params = ()
+    if week_ids is not None:
+        week_ids = [int(w) for w in week_ids]
+        if not week_ids:
+            return pd.DataFrame(columns=list(fields))
+        query += f" WHERE week_id IN ({', '.join('?' for _ in week_ids)})"
+        params = tuple(week_ids)
+    with get_connection() as conn:
+        return pd.read_sql_query(query + " ORDER BY saved_at ASC", conn, params=params)
+
+
+def load_user_activities(username: str = None, after_id: int = None) -> pd.DataFrame:
+    """بارگذاری فعالیت‌های یک کاربر (یا همه کاربران) از جدول `user_activities`.
+
+    Args:
+        username (str, اختیاری): نام کاربر؛ اگر None باشد فعالیت‌های همه کاربران بازگردانده می‌شود.
+        after_id (int, اختیاری): فقط فعالیت‌های با `id` بزرگ‌تر (برای همگام‌سازی افزایشی).
+
+    Returns:
+        pd.DataFrame: فعالیت‌ها با ستون‌های `ACTIVITY_FIELDS`، مرتب‌شده بر اساس `saved_at`.
+    """
+    where, params = _history_filters(username, after_id)
+    query = f"SELECT {', '.join(ACTIVITY_FIELDS)} FROM user_activities{where} ORDER BY saved_at ASC"
+    with get_connection() as conn:
+        return pd.read_sql_query(query, conn, params=params)
+
+
+def load_user_history(username: str = None):
     """بارگذاری سوابق هفتگی یک کاربر از پایگاه داده.
 
-    این تابع تمامی فعالیت‌ها و سوابق هفتگی یک کاربر مشخص را از جدول
-    `user_activities` در پایگاه داده استخراج کرده و به صورت یک DataFrame
-    از کتابخانه pandas بازمی‌گرداند. ستون `progress_diff` به صورت عددی
-    پردازش شده و مقادیر نامعتبر یا خالی با ۰ جایگزین می‌شوند.
+    هفته‌ها از `user_weeks` و فعالیت‌ها از `user_activities` خوانده می‌شوند. فیلدهای
+    سطح هفته (بازخورد، امتیاز و تغییر پیشرفت) فقط در جدول هفته‌ها هستند و برای هر
+    فعالیت تکرار نمی‌شوند.
 
     Args:
-        username (str): نام کاربری که سوابق آن باید بارگذاری شود.
+        username (str, اختیاری): نام کاربری که سوابق آن باید بارگذاری شود؛
+            اگر None باشد سوابق همه کاربران بازگردانده می‌شود (نمای ادمین).
 
     Returns:
-        pd.DataFrame: داده‌های کاربر شامل ستون‌های زیر:
-            - username: نام کاربری
-            - week_start: تاریخ شروع هفته
-            - week_end: تاریخ پایان هفته
-            - name: نام فعالیت
-            - target: هدف فعالیت
-            - done: میزان انجام شده
-            - percent: درصد پیشرفت
-            - note: یادداشت مرتبط با فعالیت
-            - saved_at: تاریخ و زمان ذخیره فعالیت
-            - week_feedback: بازخورد هفتگی
-            - week_total_score: امتیاز کل هفته
-            - progress_diff: تغییر پیشرفت نسبت به هفته قبل (عدد صحیح)
+        tuple[pd.DataFrame, pd.DataFrame]: (هفته‌ها، فعالیت‌ها)
+            - هفته‌ها: id, username, week_start, week_end, week_feedback,
+              week_total_score, progress_diff (عدد صحیح), saved_at
+            - فعالیت‌ها: id, week_id, username, name, target, done, percent, note, saved_at
+
+    Notes:
+        - نتیجه در `HISTORY_CACHE` نگه داشته می‌شود؛ rerunهای بعدی (مثلاً تایپ در جستجو)
+          به پایگاه داده نمی‌روند. پس از `HISTORY_REFRESH_SECONDS` یا ثبت گزارش جدید فقط
+          ردیف‌های جدیدتر از watermark خوانده می‌شوند و هر `HISTORY_RECONCILE_SECONDS`
+          یک بارگذاری کامل برای دیدن حذف‌ها انجام می‌شود (ر.ک. `core.history`).
+        - DataFrameهای برگشتی بین نشست‌ها مشترک‌اند و نباید درجا تغییر داده شوند.
+        - از ماژول `sqlite3` (از طریق استخر اتصال) و `pandas.read_sql_query` برای بارگذاری داده‌ها استفاده می‌کند.
 
     Example:
-        >>> df = load_user_history("ali")
-        >>> df.head()
-          username week_start week_end        name  target  done  percent note  ...
+        >>> weeks, activities = load_user_history("ali")
+        >>> activities[activities["week_id"] == weeks.iloc[-1]["id"]]
+    """
+    return load_history(
+        HISTORY_CACHE,
+        username,
+        lambda after_id: load_user_weeks(username, after_id),
+        lambda after_id: load_user_activities(username, after_id),
+        refresh_after=HISTORY_REFRESH_SECONDS,
+        reconcile_after=HISTORY_RECONCILE_SECONDS,
+        overlap=HISTORY_ID_OVERLAP,
+    )
 
-    Notes:
-        - از ماژول `sqlite3` برای اتصال به پایگاه داده و `pandas.read_sql_query` برای بارگذاری داده‌ها استفاده می‌کند.
-        - اگر ستون `progress_diff` مقادیر نامعتبر یا خالی داشته باشد، با ۰ جایگزین می‌شود.
-        - داده‌ها بر اساس ستون `saved_at` به ترتیب صعودی مرتب می‌شوند.
+# --------------------------
+# فید صفحه‌بندی‌شدهٔ هفته‌ها (نمای همه کاربران)
+# --------------------------
+# فقط ستون‌هایی از فعالیت‌ها که در کارت‌های هفته نمایش داده می‌شوند
+FEED_ACTIVITY_FIELDS = ("week_id", "name", "target", "done", "percent", "note", "saved_at")
+ADMIN_FEED_PAGE_SIZE = 20
+# فعالیت‌های هر هفته (کلید شناسهٔ هفته)، فقط برای هفته‌هایی که در فید باز می‌شوند
+WEEK_ACTIVITIES_CACHE = named_cache("week_activities", max_bytes=8 * 1024 * 1024, ttl=600)
+
+
+def _escape_like(text: str) -> str:
+    """escape نویسه‌های ویژهٔ LIKE تا متن جستجو به‌صورت تحت‌اللفظی مقایسه شود."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def filter_feed_activities(weeks: pd.DataFrame, activities: pd.DataFrame, search: str) -> pd.DataFrame:
+    """فعالیت‌های مطابق جستجو؛ اگر بازخورد هفته مطابق باشد همهٔ فعالیت‌های آن هفته نگه داشته می‌شوند."""
+    if not search or activities.empty:
+        return activities
+    mask_feedback = weeks["week_feedback"].str.contains(search, case=False, na=False, regex=False)
+    return activities[
+        activities["name"].str.contains(search, case=False, na=False, regex=False)
+        | activities["note"].str.contains(search, case=False, na=False, regex=False)
+        | activities["week_id"].isin(weeks.loc[mask_feedback, "id"])
+        ]
+
+
+def _feed_page(weeks: pd.DataFrame, limit: int):
+    """برش صفحه و ساخت cursor صفحهٔ بعد."""
+    next_cursor = None
+    if len(weeks) > limit:
+        weeks = weeks.iloc[:limit].copy()
+        last = weeks.iloc[-1]
+        next_cursor = (last["saved_at"], int(last["id"]))
+    weeks["progress_diff"] = pd.to_numeric(weeks["progress_diff"], errors='coerce').fillna(0).astype(int)
+    return weeks, next_cursor
+
+
+def load_feed_week_activities(week, search: str = None) -> pd.DataFrame:
+    """فعالیت‌های یک هفتهٔ فید، وقتی بدنهٔ آن باز می‌شود، با همان فیلتر جستجوی فید.
+
+    Args:
+        week (pd.Series): ردیف هفته از `load_week_feed_page`.
+        search (str, اختیاری): متن جستجوی فید.
+
+    Returns:
+        pd.DataFrame: فعالیت‌ها با ستون‌های `FEED_ACTIVITY_FIELDS`.
     """
+    week_id = int(week["id"])
+    activities = WEEK_ACTIVITIES_CACHE.get_or_load(
+        week_id, lambda: load_week_activities([week_id], fields=FEED_ACTIVITY_FIELDS)
+    )
+    return filter_feed_activities(pd.DataFrame([week]), activities, search)
 
-    conn = sqlite3.connect(DB_FILE)
+
+def load_week_feed_page(
+        username: str = None,
+        search: str = None,
+        after=None,
+        limit: int = ADMIN_FEED_PAGE_SIZE,
+        date_from=None,
+        date_to=None,
+):
+    """یک صفحه از فید هفته‌ها (جدیدترین اول) با صفحه‌بندی keyset روی (saved_at, id).
+
+    فیلتر کاربر و جستجو (در بازخورد هفته، نام و یادداشت فعالیت‌ها) پیش از LIMIT در
+    پایگاه داده اجرا می‌شوند. فعالیت‌ها اینجا خوانده نمی‌شوند؛ فعالیت‌های هر هفته فقط وقتی
+    بدنهٔ آن باز شود با `load_feed_week_activities` گرفته می‌شوند.
+
+    Args:
+        username (str, اختیاری): فقط هفته‌های این کاربر.
+        search (str, اختیاری): متن جستجو.
+        after (tuple, اختیاری): cursor برگشتی صفحهٔ قبل به شکل (saved_at, id).
+        limit (int, اختیاری): تعداد هفته‌های هر صفحه.
+        date_from (datetime.date, اختیاری): فقط هفته‌هایی که از این تاریخ یا بعد از آن شروع شده‌اند.
+        date_to (datetime.date, اختیاری): فقط هفته‌هایی که تا این تاریخ شروع شده‌اند.
+
+    Returns:
+        tuple[pd.DataFrame, tuple | None]: (هفته‌ها، cursor صفحهٔ بعد)؛
+            اگر صفحهٔ دیگری نباشد cursor برابر None است.
+    """
+    conditions, params = [], []
+    if username is not None:
+        conditions.append("username = ?")
+        params.append(username)
+    if date_from is not None:
+        conditions.append("week_start_date >= ?")
+        params.append(date_from.isoformat())
+    if date_to is not None:
+        conditions.append("week_start_date <= ?")
+        params.append(date_to.isoformat())
+    if after is not None:
+        conditions.append("(saved_at, id) < (?, ?)")
+        params.extend([after[0], int(after[1])])
+    if search:
+        pattern = f"%{_escape_like(search)}%"
+        conditions.append(
+            "(week_feedback LIKE ? ESCAPE '\\' OR EXISTS ("
+            "SELECT 1 FROM user_activities a WHERE a.week_id = user_weeks.id "
+            "AND (a.name LIKE ? ESCAPE '\\' OR a.note LIKE ? ESCAPE '\\')))"
+        )
+        params.extend([pattern] * 3)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = (
+        f"SELECT {', '.join(WEEK_FIELDS)} FROM user_weeks{where} "
+        "ORDER BY saved_at DESC, id DESC LIMIT ?"
+    )
+    params.append(limit + 1)
+    with get_connection() as conn:
+        weeks = pd.read_sql_query(query, conn, params=tuple(params))
+    return _feed_page(weeks, limit)
+
+
+def list_usernames() -> list:
+    """نام همهٔ کاربران به ترتیب الفبا (برای فیلتر کاربر در فید ادمین)، از کش مشترک."""
+    def load():
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT username FROM users ORDER BY username")
+            return [row[0] for row in cursor.fetchall()]
+
+    return list(USERNAMES_CACHE.get_or_load(None, load))
+
+
+def _stats_row(activity_count, week_count, avg_score, best_score) -> dict:
+    return {
+        "activity_count": int(activity_count or 0),
+        "week_count": int(week_count or 0),
+        "avg_score": float(avg_score or 0),
+        "best_score": int(best_score or 0),
+    }
+
+
+def _fetch_history_stats(username: str = None) -> dict:
     query = """
-    SELECT 
-        username, week_start, week_end, name, target, done, percent, note, 
-        saved_at, week_feedback, week_total_score, progress_diff
-    FROM user_activities 
-    WHERE username = ?
-    ORDER BY saved_at ASC
+        SELECT COUNT(a.id),
+               COUNT(DISTINCT w.id),
+               AVG(CASE WHEN a.id IS NOT NULL THEN w.week_total_score END),
+               MAX(w.week_total_score)
+        FROM user_weeks w
+        LEFT JOIN user_activities a ON a.week_id = w.id
     """
-    df = pd.read_sql_query(query, conn, params=(username,))
-    if not df.empty:
-        df["progress_diff"] = pd.to_numeric(df["progress_diff"], errors='coerce').fillna(0).astype(int)
-    conn.close()
-    return df
+    params = ()
+    if username is not None:
+        query += " WHERE w.username = ?"
+        params = (username,)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        return _stats_row(*cursor.fetchone())
 
 
-def get_progress_style(percent: int):
-    """استایل progress bar براساس درصد """
-    if percent >= 80:
-        return "background: linear-gradient(90deg, #10b981, #059669);"
-    elif percent >= 50:
-        return "background: linear-gradient(90deg, #f59e0b, #d97706);"
-    else:
-        return "background: linear-gradient(90deg, #ef4444, #dc2626);"
+def load_history_stats(username: str = None) -> dict:
+    """آمار خلاصهٔ تاریخچه که در پایگاه داده محاسبه می‌شود (بدون انتقال ردیف‌های جزئی).
+
+    Args:
+        username (str, اختیاری): نام کاربر؛ اگر None باشد آمار همه کاربران.
+
+    Returns:
+        dict: activity_count (تعداد فعالیت‌ها)، week_count (تعداد هفته‌ها)،
+            avg_score (میانگین امتیاز هفته به ازای هر فعالیت) و best_score (بهترین امتیاز هفته).
+
+    Notes:
+        - نتیجه در `STATS_CACHE` نگه داشته می‌شود و `append_user_history` آن را باطل می‌کند.
+    """
+    return STATS_CACHE.get_or_load(username, lambda: _fetch_history_stats(username))
 
 
 def render_premium_week_section(
-        group: pd.DataFrame, username=st.session_state.username, is_admin: bool = False
+        week, activities: pd.DataFrame, username: str, is_admin: bool = False
 ):
     """نمایش بخش هفتگی پریمیوم کاربران با طراحی تعاملی و واکنش‌گرا در Streamlit.
 
@@ -847,19 +1197,20 @@ def render_premium_week_section(
     - استایل‌های CSS واکنش‌گرا برای دسکتاپ، موبایل و موبایل‌های خیلی کوچک
 
     Args:
-        group (pd.DataFrame): داده‌های فعالیت‌های هفتگی کاربر. انتظار می‌رود شامل ستون‌های:
+        week (pd.Series | dict): سرتیتر هفته (یک ردیف از `user_weeks`) شامل کلیدهای:
+            - week_start: تاریخ شروع هفته
+            - week_end: تاریخ پایان هفته
+            - week_total_score: امتیاز کل هفته
+            - progress_diff: تغییر پیشرفت نسبت به هفته قبل
+            - week_feedback: بازخورد کلی هفته
+        activities (pd.DataFrame): فعالیت‌های همین هفته. انتظار می‌رود شامل ستون‌های:
             - name: نام فعالیت
             - target: هدف فعالیت
             - done: میزان انجام شده
             - percent: درصد پیشرفت
             - note: یادداشت مرتبط با فعالیت
             - saved_at_dt: تاریخ ذخیره فعالیت به صورت datetime
-            - week_start: تاریخ شروع هفته
-            - week_end: تاریخ پایان هفته
-            - week_total_score: امتیاز کل هفته
-            - progress_diff: تغییر پیشرفت نسبت به هفته قبل
-            - week_feedback: بازخورد کلی هفته
-        username (str, اختیاری): نام کاربری برای نمایش در هدر (پیش‌فرض از st.session_state گرفته می‌شود).
+        username (str): نام کاربری برای نمایش در هدر.
         is_admin (bool, اختیاری): مشخص می‌کند که آیا کاربر ادمین است یا خیر. اگر True باشد، نام کاربر در هدر نمایش داده می‌شود.
 
     Returns:
@@ -874,11 +1225,13 @@ def render_premium_week_section(
         - جایگزین کردن placeholder اگر بازخورد هفته ثبت نشده باشد
 
     Example:
-        >>> render_premium_week_section(group=df_user_week, username="ali", is_admin=True)
+        >>> render_premium_week_section(week_row, week_activities, username="ali", is_admin=True)
 
     Notes:
         - تابع از کتابخانه‌های `pandas`, `html` و `streamlit` استفاده می‌کند.
-        - تمام CSSها به صورت inline و در ابتدای اجرای تابع inject می‌شوند.
+        - CSSها با `use_style` فقط یک بار در هر نشست فرستاده می‌شوند و کل HTML هفته
+          (`core.week_html.render_week_html`) با یک عنصر `st.markdown` رسم می‌شود؛ HTML هر
+          هفته با کلید هش محتوایش در `WEEK_HTML` نگه داشته و بین نشست‌ها دوباره استفاده می‌شود.
         - این تابع برای استفاده در داشبورد Streamlit و نمایش بصری طراحی شده است و داده‌ها را مستقیماً از DataFrame ورودی می‌گیرد.
         - ستون‌های لازم در DataFrame باید با نام‌های مشخص شده موجود باشند تا کارت‌ها و هدر به درستی نمایش داده شوند.
     """
@@ -1014,15 +1367,7 @@ def render_premium_week_section(
     }
     </style>
     """
-    st.markdown(activity_responsive_css, unsafe_allow_html=True)
-
-    group = group.sort_values("saved_at_dt", ascending=True)
-    first_row = group.iloc[0]
-    week_start = first_row["week_start"]
-    week_end = first_row["week_end"]
-    week_total = int(first_row.get("week_total_score", 0))
-    progress_diff = int(first_row.get("progress_diff", 0))
-    feedback = str(first_row.get("week_feedback", "")).strip() or "—"
+    use_style("activity", activity_responsive_css)
 
     # ✅ CSS سفارشی برای هدر - یک‌بار در ابتدای کد inject کن (merge با CSS قبلی)
     header_css = """
@@ -1109,295 +1454,116 @@ def render_premium_week_section(
     }
     </style>
     """
-    st.markdown(header_css, unsafe_allow_html=True)
-
-    # Header با inline styles
-    user_badge = ""
-    if is_admin and username:
-        user_badge = f"""
-        <div class="header-badge" style="
-            background: rgba(34, 197, 94, 0.2); color: #4ade80; 
-            border: 1px solid rgba(34, 197, 94, 0.3);
-        ">
-            👤 {html.escape(username)}
-        </div>
-        """
+    use_style("week_header", header_css)
 
-    if progress_diff > 0:
-        diff_badge_style = "background: rgba(34, 197, 94, 0.2); color: #4ade80; border: 1px solid rgba(34, 197, 94, 0.4);"
-        diff_emoji = "📈"
-    elif progress_diff < 0:
-        diff_badge_style = "background: rgba(239, 68, 68, 0.2); color: #f87171; border: 1px solid rgba(239, 68, 68, 0.3);"
-        diff_emoji = "📉"
-    else:
-        diff_badge_style = "background: rgba(156, 163, 184, 0.2); color: #94a3b8; border: 1px solid rgba(156, 163, 184, 0.3);"
-        diff_emoji = "🪨"
-
-    score_badge = f"""
-    <div class="header-badge" style="
-        background: rgba(59, 130, 246, 0.2); color: #60a5fa; 
-        border: 1px solid rgba(59, 130, 246, 0.3);
-    ">
-        ✨ {week_total}%
-    </div>
-    """
+    feedback_css = """
+    <style>
+    .feedback-card {
+        background: linear-gradient(135deg, rgba(15, 23, 42, 0.8), rgba(30, 41, 59, 0.6)); 
+        border-radius: 12px; padding: 16px; margin: 16px 0; margin-top: 20px;
+        border: 1px solid rgba(148, 163, 184, 0.2); direction: rtl; box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+        animation: fadeIn 0.5s ease-in;
+    }
 
-    diff_badge = f"""
-    <div class="header-badge" style="
-        {diff_badge_style}
-    ">
-        {diff_emoji} {progress_diff}%
-    </div>
-    """
+    @keyframes fadeIn {
+        from { opacity: 0; transform: translateY(10px); }
+        to { opacity: 1; transform: translateY(0); }
+    }
 
-    header_html = f"""
-    <div class="header-container">
-        <div class="header-top">
-            <div class="header-date">
-                🗓️ {week_start} تا {week_end}
-            </div>
-            <div class="header-badges">
-                {user_badge}
-                {score_badge}
-                {diff_badge}
-            </div>
-        </div>
-    </div>
-    """
+    .feedback-header {
+        display: flex !important; align-items: center; gap: 8px; margin-bottom: 12px;
+        color: #fbbf24; font-weight: 600; font-size: 15px; border-bottom: 1px solid rgba(251, 191, 36, 0.2);
+        padding-bottom: 8px; flex-wrap: nowrap; /* جلوگیری از wrap ناخواسته */
+        justify-content: flex-start; /* چپ‌چین برای rtl */
+    }
 
-    st.markdown(header_html, unsafe_allow_html=True)
+    .feedback-content {
+        color: #e2e8f0; line-height: 1.6; white-space: pre-wrap; font-size: 14px;
+        word-break: break-word;
+    }
 
-    # فعالیت‌ها
-    total_activities = len(group)
-    st.markdown(
-        f"""
-        <div style="margin-bottom: 16px;">
-            <h4 style="color: #e2e8f0; margin: 0 0 16px 0; font-size: 18px; direction: rtl;">
-                📋 فعالیت‌ها ({total_activities})
-            </h4>
-    """,
-        unsafe_allow_html=True,
-    )
+    .feedback-placeholder {
+        color: #94a3b8 !important; font-style: italic; cursor: pointer;
+        border: 1px dashed rgba(148, 163, 184, 0.3); padding: 8px; border-radius: 6px;
+        transition: background 0.2s ease; margin-top: 8px;
+    }
 
-    for idx, (_, row) in enumerate(group.iterrows(), 1):
-        activity_name = html.escape(str(row.get("name", "")))
-        target = int(row.get("target", 0))
-        done = int(row.get("done", 0))
-        percent = int(row.get("percent", 0))
-        note = html.escape(str(row.get("note", "")))
-        status = "✅" if done >= target else "🔄"
-        status_text = "کامل" if done >= target else f"{done}/{target}"
-
-        # Progress badge style
-        if percent >= 80:
-            progress_style = "background: rgba(34, 197, 94, 0.2); color: #4ade80; border: 1px solid rgba(34, 197, 94, 0.3);"
-            progress_emoji = "🧗‍♂️"
-        elif percent >= 50:
-            progress_style = "background: rgba(251, 191, 36, 0.2); color: #fbbf24; border: 1px solid rgba(251, 191, 36, 0.3);"
-            progress_emoji = "🧭"
-        else:
-            progress_style = "background: rgba(239, 68, 68, 0.2); color: #f87171; border: 1px solid rgba(239, 68, 68, 0.3);"
-            progress_emoji = "🪢"
-
-        # Progress bar style
-        if percent >= 80:
-            bar_style = "background: linear-gradient(90deg, #10b981, #059669);"
-        elif percent >= 50:
-            bar_style = "background: linear-gradient(90deg, #f59e0b, #d97706);"
-        else:
-            bar_style = "background: linear-gradient(90deg, #ef4444, #dc2626);"
-
-        activity_html = f"""
-        <div class="activity-card">
-            <div class="activity-header">
-                <div class="activity-name">
-                    {idx}. {activity_name}
-                </div>
-                <div class="activity-badge" style="{progress_style}">
-                    {progress_emoji} {percent}%
-                </div>
-            </div>
-            <div class="activity-stats">
-                <div class="activity-stat-item">🧗 انجام: {done}</div>
-                <div class="activity-stat-item">🎯 هدف: {target}</div>
-                <div class="activity-stat-item">{status} وضعیت: {status_text}</div>
-            </div>
-            <div class="activity-progress-container">
-                <div class="activity-progress-fill" style="width: {percent}%; {bar_style}">
-                    <span class="activity-progress-text">{percent}%</span>
-                </div>
-            </div>
-        </div>
-        """
+    .feedback-placeholder:hover {
+        background: rgba(148, 163, 184, 0.1);
+    }
 
-        st.markdown(activity_html, unsafe_allow_html=True)
+    .feedback-sentiment-badge {
+        display: inline-flex !important; align-items: center; gap: 4px; padding: 4px 8px; border-radius: 8px;
+        font-weight: 600; font-size: 12px; white-space: nowrap; /* badge در یک خط */
+        transition: transform 0.2s ease; flex-shrink: 0; /* کوچک نشه */
+    }
 
-        feedback_css = """
-        <style>
-        .feedback-card {
-            background: linear-gradient(135deg, rgba(15, 23, 42, 0.8), rgba(30, 41, 59, 0.6)); 
-            border-radius: 12px; padding: 16px; margin: 16px 0; margin-top: 20px;
-            border: 1px solid rgba(148, 163, 184, 0.2); direction: rtl; box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-            animation: fadeIn 0.5s ease-in;
-        }
+    .feedback-sentiment-badge:hover {
+        transform: scale(1.05);
+    }
 
-        @keyframes fadeIn {
-            from { opacity: 0; transform: translateY(10px); }
-            to { opacity: 1; transform: translateY(0); }
+    /* موبایل: row اجباری، فشرده‌تر */
+    @media (max-width: 768px) {
+        .feedback-card {
+            padding: 12px !important; margin: 12px 0;
         }
 
         .feedback-header {
-            display: flex !important; align-items: center; gap: 8px; margin-bottom: 12px;
-            color: #fbbf24; font-weight: 600; font-size: 15px; border-bottom: 1px solid rgba(251, 191, 36, 0.2);
-            padding-bottom: 8px; flex-wrap: nowrap; /* جلوگیری از wrap ناخواسته */
-            justify-content: flex-start; /* چپ‌چین برای rtl */
+            font-size: 13px; gap: 6px !important; padding-bottom: 6px;
+            flex-direction: row !important; /* اجبار row */
+            justify-content: space-between; /* پخش: متن چپ، badge راست */
         }
 
-        .feedback-content {
-            color: #e2e8f0; line-height: 1.6; white-space: pre-wrap; font-size: 14px;
-            word-break: break-word;
+        .feedback-content, .feedback-placeholder {
+            font-size: 12px; line-height: 1.5;
         }
 
-        .feedback-placeholder {
-            color: #94a3b8 !important; font-style: italic; cursor: pointer;
-            border: 1px dashed rgba(148, 163, 184, 0.3); padding: 8px; border-radius: 6px;
-            transition: background 0.2s ease; margin-top: 8px;
+        .feedback-sentiment-badge {
+            font-size: 10px; padding: 3px 6px !important; gap: 2px; border-radius: 6px;
         }
 
-        .feedback-placeholder:hover {
-            background: rgba(148, 163, 184, 0.1);
+        .feedback-placeholder {
+            font-size: 11px; padding: 6px;
         }
+    }
 
-        .feedback-sentiment-badge {
-            display: inline-flex !important; align-items: center; gap: 4px; padding: 4px 8px; border-radius: 8px;
-            font-weight: 600; font-size: 12px; white-space: nowrap; /* badge در یک خط */
-            transition: transform 0.2s ease; flex-shrink: 0; /* کوچک نشه */
+    /* موبایل خیلی کوچک: همچنان row، اما فشرده حداکثری */
+    @media (max-width: 480px) {
+        .feedback-header {
+            font-size: 12px !important; gap: 4px !important; padding-bottom: 4px;
+            flex-direction: row !important; /* اجبار row - نه column */
+            align-items: flex-start; flex-wrap: nowrap; /* بدون wrap */
+            justify-content: flex-start; /* یا space-between اگر بخوای badge راست بره */
+            margin-bottom: 8px;
         }
 
-        .feedback-sentiment-badge:hover {
-            transform: scale(1.05);
+        .feedback-content {
+            font-size: 11px;
         }
 
-        /* موبایل: row اجباری، فشرده‌تر */
-        @media (max-width: 768px) {
-            .feedback-card {
-                padding: 12px !important; margin: 12px 0;
-            }
-
-            .feedback-header {
-                font-size: 13px; gap: 6px !important; padding-bottom: 6px;
-                flex-direction: row !important; /* اجبار row */
-                justify-content: space-between; /* پخش: متن چپ، badge راست */
-            }
-
-            .feedback-content, .feedback-placeholder {
-                font-size: 12px; line-height: 1.5;
-            }
-
-            .feedback-sentiment-badge {
-                font-size: 10px; padding: 3px 6px !important; gap: 2px; border-radius: 6px;
-            }
-
-            .feedback-placeholder {
-                font-size: 11px; padding: 6px;
-            }
+        .feedback-sentiment-badge {
+            font-size: 9px !important; padding: 2px 4px !important; gap: 1px;
+            min-width: auto; /* کوچک حداکثری */
         }
 
-        /* موبایل خیلی کوچک: همچنان row، اما فشرده حداکثری */
-        @media (max-width: 480px) {
-            .feedback-header {
-                font-size: 12px !important; gap: 4px !important; padding-bottom: 4px;
-                flex-direction: row !important; /* اجبار row - نه column */
-                align-items: flex-start; flex-wrap: nowrap; /* بدون wrap */
-                justify-content: flex-start; /* یا space-between اگر بخوای badge راست بره */
-                margin-bottom: 8px;
-            }
-
-            .feedback-content {
-                font-size: 11px;
-            }
-
-            .feedback-sentiment-badge {
-                font-size: 9px !important; padding: 2px 4px !important; gap: 1px;
-                min-width: auto; /* کوچک حداکثری */
-            }
-
-            .feedback-placeholder {
-                font-size: 10px; padding: 4px;
-            }
+        .feedback-placeholder {
+            font-size: 10px; padding: 4px;
         }
-        </style>
-        """
-        st.markdown(feedback_css, unsafe_allow_html=True)
-
-        if note:
-            st.markdown(
-                f"""
-            <div style="
-                background: rgba(15, 23, 42, 0.6); border-radius: 8px; padding: 12px; margin-top: 8px;
-                border: 1px solid rgba(148, 163, 184, 0.2); font-size: 13px; color: #e2e8f0;
-                line-height: 1.6; direction: rtl;
-            ">
-                📝 {note}
-            </div>
-            """,
-                unsafe_allow_html=True,
-            )
+    }
+    </style>
+    """
+    use_style("feedback", feedback_css)
 
-        st.markdown("</div>", unsafe_allow_html=True)
-
-    sentiment = "neutral"
-    sentiment_emoji = "🪢"
-    sentiment_style = "background: rgba(156, 163, 175, 0.2); color: #9ca3af; border: 1px solid rgba(156, 163, 175, 0.3);"
-
-    if feedback and feedback != "—" and feedback != "":
-        positive_words = ["عالی", "خوب", "موفق", "لذت", "پیشرفت", "انرژی", "افتخار"]
-        negative_words = ["سخت", "خسته", "فراموش", "مشکل", "افت"]
-        if any(word in feedback.lower() for word in positive_words):
-            sentiment = "positive"
-            sentiment_emoji = "🧗‍♂️"
-            sentiment_style = "background: rgba(34, 197, 94, 0.2); color: #4ade80; border: 1px solid rgba(34, 197, 94, 0.3);"
-        elif any(word in feedback.lower() for word in negative_words):
-            sentiment = "negative"
-            sentiment_emoji = "🧭"
-            sentiment_style = "background: rgba(251, 191, 36, 0.2); color: #fbbf24; border: 1px solid rgba(251, 191, 36, 0.3);"
-
-    if feedback and feedback != "—" and feedback != "":
-        feedback_html = f"""
-        <div class="feedback-card">
-            <div class="feedback-header" style="display: flex; justify-content: space-between; align-items: center;">
-                <div>
-                    📝 بازخورد کلی هفته :
-                </div>
-                <span class="feedback-sentiment-badge" style="{sentiment_style}">
-                    {sentiment_emoji} حس کلی: {sentiment.title()}
-                </span>
-            </div>
-            <div class="feedback-content">
-                {feedback}
-            </div>
-        </div>
-        """
-        st.markdown(feedback_html, unsafe_allow_html=True)
-    else:
-        # placeholder اگر خالی باشه
-        st.markdown("""
-        <div class="feedback-card">
-            <div class="feedback-header">
-                📝 بازخورد کلی هفته
-            </div>
-            <div class="feedback-placeholder" onclick="document.getElementById('feedback-textarea').scrollIntoView(); return false;">
-                💭 بازخوردی ثبت نشده است. تجربیاتت رو بنویس تا مسیرت بهتر بشه! (مثل چالش‌ها یا موفقیت‌های این هفته)
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+    st.markdown(WEEK_HTML.render(week, activities, username, is_admin), unsafe_allow_html=True)
 
 
 def render_premium_history_ui(
-        df: pd.DataFrame,
+        weeks: pd.DataFrame,
+        activities: pd.DataFrame,
         *,
         key_prefix: str,
         empty_message: str,
+        stats: dict,
         show_user_filter: bool = False,
 ):
     """رندر رابط کاربری Premium برای مشاهده تاریخچه فعالیت‌های کاربران در Streamlit.
@@ -1407,25 +1573,29 @@ def render_premium_history_ui(
     - نمایش آمار کلی (تعداد فعالیت‌ها، هفته‌ها، میانگین و بهترین امتیاز)
     - فیلتر جستجو در نام فعالیت‌ها، یادداشت‌ها و بازخوردها
     - فیلتر بر اساس کاربر (در صورت فعال بودن show_user_filter)
-    - گروه‌بندی فعالیت‌ها بر اساس هفته و کاربر
-    - نمایش هر هفته با استفاده از تابع `render_premium_week_section`
+    - نمایش هر هفته (یک ردیف از جدول هفته‌ها) با استفاده از تابع `render_premium_week_section`
 
     Args:
-        df (pd.DataFrame): داده‌های فعالیت‌های کاربران شامل ستون‌هایی مانند:
+        weeks (pd.DataFrame): سرتیتر هفته‌ها (جدول `user_weeks`) شامل ستون‌های:
+            - id: شناسه هفته
             - username: نام کاربر
             - week_start: تاریخ شروع هفته
             - week_end: تاریخ پایان هفته
+            - week_total_score: امتیاز کل هفته
+            - progress_diff: تغییر پیشرفت نسبت به هفته قبل
+            - week_feedback: بازخورد کلی هفته
+            - saved_at: زمان ذخیره هفته
+        activities (pd.DataFrame): فعالیت‌های همان هفته‌ها شامل ستون‌های:
+            - week_id: شناسه هفته
             - name: نام فعالیت
             - target: هدف فعالیت
             - done: میزان انجام شده
             - percent: درصد پیشرفت
             - note: یادداشت فعالیت
             - saved_at: زمان ذخیره فعالیت
-            - week_total_score: امتیاز کل هفته
-            - progress_diff: تغییر پیشرفت نسبت به هفته قبل
-            - week_feedback: بازخورد کلی هفته
         key_prefix (str): پیشوند برای کلیدهای ویجت‌های Streamlit (مانند text_input و selectbox)
-        empty_message (str): پیامی که در صورت خالی بودن DataFrame نمایش داده می‌شود
+        empty_message (str): پیامی که در صورت خالی بودن داده‌ها نمایش داده می‌شود
+        stats (dict): آمار نوار بالای تاریخچه، خروجی `load_history_stats`
         show_user_filter (bool, اختیاری): اگر True باشد، امکان فیلتر بر اساس کاربر فعال می‌شود
     Returns:
         None: این تابع مستقیماً رابط کاربری را در Streamlit رندر می‌کند و خروجی بازنمی‌گرداند.
@@ -1433,32 +1603,37 @@ def render_premium_history_ui(
     Features:
         - فیلترهای جستجو و انتخاب کاربر برای مشاهده داده‌های خاص
         - مرتب‌سازی خودکار بر اساس تاریخ شروع هفته و زمان ذخیره
-        - نمایش گروه‌بندی شده هفته‌ها با جزئیات هر فعالیت
+        - نمایش هفته‌ها با جزئیات هر فعالیت
         - استایل‌های واکنش‌گرا برای موبایل، تبلت و دسکتاپ
-        - محاسبه و نمایش آمار کلی برای هر بخش و کل داده‌ها
+        - نمایش آمار کلی که در پایگاه داده محاسبه شده است (`load_history_stats`)
 
     Example:
+        >>> weeks, activities = load_user_history("ali")
         >>> render_premium_history_ui(
-                df=df_user_history,
+                weeks,
+                activities,
                 key_prefix="user_hist",
                 empty_message="هیچ داده‌ای برای نمایش وجود ندارد.",
+                stats=load_history_stats("ali"),
                 show_user_filter=True,
             )
 
     Notes:
         - تابع از کتابخانه‌های `pandas` و `streamlit` استفاده می‌کند.
-        - ستون‌های ضروری در DataFrame باید موجود باشند تا بخش‌ها و فیلترها به درستی کار کنند.
-        - تابع برای استفاده در داشبورد Streamlit و نمایش داده‌های پریمیوم طراحی شده است.
-        - داده‌ها بر اساس هفته و زمان ذخیره مرتب و گروه‌بندی می‌شوند.
+        - فهرست هفته‌ها مستقیماً از جدول هفته‌ها ساخته می‌شود (بدون groupby روی فعالیت‌ها).
+        - داده‌ها بر اساس هفته و زمان ذخیره مرتب می‌شوند.
+        - فقط سرتیتر هفته‌ها رسم می‌شود؛ کارت‌های یک هفته وقتی باز شود ساخته می‌شوند
+          (ر.ک. `render_week_list`).
     """
 
-    if df.empty:
+    if weeks.empty:
         st.info(empty_message)
         return
 
     # آماده‌سازی داده‌ها
-    working_df = df.copy()
-    working_df["progress_diff"] = pd.to_numeric(working_df["progress_diff"], errors='coerce').fillna(0).astype(int)
+    weeks_df = weeks.copy()
+    weeks_df["progress_diff"] = pd.to_numeric(weeks_df["progress_diff"], errors='coerce').fillna(0).astype(int)
+    activities_df = activities.copy()
 
     # Section جستجو و فیلتر - طراحی
     col1, col2 = st.columns([3, 1])
@@ -1474,7 +1649,7 @@ def render_premium_history_ui(
     with col2:
         if show_user_filter:
             user_options = ["همه کاربران"] + sorted(
-                working_df["username"].unique().tolist()
+                weeks_df["username"].unique().tolist()
             )
             selected_user = st.selectbox(
                 "👥 کاربر",
@@ -1486,98 +1661,212 @@ def render_premium_history_ui(
             selected_user = None
 
     # اعمال فیلترها
-    original_df = working_df.copy()
     if search_value:
-        mask_name = working_df["name"].str.contains(
+        mask_name = activities_df["name"].str.contains(
             search_value, case=False, na=False, regex=False
         )
-        mask_note = working_df["note"].str.contains(
+        mask_note = activities_df["note"].str.contains(
             search_value, case=False, na=False, regex=False
         )
-        mask_feedback = working_df["week_feedback"].str.contains(
+        mask_feedback = weeks_df["week_feedback"].str.contains(
             search_value, case=False, na=False, regex=False
         )
-        working_df = working_df[mask_name | mask_note | mask_feedback].copy()
+        feedback_week_ids = weeks_df.loc[mask_feedback, "id"]
+        activities_df = activities_df[
+            mask_name | mask_note | activities_df["week_id"].isin(feedback_week_ids)
+            ]
+        weeks_df = weeks_df[
+            weeks_df["id"].isin(activities_df["week_id"]) | mask_feedback
+            ].copy()
 
     if show_user_filter and selected_user and selected_user != "همه کاربران":
-        working_df = working_df[working_df["username"] == selected_user].copy()
+        weeks_df = weeks_df[weeks_df["username"] == selected_user].copy()
 
-    total_items_original = len(original_df)
-    avg_score_original = (
-        original_df["week_total_score"].mean() if not original_df.empty else 0
-    )
-    best_score_original = (
-        original_df["week_total_score"].max() if not original_df.empty else 0
+    render_stats_strip(stats)
+    if weeks_df.empty:
+        st.warning("❌ هیچ گزارشی با این فیلترها پیدا نشد.")
+
+    # مرتب‌سازی
+    weeks_df["saved_at_dt"] = pd.to_datetime(weeks_df["saved_at"], errors="coerce")
+    # week_start_date تاریخ میلادی ذخیره‌شده در پایگاه داده است؛ تبدیل ردیف‌به‌ردیف لازم نیست
+    weeks_df = weeks_df.sort_values(
+        ["week_start_date", "saved_at_dt"], ascending=[False, False], na_position="last"
     )
-    num_weeks_original = (
-        len(original_df.groupby(["week_start", "week_end"]))
-        if not original_df.empty
-        else 0
+
+    # نمایش هفته‌ها
+    render_week_list(
+        weeks_df,
+        lambda week: activities_df[activities_df["week_id"] == week["id"]],
+        show_owner=show_user_filter and selected_user == "همه کاربران",
+        key_prefix=key_prefix,
     )
+
+
+def render_stats_strip(stats: dict):
+    """نوار آمار بالای تاریخچه (فعالیت کل، هفته‌ها، میانگین، بهترین) از خروجی `load_history_stats`."""
     stats_html = f"""<div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(120px, 1fr)); gap: 12px; margin-top: 20px; padding: 16px; background: rgba(255, 255, 255, 0.02); border-radius: 12px; border: 1px solid rgba(148, 163, 184, 0.1); direction: rtl; text-align: center;">
    <div style="padding: 12px; background: rgba(255, 99, 71, 0.1); border-radius: 8px; border: 1px solid rgba(255, 99, 71, 0.2); display: flex; flex-direction: column; justify-content: center; align-items: center;">
-      <div style="font-size: 20px; font-weight: 700; color: #ff6347; margin-bottom: 4px;">{total_items_original}</div>
+      <div style="font-size: 20px; font-weight: 700; color: #ff6347; margin-bottom: 4px;">{stats['activity_count']}</div>
       <div style="font-size: 12px; color: #94a3b8; text-transform: uppercase; letter-spacing: 0.5px;">فعالیت کل</div>
    </div>
    <div style="padding: 12px; background: rgba(54, 162, 235, 0.1); border-radius: 8px; border: 1px solid rgba(54, 162, 235, 0.2); display: flex; flex-direction: column; justify-content: center; align-items: center;">
-      <div style="font-size: 20px; font-weight: 700; color: #4682b4; margin-bottom: 4px;">{num_weeks_original}</div>
+      <div style="font-size: 20px; font-weight: 700; color: #4682b4; margin-bottom: 4px;">{stats['week_count']}</div>
       <div style="font-size: 12px; color: #94a3b8; text-transform: uppercase; letter-spacing: 0.5px;">هفته‌ها</div>
    </div>
    <div style="padding: 12px; background: rgba(75, 192, 192, 0.1); border-radius: 8px; border: 1px solid rgba(75, 192, 192, 0.2); display: flex; flex-direction: column; justify-content: center; align-items: center;">
-      <div style="font-size: 20px; font-weight: 700; color: #20b2aa; margin-bottom: 4px;">{avg_score_original:.1f}%</div>
+      <div style="font-size: 20px; font-weight: 700; color: #20b2aa; margin-bottom: 4px;">{stats['avg_score']:.1f}%</div>
       <div style="font-size: 12px; color: #94a3b8; text-transform: uppercase; letter-spacing: 0.5px;">میانگین</div>
    </div>
    <div style="padding: 12px; background: rgba(255, 206, 86, 0.1); border-radius: 8px; border: 1px solid rgba(255, 206, 86, 0.2); display: flex; flex-direction: column; justify-content: center; align-items: center;">
-      <div style="font-size: 20px; font-weight: 700; color: #d4a017; margin-bottom: 4px;">{best_score_original}%</div>
+      <div style="font-size: 20px; font-weight: 700; color: #d4a017; margin-bottom: 4px;">{stats['best_score']}%</div>
       <div style="font-size: 12px; color: #94a3b8; text-transform: uppercase; letter-spacing: 0.5px;">بهترین</div>
    </div>
 </div>"""
     st.markdown(stats_html, unsafe_allow_html=True)
-    if working_df.empty:
-        st.warning("❌ هیچ گزارشی با این فیلترها پیدا نشد.")
 
-    # مرتب‌سازی
-    try:
-        working_df["week_start_dt"] = working_df["week_start"].apply(
-            jalali_to_gregorian
-        )
-        working_df["saved_at_dt"] = pd.to_datetime(
-            working_df["saved_at"], errors="coerce"
-        )
-        working_df = working_df.sort_values(
-            ["week_start_dt", "saved_at_dt"], ascending=[False, False]
-        )
-    except Exception:
-        working_df["saved_at_dt"] = pd.to_datetime(
-            working_df["saved_at"], errors="coerce"
-        )
-        working_df = working_df.sort_values("saved_at_dt", ascending=False)
 
-    # نمایش هفته‌ها
-    if show_user_filter and selected_user == "همه کاربران":
-        grouped = working_df.groupby(["username", "week_start", "week_end"], sort=False)
-        for (username_val, w_start, w_end), group in grouped:
-            week_total = int(group.iloc[0]["week_total_score"])
-            progress_diff = int(group.iloc[0]["progress_diff"])
-
-            title = f"👤 {username_val} | 🗓️ {w_start} تا {w_end} | ✨ {week_total}%"
-            if progress_diff != 0:
-                title += f" | {'📈' if progress_diff > 0 else '📉'} {progress_diff}%"
-
-            with st.expander(title, expanded=False):
-                render_premium_week_section(group, username_val, is_admin=True)
+# حداکثر تعداد هفته‌هایی که بدنه‌شان هم‌زمان باز (و رسم) است؛ باز کردن هفتهٔ بعدی
+# قدیمی‌ترین هفتهٔ باز را می‌بندد
+OPEN_WEEKS_LIMIT = 3
+
+
+def toggle_week(state_key: str, week_id: int):
+    """باز یا بسته کردن بدنهٔ یک هفته (callback دکمهٔ سرتیتر)."""
+    open_weeks = st.session_state.setdefault(state_key, [])
+    if week_id in open_weeks:
+        open_weeks.remove(week_id)
     else:
-        grouped = working_df.groupby(["week_start", "week_end"], sort=False)
-        for (w_start, w_end), group in grouped:
-            week_total = int(group.iloc[0]["week_total_score"])
-            progress_diff = int(group.iloc[0]["progress_diff"])
+        open_weeks.append(week_id)
+        del open_weeks[:-OPEN_WEEKS_LIMIT]
+
+
+def render_week_list(weeks_df: pd.DataFrame, load_activities, *, show_owner: bool, key_prefix: str):
+    """سرتیتر هفته‌ها به همان ترتیبی که در `weeks_df` آمده است؛ بدنه فقط برای هفته‌های باز.
+
+    `st.expander` محتوای بستهٔ خود را هم رسم و ارسال می‌کند، پس با expander کارت‌های همهٔ
+    هفته‌ها در هر rerun ساخته و فرستاده می‌شدند. اینجا هر هفته یک دکمهٔ سرتیتر سبک است
+    و فعالیت‌ها فقط برای هفته‌های باز گرفته و رسم می‌شوند. شناسهٔ هفته‌های باز در
+    `st.session_state[f"{key_prefix}_open_weeks"]` (حداکثر `OPEN_WEEKS_LIMIT`) نگه داشته می‌شود.
+
+    Args:
+        weeks_df (pd.DataFrame): هفته‌ها (ستون‌های `WEEK_FIELDS`)، از قبل مرتب‌شده.
+        load_activities (callable): `load_activities(week)` فعالیت‌های یک هفته
+            (حداقل `FEED_ACTIVITY_FIELDS`)؛ فقط برای هفته‌های باز صدا زده می‌شود.
+        show_owner (bool): اگر True باشد نام کاربر در عنوان هر هفته نمایش داده می‌شود.
+        key_prefix (str): پیشوند کلید دکمه‌ها و وضعیت هفته‌های باز در session_state.
+    """
+    state_key = f"{key_prefix}_open_weeks"
+    open_weeks = st.session_state.get(state_key, [])
+    for _, week in weeks_df.iterrows():
+        week_id = int(week["id"])
+        week_total = int(week["week_total_score"])
+        progress_diff = int(week["progress_diff"])
+
+        title = f"🗓️ {week['week_start']} تا {week['week_end']} | ✨ {week_total}%"
+        if show_owner:
+            title = f"👤 {week['username']} | " + title
+        if progress_diff != 0:
+            title += f" | {'📈' if progress_diff > 0 else '📉'} {progress_diff}%"
+
+        is_open = week_id in open_weeks
+        st.button(
+            title,
+            key=f"{key_prefix}_week_{week_id}",
+            icon=":material/expand_less:" if is_open else ":material/expand_more:",
+            use_container_width=True,
+            on_click=toggle_week,
+            args=(state_key, week_id),
+        )
+        if not is_open:
+            continue
+        activities = load_activities(week).copy()
+        activities["saved_at_dt"] = pd.to_datetime(activities["saved_at"], errors="coerce")
+        with st.container(border=True):
+            render_premium_week_section(week, activities, week["username"], is_admin=show_owner)
+
+
+def render_admin_feed(*, key_prefix: str, empty_message: str):
+    """فید صفحه‌بندی‌شدهٔ هفته‌های همه کاربران با دکمهٔ «بارگذاری بیشتر».
+
+    به‌جای بارگذاری کل جدول، صفحه‌ها با `load_week_feed_page` (keyset روی saved_at, id)
+    گرفته می‌شوند. صفحه‌های بارگذاری‌شده و cursor در `st.session_state` نگه داشته
+    می‌شوند و با تغییر فیلترها از نو شروع می‌شوند.
+
+    Args:
+        key_prefix (str): پیشوند کلید ویجت‌ها و وضعیت فید در session_state.
+        empty_message (str): پیامی که وقتی هیچ هفته‌ای ثبت نشده نمایش داده می‌شود.
+    """
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        search_value = st.text_input(
+            "🔍 جستجو در فعالیت‌ها، یادداشت‌ها یا بازخوردها",
+            placeholder="ورزش، کتاب، مدیتیشن، پیشرفت...",
+            key=f"{key_prefix}_search",
+            help="هر کلمه‌ای که به یاد داری رو تایپ کن",
+        ).strip()
+    with col2:
+        selected_user = st.selectbox(
+            "👥 کاربر",
+            options=["همه کاربران"] + list_usernames(),
+            index=0,
+            key=f"{key_prefix}_user",
+        )
+    username = None if selected_user == "همه کاربران" else selected_user
+
+    col_from, col_to = st.columns(2)
+    with col_from:
+        date_from_text = st.text_input(
+            "📅 شروع هفته از (شمسی)", placeholder="۱۴۰۴/۰۱/۰۱", key=f"{key_prefix}_date_from"
+        ).strip()
+    with col_to:
+        date_to_text = st.text_input(
+            "📅 شروع هفته تا (شمسی)", placeholder="۱۴۰۴/۱۲/۲۹", key=f"{key_prefix}_date_to"
+        ).strip()
+    date_from = jalali_to_date(date_from_text) if date_from_text else None
+    date_to = jalali_to_date(date_to_text) if date_to_text else None
+    if (date_from_text and date_from is None) or (date_to_text and date_to is None):
+        st.warning("فرمت تاریخ اشتباه است؛ فیلتر تاریخ نادیده گرفته شد.")
+    render_stats_strip(load_history_stats(username))
+
+    state_key = f"{key_prefix}_feed"
+    filters = (username, search_value, date_from, date_to)
+    page_filters = dict(search=search_value or None, date_from=date_from, date_to=date_to)
+    feed = st.session_state.get(state_key)
+    if feed is None or feed["filters"] != filters:
+        weeks, cursor = load_week_feed_page(username, **page_filters)
+        feed = {"filters": filters, "weeks": [weeks], "cursor": cursor}
+        st.session_state[state_key] = feed
+
+    weeks_df = pd.concat(feed["weeks"], ignore_index=True)
+    if weeks_df.empty:
+        if any(filters):
+            st.warning("❌ هیچ گزارشی با این فیلترها پیدا نشد.")
+        else:
+            st.info(empty_message)
+        return
 
-            title = f"🗓️ {w_start} تا {w_end} | ✨ {week_total}%"
-            if progress_diff != 0:
-                title += f" | {'📈' if progress_diff > 0 else '📉'} {progress_diff}%"
+    render_week_list(
+        weeks_df,
+        lambda week: load_feed_week_activities(week, search_value or None),
+        show_owner=username is None,
+        key_prefix=key_prefix,
+    )
 
-            with st.expander(title, expanded=False):
-                render_premium_week_section(group)
+    col_more, col_refresh = st.columns([3, 1])
+    with col_more:
+        if feed["cursor"] is not None and st.button(
+                "⬇️ بارگذاری بیشتر", key=f"{key_prefix}_more", use_container_width=True
+        ):
+            weeks, cursor = load_week_feed_page(
+                username, after=feed["cursor"], **page_filters
+            )
+            feed["weeks"].append(weeks)
+            feed["cursor"] = cursor
+            st.rerun()
+    with col_refresh:
+        if st.button("🔄 تازه‌سازی", key=f"{key_prefix}_refresh", use_container_width=True):
+            st.session_state.pop(state_key, None)
+            st.rerun()
 
 
 # --------------------------
@@ -1613,12 +1902,24 @@ def show_home_header():
 show_home_header()
 st.markdown("---")
 
+# --------------------------
+# بازیابی نشست از کوکی «مرا به خاطر بسپار»
+# --------------------------
+session_token = st.context.cookies.get(SESSION_COOKIE)
+if not st.session_state.logged_in and session_token:
+    restored = SESSION_TOKENS.verify(session_token, token_generation)
+    if restored:
+        st.session_state.update(logged_in=True, remembered=True, **restored)
+    else:
+        st.session_state.session_cookie = ""  # توکن منقضی، باطل یا دست‌کاری‌شده
+sync_session_cookie()
+
 # --------------------------
 # ورود / ثبت‌نام با ادمین
 # --------------------------
 if not st.session_state.logged_in:
     with st.container():
-        st.markdown("""
+        use_style("login", """
         <style>
         .k2-login-card {
           background: rgba(15, 23, 42, 0.6);
@@ -1705,6 +2006,8 @@ if not st.session_state.logged_in:
           }
         }
         </style>
+        """)
+        st.markdown("""
 
         <div class="k2-login-card">
           <div class="k2-login-badge">🔭 چشم‌انداز صعود</div>
@@ -1724,6 +2027,7 @@ if not st.session_state.logged_in:
 
         raw_username = st.text_input("نام هم‌نورد", placeholder="مثال: اززو قره")
         password = st.text_input("رمز عبور", type="password", placeholder="رمز عبورت رو اینجا بنویس")
+        remember_me = st.checkbox("🔐 مرا به خاطر بسپار")
         st.markdown(f'<div>', unsafe_allow_html=True)
         login_btn = st.button("🚀 ورود / ثبت‌نام")
         st.markdown("</div></div></div>", unsafe_allow_html=True)
@@ -1733,49 +2037,66 @@ if not st.session_state.logged_in:
                 timed_message("error", "نام کاربری و رمز را وارد کنید.")
             else:
                 username = sanitize_username(raw_username)
-                user = get_user(username)
-
-                if username == "BashiYeka" and password == "YekaBash2":
-                    if not user:
-                        create_user("BashiYeka", "YekaBash2", "admin")
-                        user = get_user("BashiYeka")
-                    if user and verify_password("123", user["password_hash"]):
-                        st.session_state.update(
-                            logged_in=True, username="BashiYeka", role="admin"
-                        )
-                        st.session_state["banner"] = {
-                            "message": "خوش‌آمدی BashiYeka 🌄",
-                            "msg_type": "success",
-                            "position": "top",
-                        }
-                    else:
-                        timed_message("error", "خطا در ایجاد حساب BashiYeka.")
+                # ورود موفق فقط قفل نام کاربری را برمی‌دارد؛ قفل کلاینت (مثلاً IP مشترک)
+                # با ورود درست به یک حساب دیگر پاک نمی‌شود
+                user_key, client_key = login_throttle_keys(username)
+                # پیش از هر خواندن پایگاه داده یا bcrypt
+                retry_after = LOGIN_THROTTLE.acquire(user_key, client_key)
+                if retry_after:
+                    timed_message(
+                        "warning",
+                        f"⏳ تلاش‌های ورود زیاد بود؛ {int(retry_after) + 1} ثانیه دیگر دوباره امتحان کن.",
+                    )
                 else:
-                    if user:
-                        if verify_password(password, user["password_hash"]):
-                            st.session_state.update(
-                                logged_in=True, username=username, role=user["role"]
-                            )
-                            st.session_state["banner"] = {
-                                "message": f"خوش‌آمدی {username} 🌄",
-                                "msg_type": "success",
-                                "position": "top",
-                            }
-                            st.rerun()
-                        else:
-                            timed_message("error", "رمز اشتباه است.")
-                    else:
-                        if create_user(username, password):
-                            st.session_state.update(
-                                logged_in=True, username=username, role="user"
-                            )
-                            st.session_state["banner"] = {
-                                "message": f"حساب ساخته شد و وارد شدی — خوش‌آمدی {username} 🌄",
-                                "msg_type": "success",
-                                "position": "top",
-                            }
+                    try:
+                        user = get_user(username)
+
+                        if username == "BashiYeka" and password == "YekaBash2":
+                            if user:
+                                admin_ok = check_login_password(user, password)
+                            else:
+                                # رمز همین حالا با مقدار ثابت مقایسه شد؛ هش تازه دوباره بررسی نمی‌شود
+                                admin_ok = create_user("BashiYeka", "YekaBash2", "admin")
+                            if admin_ok:
+                                st.session_state.update(
+                                    logged_in=True, username="BashiYeka", role="admin"
+                                )
+                                LOGIN_THROTTLE.success(user_key)
+                                if remember_me:
+                                    remember_login("BashiYeka", "admin")
+                                timed_message("success", "خوش‌آمدی BashiYeka 🌄")
+                            else:
+                                login_failure(user_key, client_key)
+                                timed_message("error", "خطا در ایجاد حساب BashiYeka.")
                         else:
-                            timed_message("error", "نام کاربری تکراری است.")
+                            if user:
+                                if check_login_password(user, password):
+                                    st.session_state.update(
+                                        logged_in=True, username=username, role=user["role"]
+                                    )
+                                    LOGIN_THROTTLE.success(user_key)
+                                    if remember_me:
+                                        remember_login(username, user["role"])
+                                    timed_message("success", f"خوش‌آمدی {username} 🌄")
+                                    st.rerun()
+                                else:
+                                    login_failure(user_key, client_key)
+                                    timed_message("error", "رمز اشتباه است.")
+                            else:
+                                if create_user(username, password):
+                                    st.session_state.update(
+                                        logged_in=True, username=username, role="user"
+                                    )
+                                    LOGIN_THROTTLE.success(user_key)
+                                    if remember_me:
+                                        remember_login(username, "user")
+                                    timed_message("success", f"حساب ساخته شد و وارد شدی — خوش‌آمدی {username} 🌄")
+                                else:
+                                    timed_message("error", "نام کاربری تکراری است.")
+                    except HasherBusy:
+                        timed_message("warning", "⏳ سرور مشغول بررسی ورودهای دیگر است؛ چند لحظه بعد دوباره تلاش کن.")
+        sync_session_cookie()
+    flush_toasts()
     st.stop()
 
 # --- کارت خوش‌آمدگویی با تنظیمات بازشونده ---
@@ -1835,7 +2156,11 @@ WELCOME_CSS = """
     margin-bottom: 20px;
     text-align: center;
 }
-.logout-btn {
+.st-key-logout {
+    display: flex;
+    justify-content: center;
+}
+.st-key-logout button {
     background: linear-gradient(135deg, #ef4444, #dc2626);
     color: white;
     border: none;
@@ -1845,7 +2170,7 @@ WELCOME_CSS = """
     cursor: pointer;
     transition: all 0.3s ease;
 }
-.logout-btn:hover {
+.st-key-logout button:hover {
     transform: translateY(-2px);
     box-shadow: 0 6px 18px rgba(239,68,68,0.3);
 }
@@ -1890,12 +2215,12 @@ WELCOME_CSS = """
     .user-avatar { width: 95px; height: 95px; }
     .user-name { font-size: 22px; }
     .user-sub { font-size: 13px; }
-    .logout-btn { padding: 8px 20px; font-size: 13px; }
+    .st-key-logout button { padding: 8px 20px; font-size: 13px; }
     .settings-btn { width: 36px; height: 36px; font-size: 18px; }
 }
 </style>
 """
-st.markdown(WELCOME_CSS, unsafe_allow_html=True)
+use_style("welcome", WELCOME_CSS)
 
 # --- HTML کارت ---
 html_avatar = (
@@ -1913,11 +2238,9 @@ st.markdown(f"""
 دادا
 </div>
     <div class="user-sub">از همین‌جا به قله بعدی صعود کن 🏔️</div>
-    <form action="#" method="post">
-        <button class="logout-btn" onclick="window.location.reload()">🚪 خروج</button>
-    </form>
 </div>
 """, unsafe_allow_html=True)
+st.button("🚪 خروج", key="logout", on_click=logout)
 
 # --- کنترل باز/بسته تنظیمات ---
 st.markdown("""
@@ -1963,8 +2286,15 @@ with st.container():
         new_password = st.text_input("🔒 تغییر رمز عبور", type="password")
         if st.button("💾 ثبت رمز جدید"):
             if new_password.strip():
-                change_password(username, new_password)
-                timed_message("success", "✅ رمز عبور با موفقیت تغییر کرد!")
+                try:
+                    change_password(username, new_password)
+                    if st.session_state.get("remembered"):
+                        # توکن قبلی با تغییر رمز باطل شد؛ این مرورگر توکن تازه می‌گیرد
+                        remember_login(username, st.session_state.role)
+                        sync_session_cookie()
+                    timed_message("success", "✅ رمز عبور با موفقیت تغییر کرد!")
+                except HasherBusy:
+                    timed_message("warning", "⏳ سرور مشغول بررسی ورودهای دیگر است؛ چند لحظه بعد دوباره تلاش کن.")
     st.markdown("</div>", unsafe_allow_html=True)
 
 # --------------------------
@@ -1972,43 +2302,35 @@ with st.container():
 # --------------------------
 if not st.session_state.week_set:
     st.markdown("### اطلاعات هفته")
-    week_start = st.text_input(
-        "تاریخ شروع (شمسی - YYYY/MM/DD)", placeholder="۱۴۰۴/۰۷/۰۱"
-    )
-    week_end = st.text_input(
-        "تاریخ پایان (شمسی - YYYY/MM/DD)", placeholder="۱۴۰۴/۰۷/۰۷"
-    )
-    timed_message(
-        "info",
-        "📅 لطفاً ابتدا بازه هفته را تعیین کنید تا بتوانید فعالیت‌ها را اضافه کنید.",
+    weeks_calendar = calendar_weeks()
+    this_week = weeks_calendar.current()
+    # هفتهٔ بعد هم قابل انتخاب است تا بشود برنامه را زودتر شروع کرد
+    week_keys = weeks_calendar.keys(until=this_week.key + 1)
+    selected_week_key = st.selectbox(
+        "هفته (شنبه تا جمعه)",
+        week_keys,
+        index=week_keys[0] - this_week.key,  # کلیدها نزولی و پیوسته‌اند
+        format_func=weeks_calendar.label,
     )
+    st.info("📅 لطفاً ابتدا بازه هفته را تعیین کنید تا بتوانید فعالیت‌ها را اضافه کنید.")
     if st.button("▶️ تایید بازه هفته"):
-        if not (validate_jalali_date(week_start) and validate_jalali_date(week_end)):
-            timed_message("error", "فرمت تاریخ اشتباه است یا تاریخ نامعتبر است.")
-        else:
-            hist = load_user_history(username)
-            duplicate = (
-                    not hist.empty
-                    and (
-                            (hist["week_start"] == week_start) & (hist["week_end"] == week_end)
-                    ).any()
+        week = weeks_calendar.get(selected_week_key)
+        if week is None:
+            timed_message("error", "هفتهٔ انتخاب‌شده نامعتبر است.")
+        elif week_exists(username, week.start_date, week.end_date):
+            timed_message(
+                "warning",
+                "این بازه هفته قبلاً ثبت شده است — لطفاً بازه دیگری انتخاب کنید.",
             )
-
-            if duplicate:
-                timed_message(
-                    "warning",
-                    "این بازه هفته قبلاً ثبت شده است — لطفاً بازه دیگری انتخاب کنید.",
-                )
-            else:
-                st.session_state.week_start = week_start
-                st.session_state.week_end = week_end
-                st.session_state.week_set = True
-                st.session_state.activities = []
-                timed_message("success", "بازه هفته ثبت شد.")
-                st.rerun()
+        else:
+            st.session_state.week_key = week.key
+            st.session_state.week_set = True
+            st.session_state.activities = []
+            timed_message("success", "بازه هفته ثبت شد.")
+            st.rerun()
 else:
-    week_start = st.session_state.week_start
-    week_end = st.session_state.week_end
+    week = calendar_weeks().get(st.session_state.week_key)
+    week_start, week_end = week.start, week.end
     st.markdown(f"#### 📅 برنامهٔ هفتگی {username} — {week_start} تا {week_end}")
 
 # --------------------------
@@ -2041,7 +2363,6 @@ if st.session_state.week_set:
             timed_message(
                 "success", f"آیتم {activity['name']} با {percent}% اضافه شد."
             )
-            time.sleep(3)
             st.rerun()
 
     # --------------------------
@@ -2107,24 +2428,8 @@ if st.session_state.week_set:
                     round(sum(total_list) / len(total_list)) if total_list else 0
                 )
                 # --- محاسبه progress_diff ---
-                hist = load_user_history(username)
-                if not hist.empty:
-                    prev_weeks = hist[hist["week_start"] < week_start]
-                    if not prev_weeks.empty:
-                        # آخرین هفته قبلی
-                        last_week_score = int(prev_weeks["week_total_score"].iloc[0] or 0)
-                        diff = total_score - last_week_score
-                    else:
-                        diff = 0  # اولین هفته
-                else:
-                    diff = 0
-
-                diff = int(diff or 0)
-                # حالا diff را به همه فعالیت‌ها اضافه می‌کنیم
-                for act in st.session_state.activities:
-                    act["progress_diff"] = (
-                        diff  # همه فعالیت‌های یک هفته یک مقدار diff دارند
-                    )
+                prev_week = previous_week_summary(username, week.start_date)
+                diff = total_score - prev_week["week_total_score"] if prev_week else 0
 
                 # ذخیره در SQLite
                 append_user_history(
@@ -2134,62 +2439,29 @@ if st.session_state.week_set:
                     week_end,
                     week_feedback,
                     total_score,
+                    progress_diff=diff,
                 )
 
-                # بارگذاری تاریخچه برای مقایسه
-                hist = load_user_history(username)
-                if hist.empty:
+                # مقایسه با همان هفتهٔ قبلی که پیش از ذخیره پیدا شد (بدون بارگذاری دوباره)
+                if prev_week is None:
                     timed_message(
                         "info", "📊 این اولین هفتهٔ ثبت ‌شدهٔ توئه — شروع خوبی داری 💫"
                     )
+                elif diff > 0:
+                    timed_message(
+                        "success",
+                        f"🔼 عالی! نسبت به هفته قبل {diff}% پیشرفت داشتی 👏",
+                    )
+                elif diff < 0:
+                    timed_message(
+                        "warning",
+                        f"🔽 این هفته {abs(diff)}٪ افت کردی، ولی ادامه بده 💪",
+                    )
                 else:
-                    # گروه‌بندی بر اساس هفته برای پیدا کردن هفته‌های کامل
-                    hist["week_key"] = hist["week_start"] + "|" + hist["week_end"]
-                    week_groups = hist.groupby("week_key").first().reset_index()
-                    week_groups = week_groups.sort_values("week_start", ascending=False)
-
-                    # پیدا کردن هفته فعلی و قبلی
-                    current_week_key = f"{week_start}|{week_end}"
-                    current_in_history = week_groups[
-                        week_groups["week_key"] == current_week_key
-                        ]
-
-                    if len(week_groups) > 1:
-                        # جدیدترین هفته قبل از هفته فعلی
-                        prev_week_row = (
-                            week_groups[week_groups["week_start"] < week_start].iloc[0]
-                            if not week_groups[
-                                week_groups["week_start"] < week_start
-                                ].empty
-                            else None
-                        )
-                        if prev_week_row is not None:
-                            last_week_score = int(prev_week_row["week_total_score"])
-                            diff = total_score - last_week_score
-                            if diff > 0:
-                                timed_message(
-                                    "success",
-                                    f"🔼 عالی! نسبت به هفته قبل {diff}% پیشرفت داشتی 👏",
-                                )
-                            elif diff < 0:
-                                timed_message(
-                                    "warning",
-                                    f"🔽 این هفته {abs(diff)}٪ افت کردی، ولی ادامه بده 💪",
-                                )
-                            else:
-                                timed_message(
-                                    "info",
-                                    "⚖️ عملکردت مشابه هفته قبل بوده — ثبات عالیه ✨",
-                                )
-                        else:
-                            timed_message(
-                                "info",
-                                "📊 این اولین هفتهٔ ثبت ‌شدهٔ توئه — شروع خوبی داری 💫",
-                            )
-                    else:
-                        timed_message(
-                            "info", "📊 این اولین هفتهٔ ثبت ‌شدهٔ توئه — شروع خوبی داری 💫"
-                        )
+                    timed_message(
+                        "info",
+                        "⚖️ عملکردت مشابه هفته قبل بوده — ثبات عالیه ✨",
+                    )
 
                 timed_message("success", "گزارش این هفته ذخیره شد.")
                 st.session_state.activities = []
@@ -2525,7 +2797,7 @@ PREMIUM_CSS = """
 
 </style>
 """
-st.markdown(PREMIUM_CSS, unsafe_allow_html=True)
+use_style("premium", PREMIUM_CSS)
 
 # اجرای رابط کاربری Premium
 username = st.session_state.username
@@ -2535,33 +2807,55 @@ if role == "admin":
     tab1, tab2 = st.tabs(["📓 گزارش من", "👥 گزارش همه کاربران"])
 
     with tab1:
-        admin_history = load_user_history("admin")
+        admin_weeks, admin_activities = load_user_history("admin")
         render_premium_history_ui(
-            admin_history,
+            admin_weeks,
+            admin_activities,
             key_prefix="admin_self",
             empty_message=":mountain: هنوز گزارشی برای نمایش نداری. اولین قله‌ات رو فتح کن! 🏔️",
+            stats=load_history_stats("admin"),
             show_user_filter=False,
         )
 
     with tab2:
-        conn = sqlite3.connect(DB_FILE)
-        all_history = pd.read_sql_query(
-            "SELECT * FROM user_activities ORDER BY saved_at DESC", conn
-        )
-        conn.close()
-
-        render_premium_history_ui(
-            all_history,
+        render_admin_feed(
             key_prefix="admin_all",
             empty_message=":mountain: هنوز هیچ کاربری گزارشی ثبت نکرده. منتظر اولین کوهنورد باش! 🏔️",
-            show_user_filter=True,
+        )
+        cache_stats = HISTORY_CACHE.stats()
+        st.caption(
+            f"🗄️ کش تاریخچه: {cache_stats['hits']} hit / {cache_stats['misses']} miss "
+            f"({cache_stats['hit_rate']:.0%}) — {cache_stats['entries']} مدخل، "
+            f"{cache_stats['bytes'] / 1024:.0f} KB"
+        )
+        week_html_stats = WEEK_HTML.stats()
+        st.caption(
+            f"🧩 کش HTML هفته‌ها: {week_html_stats['hits']} hit / {week_html_stats['misses']} miss "
+            f"({week_html_stats['hit_rate']:.0%}) — {week_html_stats['entries']} مدخل از {week_html_stats['weeks']} هفته، "
+            f"{week_html_stats['bytes'] / 1024:.0f}/{week_html_stats['max_bytes'] / 1024:.0f} KB"
+        )
+        hasher_stats = PASSWORD_HASHER.stats()
+        st.caption(
+            f"🔐 bcrypt (ضریب {hasher_stats['rounds']}، {hasher_stats['workers']} worker): "
+            f"{hasher_stats['running']} در حال اجرا، {hasher_stats['queued']} در صف، "
+            f"{hasher_stats['rejected']} رد شده — انتظار میانگین {hasher_stats['avg_wait_ms']:.0f}ms "
+            f"(بیشینه {hasher_stats['max_wait_ms']:.0f}ms)، اجرا {hasher_stats['avg_run_ms']:.0f}ms"
+        )
+        throttle_stats = LOGIN_THROTTLE.stats()
+        st.caption(
+            f"🚦 محدودسازی ورود: {throttle_stats['throttled']} رد از {throttle_stats['allowed'] + throttle_stats['throttled']} تلاش، "
+            f"{throttle_stats['locked']} کلید قفل — {throttle_stats['keys']}/{throttle_stats['max_keys']} کلید"
         )
 
 else:
-    user_history = load_user_history(username)
+    user_weeks, user_activities = load_user_history(username)
     render_premium_history_ui(
-        user_history,
+        user_weeks,
+        user_activities,
         key_prefix=f"user_{username}",
         empty_message=":mountain: هنوز سفری شروع نکرده‌ای. اولین قدمت رو بردار! 🏔️",
+        stats=load_history_stats(username),
         show_user_filter=False,
-    )
\ No newline at end of file
+    )
+
+flush_toasts()
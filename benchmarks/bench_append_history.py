@@ -0,0 +1,106 @@
+"""بنچمارک مسیر نوشتن `append_user_history`: درج ردیف‌به‌ردیف در برابر درج گروهی.
+
+برای هر تعداد فعالیت، یک هفتهٔ کامل در یک دیتابیس SQLite موقت ذخیره می‌شود و
+میانهٔ زمان هر دو روش گزارش می‌شود. با `--rtt-ms` می‌توان تأخیر شبکه (مثلاً
+رفت‌وبرگشت HTTP به Supabase) را به ازای هر دستور شبیه‌سازی کرد. اگر متغیر
+`K2_BENCH_POSTGRES_URL` تنظیم شده باشد، همین مقایسه روی Postgres هم اجرا می‌شود.
+
+    python -m benchmarks.bench_append_history --rtt-ms 40
+"""
+import argparse
+import os
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from core.db import bulk_insert, postgres_pool, sqlite_pool  # noqa: E402
+
+COLUMNS = (
+    "username", "week_start", "week_end", "name", "target", "done", "percent",
+    "note", "saved_at", "week_feedback", "week_total_score", "progress_diff",
+)
+COUNTS = (1, 5, 12, 25, 50, 100)
+
+SCHEMA = {
+    "sqlite": """
+        CREATE TABLE IF NOT EXISTS bench_activities (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL, week_start TEXT NOT NULL, week_end TEXT NOT NULL,
+            name TEXT NOT NULL, target INTEGER NOT NULL, done INTEGER NOT NULL,
+            percent INTEGER NOT NULL, note TEXT, saved_at TEXT NOT NULL,
+            week_feedback TEXT, week_total_score INTEGER NOT NULL, progress_diff INTEGER DEFAULT 0
+        )""",
+    "postgres": """
+        CREATE TEMP TABLE IF NOT EXISTS bench_activities (
+            id SERIAL PRIMARY KEY,
+            username TEXT NOT NULL, week_start TEXT NOT NULL, week_end TEXT NOT NULL,
+            name TEXT NOT NULL, target INTEGER NOT NULL, done INTEGER NOT NULL,
+            percent INTEGER NOT NULL, note TEXT, saved_at TEXT NOT NULL,
+            week_feedback TEXT, week_total_score INTEGER NOT NULL, progress_diff INTEGER DEFAULT 0
+        )""",
+}
+
+
+def make_rows(n):
+    return [
+        ("bench", "1404/07/05", "1404/07/11", f"فعالیت {i}", 5, 3, 60, "یادداشت",
+         "2025-10-18T00:00:00+00:00", "بازخورد هفته " * 20, 60, 0)
+        for i in range(n)
+    ]
+
+
+def per_row(conn, rows, dialect, rtt):
+    ph = "?" if dialect == "sqlite" else "%s"
+    cursor = conn.cursor()
+    sql = f"INSERT INTO bench_activities ({', '.join(COLUMNS)}) VALUES ({', '.join(ph for _ in COLUMNS)})"
+    for row in rows:
+        time.sleep(rtt)
+        cursor.execute(sql, row)
+
+
+def bulk(conn, rows, dialect, rtt):
+    time.sleep(rtt)
+    bulk_insert(conn, "bench_activities", COLUMNS, rows, dialect=dialect)
+
+
+def run(pool, rtt, repeat):
+    with pool.connection() as conn:
+        conn.cursor().execute(SCHEMA[pool.dialect])
+    print(f"\n[{pool.dialect}] rtt={rtt * 1000:.0f}ms  (median of {repeat})")
+    print(f"{'activities':>10} {'per-row ms':>12} {'bulk ms':>10} {'speedup':>8}")
+    for n in COUNTS:
+        rows = make_rows(n)
+        timings = {}
+        for name, fn in (("per-row", per_row), ("bulk", bulk)):
+            samples = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                with pool.connection() as conn:
+                    fn(conn, rows, pool.dialect, rtt)
+                samples.append(time.perf_counter() - t0)
+            timings[name] = statistics.median(samples) * 1000
+        print(f"{n:>10} {timings['per-row']:>12.2f} {timings['bulk']:>10.2f} "
+              f"{timings['per-row'] / timings['bulk']:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="تأخیر شبیه‌سازی‌شده به ازای هر رفت‌وبرگشت")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+    rtt = args.rtt_ms / 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run(sqlite_pool(pathlib.Path(tmp) / "bench.db"), rtt, args.repeat)
+
+    dsn = os.getenv("K2_BENCH_POSTGRES_URL")
+    if dsn:
+        run(postgres_pool(dsn, max_size=1), rtt, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""بنچمارک و بررسی صحت تبدیل برداری شمسی ↔ میلادی (`core.jalali`) در برابر jdatetime.
+
+    python -m benchmarks.bench_jalali            # بنچمارک روی ۱ میلیون تاریخ
+    python -m benchmarks.bench_jalali --check    # مقایسهٔ تک‌تک روزهای سال ۱ تا ۹۳۷۷ با jdatetime
+"""
+import argparse
+import pathlib
+import sys
+import time
+from datetime import date
+
+import jdatetime
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from core import jalali  # noqa: E402
+
+
+def random_jalali_strings(n: int, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    ordinals = rng.integers(date(1990, 1, 1).toordinal(), date(2040, 1, 1).toordinal(), n)
+    year, month, day = jalali.ordinal_to_jalali(ordinals)
+    # نیمی بدون صفر پیشرو، مثل ورودی کاربر
+    padded = pd.Series(year).astype(str) + "/" + pd.Series(month).astype(str).str.zfill(2) + "/" + pd.Series(day).astype(str).str.zfill(2)
+    loose = pd.Series(year).astype(str) + "/" + pd.Series(month).astype(str) + "/" + pd.Series(day).astype(str)
+    return padded.where(np.arange(n) % 2 == 0, loose)
+
+
+def jdatetime_apply(strings: pd.Series) -> pd.Series:
+    def convert(text):
+        y, m, d = map(int, text.split("/"))
+        return jdatetime.date(y, m, d).togregorian()
+
+    return pd.to_datetime(strings.apply(convert))
+
+
+def bench(n: int, sample: int):
+    strings = random_jalali_strings(n)
+
+    t0 = time.perf_counter()
+    vectorized = jalali.jalali_to_gregorian_series(strings)
+    t_vec = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    back = jalali.gregorian_to_jalali_series(vectorized)
+    t_back = time.perf_counter() - t0
+
+    subset = strings.iloc[:sample]
+    t0 = time.perf_counter()
+    reference = jdatetime_apply(subset)
+    t_ref = (time.perf_counter() - t0) * n / sample
+
+    assert (vectorized.iloc[:sample].to_numpy() == reference.to_numpy()).all()
+    assert (back == strings.map(jalali.canonical_jalali)).all()
+    print(f"{n:,} dates")
+    print(f"  vectorized jalali → gregorian : {t_vec * 1000:8.1f} ms")
+    print(f"  vectorized gregorian → jalali : {t_back * 1000:8.1f} ms")
+    print(f"  jdatetime Series.apply        : {t_ref * 1000:8.1f} ms (extrapolated from {sample:,})")
+    print(f"  speedup                       : {t_ref / t_vec:8.1f}x")
+
+
+def check_full_range():
+    """مقایسهٔ هر روز از ۱/۱/۱ تا آخر سال ۹۳۷۷ و اعتبارسنجی روزهای مرزی با jdatetime."""
+    ordinals = np.arange(jalali.MIN_ORDINAL, jalali.MAX_ORDINAL + 1)
+    year, month, day = jalali.ordinal_to_jalali(ordinals)
+    assert (jalali.jalali_to_ordinal(year, month, day) == ordinals).all(), "round trip"
+
+    mismatches = 0
+    for ordinal, y, m, d in zip(ordinals.tolist(), year.tolist(), month.tolist(), day.tolist()):
+        expected = jdatetime.date.fromgregorian(date=date.fromordinal(ordinal))
+        if (expected.year, expected.month, expected.day) != (y, m, d):
+            mismatches += 1
+    for y in range(jalali.MIN_YEAR, jalali.MAX_YEAR + 1):
+        try:
+            jdatetime.date(y, 12, 30)
+            accepted = True
+        except ValueError:
+            accepted = False
+        if accepted != bool(jalali.is_valid_jalali(y, 12, 30)):
+            mismatches += 1
+    print(f"checked {len(ordinals):,} days and {jalali.MAX_YEAR} leap years against jdatetime: {mismatches} mismatches")
+    return mismatches == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=1_000_000, help="تعداد تاریخ‌ها در بنچمارک")
+    parser.add_argument("--sample", type=int, default=100_000, help="تعداد تاریخ‌های اجراشده با jdatetime")
+    parser.add_argument("--check", action="store_true", help="بررسی کامل بازهٔ پشتیبانی‌شده")
+    args = parser.parse_args()
+    if args.check:
+        return 0 if check_full_range() else 1
+    bench(args.n, min(args.sample, args.n))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
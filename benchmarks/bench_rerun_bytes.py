@@ -0,0 +1,137 @@
+"""بنچمارک حجم پیام‌های websocket در هر rerun صفحهٔ تاریخچه.
+
+اسکریپت اپ (پیش‌فرض K2.py) در یک پوشهٔ موقت با یک دیتابیس SQLite تازه اجرا می‌شود که
+یک کاربر با `--weeks` هفته و `--activities` فعالیت در هر هفته دارد. با `AppTest` سه
+اجرای پشت‌سرهم یک نشست واردشده ساخته و برای هر اجرا مجموع اندازهٔ protobuf همهٔ
+عناصر (تقریب بایت‌های delta روی websocket)، تعداد عناصر و سهم بلوک‌های `<style>`
+چاپ می‌شود. برای مقایسه با نسخهٔ قبل، همان اسکریپت قدیمی را هم بدهید:
+
+    git show HEAD~1:K2.py > /tmp/K2_before.py
+    python -m benchmarks.bench_rerun_bytes K2.py /tmp/K2_before.py --weeks 50
+"""
+import argparse
+import os
+import pathlib
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from core.jalali import date_to_jalali  # noqa: E402
+
+COLUMNS = ("elements", "bytes", "style_bytes")
+
+USERNAME = "bench"
+
+
+def walk(node):
+    yield node
+    for child in getattr(node, "children", {}).values():
+        yield from walk(child)
+
+
+def seed(db_file: pathlib.Path, weeks: int, activities: int):
+    conn = sqlite3.connect(db_file)
+    conn.execute(
+        "INSERT INTO users (username, password_hash, role, created_at) VALUES (?, ?, 'user', ?)",
+        (USERNAME, "!", "2025-01-01T00:00:00+00:00"),
+    )
+    saturday = date(2025, 10, 18)
+    for w in range(weeks):
+        start = saturday - timedelta(weeks=w)
+        saved_at = f"{start + timedelta(days=6)}T12:00:00+00:00"
+        week_id = conn.execute(
+            "INSERT INTO user_weeks (username, week_start, week_end, week_feedback, week_total_score, "
+            "progress_diff, saved_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (USERNAME, date_to_jalali(start), date_to_jalali(start + timedelta(days=6)),
+             "هفتهٔ خوبی بود " * 5, 60, 5, saved_at),
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO user_activities (week_id, username, name, target, done, percent, note, saved_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(week_id, USERNAME, f"فعالیت {i}", 5, i % 6, min(100, (i % 6) * 20), "یادداشت" if i % 2 else "", saved_at)
+             for i in range(activities)],
+        )
+    conn.commit()
+    conn.close()
+
+
+def measure(at: AppTest) -> dict:
+    elements = [node for node in walk(at._tree) if getattr(node, "proto", None) is not None
+                and not getattr(node, "children", None)]
+    style_bytes = 0
+    for node in elements:
+        body = getattr(node.proto, "body", "")
+        if isinstance(body, str) and "<style" in body:
+            style_bytes += len(body.encode("utf-8"))
+    return {
+        "elements": len(elements),
+        "bytes": sum(node.proto.ByteSize() for node in elements),
+        "style_bytes": style_bytes,
+    }
+
+
+def bench(script: pathlib.Path, weeks: int, activities: int, runs: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = pathlib.Path(tmp)
+        (tmp / "app.py").write_text(script.read_text(encoding="utf-8"), encoding="utf-8")
+        for name in ("static", ".streamlit", "core"):
+            (tmp / name).symlink_to(ROOT / name)
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            # اجرای اول فقط دیتابیس و مهاجرت‌ها را می‌سازد
+            AppTest.from_file(str(tmp / "app.py"), default_timeout=300).run()
+            seed(tmp / "data" / "k2.db", weeks, activities)
+            at = AppTest.from_file(str(tmp / "app.py"), default_timeout=300)
+            at.session_state["logged_in"] = True
+            at.session_state["username"] = USERNAME
+            at.session_state["role"] = "user"
+            results = []
+            for _ in range(runs):
+                at.run()
+                if at.exception:
+                    raise RuntimeError(at.exception[0].message)
+                results.append(measure(at))
+            return results
+        finally:
+            os.chdir(cwd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scripts", nargs="*", default=["K2.py"])
+    parser.add_argument("--weeks", type=int, default=50)
+    parser.add_argument("--activities", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        for result in bench(pathlib.Path(args.scripts[0]).resolve(), args.weeks, args.activities, args.runs):
+            print(" ".join(str(result[column]) for column in COLUMNS))
+        return
+
+    print(f"weeks={args.weeks} activities/week={args.activities}")
+    print(f"{'script':<24}{'run':>4}{'elements':>10}{'bytes':>12}{'<style> bytes':>15}")
+    for script in args.scripts:
+        # هر اسکریپت در پردازهٔ جدا، چون استخرها و کش‌های core سراسری‌اند
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_rerun_bytes", str(pathlib.Path(script).resolve()), "--child",
+             "--weeks", str(args.weeks), "--activities", str(args.activities), "--runs", str(args.runs)],
+            cwd=ROOT, check=True, capture_output=True, text=True,
+        ).stdout.split("\n")
+        for run, line in enumerate(filter(None, output), 1):
+            result = dict(zip(COLUMNS, map(int, line.split())))
+            print(f"{pathlib.Path(script).name:<24}{run:>4}{result['elements']:>10}"
+                  f"{result['bytes']:>12,}{result['style_bytes']:>15,}")
+
+
+if __name__ == "__main__":
+    main()
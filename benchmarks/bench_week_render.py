@@ -0,0 +1,191 @@
+"""بنچمارک رسم یک هفته: یک عنصر `st.markdown` در برابر یک عنصر برای هر تکه.
+
+برای هفته‌هایی با ۵، ۲۰ و ۱۰۰ فعالیت، همان HTML (`core.week_html`) یک بار مثل قبل
+تکه‌به‌تکه (هدر، عنوان، هر کارت، هر یادداشت، یک `</div>` بعد از هر فعالیت و بازخورد) و
+یک بار در یک عنصر با `AppTest` رسم می‌شود. تعداد عنصرها (deltaها)، مجموع اندازهٔ
+protobufها و میانهٔ زمان سمت سرور (ساخت HTML + فراخوانی‌های `st.markdown`) چاپ می‌شود.
+
+جدول دوم ساخت کارت‌ها برای تعداد زیاد فعالیت (مثل نمای ادمین) را با حلقهٔ قدیمی
+`iterrows` مقایسه می‌کند؛ خروجی دو روش باید دقیقاً یکی باشد. جدول سوم زمان رسم HTML
+همهٔ هفته‌های یک صفحهٔ تاریخچه را بدون کش و با `WeekHtmlCache` گرم (شامل هش ردیف‌ها)
+می‌سنجد.
+
+    python -m benchmarks.bench_week_render --repeat 20
+"""
+import argparse
+import html
+import pathlib
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from core import week_html  # noqa: E402
+from core.cache import named_cache  # noqa: E402
+
+COUNTS = (5, 20, 100)
+ATTRIBUTE_COUNTS = (100, 1_000, 10_000)
+CACHE_WEEKS = (10, 50, 200)
+
+
+def sample_week(n: int):
+    saved = datetime(2025, 10, 24, tzinfo=timezone.utc)
+    week = {
+        "week_start": "1404/07/26", "week_end": "1404/08/02", "week_total_score": 64,
+        "progress_diff": 4, "week_feedback": "هفتهٔ خوبی بود ولی کمی خسته بودم",
+    }
+    activities = pd.DataFrame({
+        "name": [f"فعالیت <{i}>" for i in range(n)],
+        "target": [5] * n,
+        "done": [i % 7 for i in range(n)],
+        "percent": [min(100, (i % 7) * 20) for i in range(n)],
+        "note": ["یادداشت کوتاه" if i % 2 else "" for i in range(n)],
+        "saved_at_dt": [saved + timedelta(minutes=i) for i in range(n)],
+    })
+    return week, activities
+
+
+def app(count: int, single: bool):
+    import time
+
+    import streamlit as st
+
+    from benchmarks.bench_week_render import sample_week
+    from core.week_html import ACTIVITIES_CLOSE, render_week_html, week_html_parts
+
+    week, activities = sample_week(count)
+    started = time.perf_counter()
+    if single:
+        st.markdown(render_week_html(week, activities, "bench", True), unsafe_allow_html=True)
+    else:
+        header, heading, *cards, _, feedback = week_html_parts(week, activities, "bench", True)
+        st.markdown(header, unsafe_allow_html=True)
+        st.markdown(heading, unsafe_allow_html=True)
+        for i, part in enumerate(cards):
+            st.markdown(part, unsafe_allow_html=True)
+            if i + 1 == len(cards) or cards[i + 1].startswith('<div class="activity-card">'):
+                st.markdown(ACTIVITIES_CLOSE, unsafe_allow_html=True)
+        st.markdown(feedback, unsafe_allow_html=True)
+    st.session_state.render_ms = (time.perf_counter() - started) * 1000
+
+
+def bench(count: int, single: bool, repeat: int) -> dict:
+    at = AppTest.from_function(app, args=(count, single), default_timeout=120)
+    timings = []
+    for _ in range(repeat):
+        at.run()
+        timings.append(at.session_state.render_ms)
+    elements = [element for element in at.main if getattr(element, "proto", None) is not None]
+    return {
+        "elements": len(elements),
+        "bytes": sum(element.proto.ByteSize() for element in elements),
+        "ms": statistics.median(timings),
+    }
+
+
+def iterrows_cards(activities):
+    """حلقهٔ قبلی render_premium_week_section (مرجع صحت و سرعت)."""
+    parts = []
+    for idx, (_, row) in enumerate(activities.sort_values("saved_at_dt", ascending=True).iterrows(), 1):
+        target = int(row.get("target", 0))
+        done = int(row.get("done", 0))
+        percent = int(row.get("percent", 0))
+        note = html.escape(str(row.get("note", "")))
+        if percent >= 80:
+            badge_style, emoji, bar_style = week_html.BADGE_GREEN, "🧗‍♂️", week_html.BAR_GREEN
+        elif percent >= 50:
+            badge_style, emoji, bar_style = week_html.BADGE_AMBER, "🧭", week_html.BAR_AMBER
+        else:
+            badge_style, emoji, bar_style = week_html.BADGE_RED, "🪢", week_html.BAR_RED
+        parts.append(week_html.CARD.format(
+            idx=idx, name=html.escape(str(row.get("name", ""))), badge_style=badge_style, emoji=emoji,
+            percent=percent, done=done, target=target, status="✅" if done >= target else "🔄",
+            status_text="کامل" if done >= target else f"{done}/{target}", bar_style=bar_style,
+        ))
+        if note:
+            parts.append(week_html.NOTE.format(note=note))
+    return parts
+
+
+def bench_attributes(count: int, repeat: int) -> dict:
+    _, activities = sample_week(count)
+    assert iterrows_cards(activities) == week_html.activity_cards_html(activities)
+    timings = {}
+    for name, fn in (("iterrows", iterrows_cards), ("vectorized", week_html.activity_cards_html)):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn(activities)
+            samples.append((time.perf_counter() - started) * 1000)
+        timings[name] = statistics.median(samples)
+    return timings
+
+
+def bench_cache(weeks: int, repeat: int) -> dict:
+    """(بدون کش، کش گرم) برای `weeks` هفتهٔ ۵ فعالیتی."""
+    _, template = sample_week(5)
+    week_rows = []
+    frames = []
+    for week_id in range(weeks):
+        week, activities = sample_week(5)
+        week["id"] = week_id
+        week_rows.append(week)
+        frames.append(template.assign(week_id=week_id, done=(template["done"] + week_id) % 7))
+    activities = pd.concat(frames, ignore_index=True)
+    cache = week_html.WeekHtmlCache(named_cache("bench_week_html", max_bytes=64 * 1024 * 1024, ttl=None))
+
+    def uncached():
+        for week, group in activities.groupby("week_id", sort=False):
+            week_html.render_week_html(week_rows[week], group, "bench", True)
+
+    def cached():
+        frame = activities.assign(**{week_html.ROW_HASH: week_html.activity_row_hashes(activities)})
+        for week, group in frame.groupby("week_id", sort=False):
+            cache.render(week_rows[week], group, "bench", True)
+
+    cached()
+    timings = {}
+    for name, fn in (("uncached", uncached), ("cached", cached)):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - started) * 1000)
+        timings[name] = statistics.median(samples)
+    timings["hit_rate"] = cache.stats()["hit_rate"]
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'activities':>10} {'mode':>8} {'deltas':>7} {'bytes':>9} {'server ms':>10}")
+    for count in COUNTS:
+        for single in (False, True):
+            result = bench(count, single, args.repeat)
+            print(f"{count:>10} {'single' if single else 'split':>8} {result['elements']:>7} "
+                  f"{result['bytes']:>9,} {result['ms']:>10.2f}")
+
+    print(f"\n{'activities':>10} {'iterrows ms':>12} {'vectorized ms':>14} {'speedup':>8}")
+    for count in ATTRIBUTE_COUNTS:
+        timings = bench_attributes(count, max(3, args.repeat // 4))
+        print(f"{count:>10} {timings['iterrows']:>12.2f} {timings['vectorized']:>14.2f} "
+              f"{timings['iterrows'] / timings['vectorized']:>7.1f}x")
+
+    print(f"\n{'weeks':>10} {'uncached ms':>12} {'cached ms':>10} {'hit rate':>9}")
+    for weeks in CACHE_WEEKS:
+        timings = bench_cache(weeks, max(3, args.repeat // 4))
+        print(f"{weeks:>10} {timings['uncached']:>12.2f} {timings['cached']:>10.2f} {timings['hit_rate']:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
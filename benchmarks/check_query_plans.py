@@ -0,0 +1,151 @@
+"""بررسی طرح اجرای پرس‌وجوهای پرتکرار قبل و بعد از مهاجرت ایندکس‌ها.
+
+یک دیتابیس SQLite موقت تا نسخهٔ ۲ (بدون ایندکس) ساخته و با داده‌ی نمونه پر می‌شود،
+طرح اجرای پرس‌وجوها چاپ می‌شود، سپس بقیهٔ مهاجرت‌ها اعمال و طرح‌ها دوباره چاپ
+می‌شوند. اگر بعد از مهاجرت پرس‌وجویی هنوز کل جدول را اسکن کند، خروجی با کد ۱ است.
+اگر `K2_BENCH_POSTGRES_URL` تنظیم شده باشد، همین بررسی در یک schema موقت Postgres هم اجرا می‌شود.
+
+    python -m benchmarks.check_query_plans
+"""
+import os
+import pathlib
+import sys
+import tempfile
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from core.db import ConnectionPool, postgres_pool, sqlite_pool  # noqa: E402
+from core.migrations import run_migrations  # noqa: E402
+
+USERS = 200
+WEEKS_PER_USER = 30
+ACTIVITIES_PER_WEEK = 6
+
+HOT_QUERIES = {
+    "weeks of a user": (
+        "SELECT id, week_start, week_total_score FROM user_weeks WHERE username = {ph} ORDER BY saved_at",
+        ("user7",),
+    ),
+    "activities of a user": (
+        "SELECT id, name, percent FROM user_activities WHERE username = {ph} ORDER BY saved_at",
+        ("user7",),
+    ),
+    "activities of a week": (
+        "SELECT id, name, percent FROM user_activities WHERE week_id = {ph}",
+        (42,),
+    ),
+    "duplicate week check": (
+        "SELECT 1 FROM user_weeks WHERE username = {ph} AND week_start_date = {ph} AND week_end_date = {ph} LIMIT 1",
+        ("user7", "2025-03-30", "2025-04-05"),
+    ),
+    "previous week": (
+        "SELECT week_total_score FROM user_weeks WHERE username = {ph} AND week_start_date < {ph} "
+        "ORDER BY week_start_date DESC LIMIT 1",
+        ("user7", "2025-04-01"),
+    ),
+    "admin feed next page": (
+        "SELECT id, username, saved_at FROM user_weeks WHERE (saved_at, id) < ({ph}, {ph}) "
+        "ORDER BY saved_at DESC, id DESC LIMIT 21",
+        ("2025-01-01T00:10:00", 100),
+    ),
+}
+
+
+def seed(pool):
+    ph = pool.placeholder
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        for u in range(USERS):
+            for w in range(WEEKS_PER_USER):
+                saved_at = f"2025-01-01T00:{w:02d}:{u % 60:02d}"
+                cursor.execute(
+                    "INSERT INTO user_weeks (username, week_start, week_end, week_feedback, "
+                    f"week_total_score, progress_diff, saved_at) VALUES ({', '.join([ph] * 7)})",
+                    (f"user{u}", f"1404/01/{w + 1:02d}", f"1404/01/{w + 7:02d}", "", 50, 0, saved_at),
+                )
+        cursor.execute("SELECT id, username, saved_at FROM user_weeks")
+        weeks = cursor.fetchall()
+        rows = [
+            (week_id, username, f"a{i}", 5, 3, 60, "", saved_at)
+            for week_id, username, saved_at in weeks
+            for i in range(ACTIVITIES_PER_WEEK)
+        ]
+        cursor.executemany(
+            "INSERT INTO user_activities (week_id, username, name, target, done, percent, note, saved_at) "
+            f"VALUES ({', '.join([ph] * 8)})",
+            rows,
+        )
+        if pool.dialect == "sqlite":
+            cursor.execute("ANALYZE")
+        else:
+            cursor.execute("ANALYZE user_weeks")
+            cursor.execute("ANALYZE user_activities")
+
+
+def plans(pool):
+    result = {}
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        for label, (sql, params) in HOT_QUERIES.items():
+            sql = sql.format(ph=pool.placeholder)
+            prefix = "EXPLAIN QUERY PLAN " if pool.dialect == "sqlite" else "EXPLAIN "
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+            result[label] = [row[-1] if pool.dialect == "sqlite" else row[0] for row in rows]
+    return result
+
+
+def is_full_scan(plan_lines, dialect):
+    text = " ".join(plan_lines)
+    if dialect == "sqlite":
+        return "SCAN user_" in text and "USING" not in text
+    return "Seq Scan" in text
+
+
+def check(pool: ConnectionPool) -> bool:
+    run_migrations(pool, target=2)
+    seed(pool)
+    # ستون‌های اضافه‌شده در مهاجرت‌های بعدی پیش از گرفتن طرح «قبل» لازم‌اند
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("ALTER TABLE user_weeks ADD COLUMN week_start_date DATE")
+        cursor.execute("ALTER TABLE user_weeks ADD COLUMN week_end_date DATE")
+    before = plans(pool)
+    run_migrations(pool)
+    after = plans(pool)
+
+    ok = True
+    print(f"\n===== {pool.dialect} =====")
+    for label in HOT_QUERIES:
+        print(f"\n# {label}")
+        print("  before:", " | ".join(before[label]))
+        print("  after: ", " | ".join(after[label]))
+        if is_full_scan(after[label], pool.dialect):
+            ok = False
+            print("  ❌ هنوز اسکن کامل جدول")
+    return ok
+
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        ok &= check(sqlite_pool(pathlib.Path(tmp) / "plans.db"))
+
+    dsn = os.getenv("K2_BENCH_POSTGRES_URL")
+    if dsn:
+        schema = "k2_plan_check"
+        admin = postgres_pool(dsn, max_size=1)
+        with admin.connection() as conn:
+            conn.cursor().execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}")
+        pool = postgres_pool(f"{dsn}{'&' if '?' in dsn else '?'}options=-csearch_path%3D{schema}", max_size=1)
+        try:
+            ok &= check(pool)
+        finally:
+            pool.close_all()
+            with admin.connection() as conn:
+                conn.cursor().execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""ابزارهای مشترک K2 که بین نسخه‌های SQLite، Postgres و Supabase برنامه به اشتراک گذاشته می‌شوند."""
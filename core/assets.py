@@ -0,0 +1,126 @@
+"""فایل‌های ایستا (فونت‌ها) با URL نسخه‌دار و کش طولانی مرورگر.
+
+Streamlit با `server.enableStaticServing` پوشهٔ `static/` کنار اسکریپت را در مسیر
+`app/static/...` سرو می‌کند. هندلر آن (`tornado.web.StaticFileHandler`) برای هر
+درخواستی که پارامتر `v` داشته باشد `Cache-Control: max-age` ده‌ساله می‌فرستد؛ پس
+با گذاشتن هش محتوای فایل در `v`، مرورگر فونت را فقط یک بار (و بعد از هر تغییر فایل
+دوباره) دانلود می‌کند.
+
+اگر سرو ایستا خاموش باشد، فونت مثل قبل به‌صورت data URI درون CSS می‌آید، ولی
+base64 آن فقط یک بار در هر پردازه ساخته می‌شود.
+"""
+import base64
+import hashlib
+import json
+import pathlib
+from functools import lru_cache
+
+STATIC_URL_PREFIX = "app/static"
+
+_FONT_FORMATS = {".woff2": "woff2", ".woff": "woff", ".ttf": "truetype", ".otf": "opentype"}
+_FONT_MIME = {".woff2": "font/woff2", ".woff": "font/woff", ".ttf": "font/ttf", ".otf": "font/otf"}
+
+
+@lru_cache(maxsize=None)
+def content_hash(path: pathlib.Path) -> str:
+    """۱۲ نویسهٔ اول SHA-256 محتوای فایل (یک بار در هر پردازه)."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+
+
+def static_url(path: pathlib.Path, static_dir: pathlib.Path):
+    """URL نسخه‌دار یک فایل درون `static_dir`؛ اگر فایل آنجا نباشد None."""
+    try:
+        relative = path.relative_to(static_dir)
+    except ValueError:
+        return None
+    if not path.is_file():
+        return None
+    return f"{STATIC_URL_PREFIX}/{relative.as_posix()}?v={content_hash(path)}"
+
+
+@lru_cache(maxsize=None)
+def data_uri(path: pathlib.Path) -> str:
+    """فایل به‌صورت data URI (یک بار در هر پردازه)."""
+    mime = _FONT_MIME.get(path.suffix, "application/octet-stream")
+    return f"data:{mime};base64,{base64.b64encode(path.read_bytes()).decode()}"
+
+
+def subset_manifest_path(stem: pathlib.Path) -> pathlib.Path:
+    """محل manifest زیرمجموعه‌های یک فونت (ساخته‌شده با `python -m tools.subset_fonts`)."""
+    return stem.parent / "subset" / f"{stem.name}.json"
+
+
+def _subset_manifest(stem: pathlib.Path):
+    """manifest زیرمجموعه‌ها، اگر وجود داشته باشد و با فایل ttf فعلی ساخته شده باشد."""
+    path = subset_manifest_path(stem)
+    source = stem.with_suffix(".ttf")
+    if not path.is_file() or not source.is_file():
+        return None
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return None
+    if manifest.get("source_hash") != content_hash(source) or not manifest.get("subsets"):
+        return None
+    return manifest
+
+
+def _subset_font_faces(family: str, manifest: dict, folder: pathlib.Path, static_dir: pathlib.Path,
+                       static_serving: bool) -> str:
+    rules = []
+    for entry in manifest["subsets"]:
+        files = [folder / name for name in entry["files"].values() if (folder / name).is_file()]
+        if not files:
+            continue
+        urls = [static_url(path, static_dir) for path in files] if static_serving else []
+        if urls and all(urls):
+            sources = [f"url('{url}') format('{_FONT_FORMATS[path.suffix]}')" for path, url in zip(files, urls)]
+        elif rules:
+            # بدون سرو ایستا فقط زیرمجموعهٔ اول درون CSS می‌آید؛ بقیهٔ نویسه‌ها با فونت بعدی
+            break
+        else:
+            sources = [f"url({data_uri(files[0])}) format('{_FONT_FORMATS[files[0].suffix]}')"]
+        rules.append(
+            f"@font-face {{ font-family: '{family}'; src: {', '.join(sources)}; "
+            f"unicode-range: {entry['unicode_range']}; "
+            "font-weight: normal; font-style: normal; font-display: swap; }"
+        )
+    return "\n".join(rules)
+
+
+@lru_cache(maxsize=None)
+def font_face_css(family: str, stem: pathlib.Path, static_dir: pathlib.Path, static_serving: bool,
+                  formats: tuple = (".woff2", ".ttf")) -> str:
+    """قاعدهٔ `@font-face` یک فونت، با URL ایستا یا (در نبود آن) data URI.
+
+    اگر زیرمجموعه‌های به‌روز فونت (`tools/subset_fonts.py`) موجود باشند، برای هر کدام یک
+    قاعده با `unicode-range` ساخته می‌شود تا مرورگر فقط بخش‌های لازم را دانلود کند.
+
+    Args:
+        family (str): نام font-family.
+        stem (Path): مسیر فونت بدون پسوند، مثلاً `static/fonts/vazir/Vazir-Medium`.
+        static_dir (Path): پوشه‌ای که Streamlit سرو می‌کند.
+        static_serving (bool): مقدار `server.enableStaticServing`.
+        formats (tuple): پسوندهای موجود به ترتیب ترجیح.
+
+    Returns:
+        str: CSS قاعدهٔ `@font-face` (بدون تگ style)؛ اگر هیچ فایلی نباشد رشتهٔ خالی.
+    """
+    manifest = _subset_manifest(stem)
+    if manifest is not None:
+        rules = _subset_font_faces(family, manifest, subset_manifest_path(stem).parent, static_dir, static_serving)
+        if rules:
+            return rules
+    files = [stem.with_suffix(suffix) for suffix in formats if stem.with_suffix(suffix).is_file()]
+    if not files:
+        return ""
+    urls = [static_url(path, static_dir) for path in files] if static_serving else []
+    if urls and all(urls):
+        sources = [f"url('{url}') format('{_FONT_FORMATS[path.suffix]}')" for path, url in zip(files, urls)]
+    else:
+        # فقط اولین (کوچک‌ترین) قالب درون CSS می‌آید
+        sources = [f"url({data_uri(files[0])}) format('{_FONT_FORMATS[files[0].suffix]}')"]
+    return (
+        f"@font-face {{ font-family: '{family}'; src: {', '.join(sources)}; "
+        "font-weight: normal; font-style: normal; font-display: swap; }"
+    )
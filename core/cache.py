@@ -0,0 +1,189 @@
+"""کش LRU مشترک در سطح پردازه با سقف حجم (بایت)، انقضای زمانی و شمارندهٔ hit/miss.
+
+مانند استخرهای اتصال در `core.db`، کش‌ها در این ماژول نگه داشته می‌شوند تا بین
+rerunهای Streamlit و همهٔ نشست‌ها مشترک باشند. مسیرهای نوشتن (درج، ویرایش، حذف)
+باید کلیدهای مربوط را با `invalidate` یا `put` به‌روز کنند.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_size(value) -> int:
+    """تخمین حجم یک مقدار بر حسب بایت (DataFrameها با حجم واقعی ستون‌ها)."""
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    memory_usage = getattr(value, "memory_usage", None)
+    if memory_usage is not None:
+        try:
+            return int(memory_usage(deep=True).sum())
+        except TypeError:
+            pass
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """کش thread-safe با حذف کم‌استفاده‌ترین مدخل وقتی حجم کل از سقف بیشتر شود.
+
+    Args:
+        max_bytes (int): سقف حجم کل مدخل‌ها؛ مدخلی که به‌تنهایی بزرگ‌تر باشد ذخیره نمی‌شود.
+        ttl (float): عمر هر مدخل بر حسب ثانیه؛ None یعنی بدون انقضا.
+        sizeof (callable): تابع تخمین حجم هر مقدار.
+        max_tracked (int): سقف تعداد کلیدهایی که زمان آخرین باطل‌سازی‌شان نگه داشته می‌شود.
+    """
+
+    def __init__(
+            self,
+            *,
+            max_bytes: int = 64 * 1024 * 1024,
+            ttl: float = 300.0,
+            sizeof=estimate_size,
+            max_tracked: int = 4096,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        # برای تشخیص بارگذاری‌ای که هم‌زمان با باطل‌سازی همان کلید انجام شده: هر باطل‌سازی
+        # ساعت را جلو می‌برد و زمانش برای همان کلید ثبت می‌شود. کلیدهای قدیمی‌تر از
+        # max_tracked کنار گذاشته و زمانشان در _floor (برای همهٔ کلیدها) جمع می‌شود.
+        self.max_tracked = max_tracked
+        self._clock = 0
+        self._invalidated = OrderedDict()  # key -> زمان آخرین باطل‌سازی
+        self._floor = 0
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _mark_invalidated(self, key):
+        self._clock += 1
+        self._invalidated[key] = self._clock
+        self._invalidated.move_to_end(key)
+        while len(self._invalidated) > self.max_tracked:
+            _, stamp = self._invalidated.popitem(last=False)
+            self._floor = max(self._floor, stamp)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    @property
+    def generation(self) -> int:
+        """ساعت باطل‌سازی‌ها؛ پیش از بارگذاری خوانده و به `put` داده می‌شود."""
+        with self._lock:
+            return self._clock
+
+    def put(self, key, value, *, generation: int = None, ttl: float = None):
+        """ذخیرهٔ مقدار؛ اگر `generation` داده شود و از آن زمان همین کلید باطل شده باشد، ذخیره نمی‌شود.
+
+        `ttl` عمر همین مدخل را به‌جای `self.ttl` تعیین می‌کند.
+        """
+        size = self._sizeof(value)
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            if generation is not None and max(self._floor, self._invalidated.get(key, 0)) > generation:
+                return
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._evictions += 1
+
+    def get_or_load(self, key, loader, *, miss_ttl: float = None):
+        """مقدار کش‌شده؛ در صورت نبود، `loader()` صدا زده و نتیجه ذخیره می‌شود.
+
+        بارگذاری بیرون از قفل انجام می‌شود تا کندی پایگاه داده بقیهٔ کلیدها را معطل نکند؛
+        اگر در این فاصله همین کلید باطل شود، نتیجهٔ (احتمالاً کهنهٔ) بارگذاری ذخیره نمی‌شود؛
+        باطل شدن کلیدهای دیگر روی آن اثری ندارد.
+        نتیجهٔ None هم (مدخل منفی) ذخیره می‌شود؛ `miss_ttl` عمر جداگانهٔ این مدخل‌هاست.
+        """
+        sentinel = object()
+        generation = self.generation
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = loader()
+            self.put(key, value, generation=generation, ttl=miss_ttl if value is None else None)
+        return value
+
+    def update(self, key, fn):
+        """جایگزینی اتمی مقدار موجود با `fn(value)`؛ اگر کلید نباشد کاری انجام نمی‌شود.
+
+        مثل `invalidate` کلید را باطل‌شده علامت می‌زند تا بارگذاری‌های در جریان همین
+        کلید نتیجهٔ قدیمی‌تر را روی مقدار به‌روزشده ننویسند.
+        """
+        with self._lock:
+            self._mark_invalidated(key)
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            value, size, expires_at = entry
+            value = fn(value)
+            new_size = self._sizeof(value)
+            self._entries[key] = (value, new_size, expires_at)
+            self._bytes += new_size - size
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._mark_invalidated(key)
+                if key in self._entries:
+                    self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._clock += 1
+            self._floor = self._clock
+            self._invalidated.clear()
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+# --------------------------
+# رجیستری سراسری کش‌ها
+# --------------------------
+_REGISTRY_LOCK = threading.Lock()
+_CACHES = {}
+
+
+def named_cache(name: str, **options) -> LRUCache:
+    """کش مشترک با نام مشخص (یک نمونه برای هر نام در کل پردازه)."""
+    with _REGISTRY_LOCK:
+        cache = _CACHES.get(name)
+        if cache is None:
+            cache = LRUCache(**options)
+            _CACHES[name] = cache
+        return cache
@@ -0,0 +1,295 @@
+"""استخر اتصال مشترک پایگاه داده و کلاینت Supabase در سطح پردازه.
+
+Streamlit در هر تعامل کاربر کل اسکریپت را دوباره اجرا می‌کند، ولی ماژول‌های
+import‌شده در `sys.modules` باقی می‌مانند. به همین دلیل استخرها و کلاینت‌ها
+در این ماژول نگه داشته می‌شوند تا هزینهٔ ساخت کلاینت و handshake فقط یک‌بار
+برای هر پردازهٔ سرور پرداخت شود و همهٔ نشست‌ها (threadها) از آن استفاده کنند.
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(RuntimeError):
+    """وقتی در زمان مشخص‌شده هیچ اتصال آزادی در استخر پیدا نشود."""
+
+
+class ConnectionPool:
+    """استخر اتصال thread-safe با سقف اندازه، بررسی سلامت و حذف اتصال‌های بیکار.
+
+    Args:
+        factory (callable): تابعی که یک اتصال DB-API تازه می‌سازد.
+        dialect (str): "sqlite" یا "postgres"؛ برای placeholder و بررسی سلامت استفاده می‌شود.
+        max_size (int): حداکثر تعداد اتصال باز (در حال استفاده + بیکار).
+        idle_timeout (float): اتصالی که بیش از این مدت (ثانیه) بیکار بماند بسته می‌شود.
+        health_check_interval (float): اگر اتصال بیش از این مدت استفاده نشده باشد،
+            پیش از تحویل با `SELECT 1` بررسی می‌شود.
+        acquire_timeout (float): حداکثر زمان انتظار برای گرفتن اتصال.
+    """
+
+    def __init__(
+            self,
+            factory,
+            *,
+            dialect: str,
+            max_size: int = 8,
+            idle_timeout: float = 300.0,
+            health_check_interval: float = 30.0,
+            acquire_timeout: float = 10.0,
+    ):
+        self._factory = factory
+        self.dialect = dialect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._idle = []  # لیست (conn, last_used) — آخرین عنصر تازه‌ترین است
+        self._in_use = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._created = 0
+        self._discarded = 0
+
+    @property
+    def placeholder(self) -> str:
+        return "?" if self.dialect == "sqlite" else "%s"
+
+    def _evict_idle(self, now: float):
+        """بستن اتصال‌هایی که بیش از idle_timeout بیکار مانده‌اند (زیر قفل صدا زده می‌شود)."""
+        fresh = []
+        for conn, last_used in self._idle:
+            if now - last_used > self.idle_timeout:
+                self._close(conn)
+            else:
+                fresh.append((conn, last_used))
+        self._idle = fresh
+
+    def _close(self, conn):
+        self._discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn) -> bool:
+        if getattr(conn, "closed", 0):
+            return False
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            if self.dialect == "postgres":
+                conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        """گرفتن یک اتصال از استخر؛ در صورت پر بودن تا acquire_timeout صبر می‌کند."""
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._evict_idle(now)
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use < self.max_size:
+                    self._in_use += 1
+                    conn, last_used = None, now
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"هیچ اتصال آزادی در استخر ({self.max_size}) پیدا نشد."
+                    )
+                self._cond.wait(remaining)
+
+        # ساخت اتصال و بررسی سلامت بیرون از قفل انجام می‌شود تا threadهای دیگر معطل نمانند
+        try:
+            if conn is not None and now - last_used > self.health_check_interval:
+                if not self._is_healthy(conn):
+                    with self._cond:
+                        self._close(conn)
+                    conn = None
+            if conn is None:
+                conn = self._factory()
+                with self._cond:
+                    self._created += 1
+            return conn
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn, *, broken: bool = False):
+        """برگرداندن اتصال به استخر؛ اتصال خراب یا بسته‌شده دور انداخته می‌شود."""
+        with self._cond:
+            self._in_use -= 1
+            if broken or getattr(conn, "closed", 0):
+                self._close(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """اتصال را در یک تراکنش تحویل می‌دهد؛ در پایان commit و در صورت خطا rollback می‌کند.
+
+        Example:
+            >>> with pool.connection() as conn:
+            ...     conn.cursor().execute("SELECT 1")
+        """
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def close_all(self):
+        """بستن همهٔ اتصال‌های بیکار (اتصال‌های در حال استفاده هنگام release بسته می‌شوند)."""
+        with self._cond:
+            for conn, _ in self._idle:
+                self._close(conn)
+            self._idle = []
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "dialect": self.dialect,
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "created": self._created,
+                "discarded": self._discarded,
+            }
+
+
+# --------------------------
+# درج گروهی
+# --------------------------
+# SQLite حداکثر 32766 پارامتر در هر دستور می‌پذیرد؛ ردیف‌ها در دسته‌هایی زیر این سقف ارسال می‌شوند
+SQLITE_MAX_VARIABLES = 32766
+
+
+def bulk_insert(conn, table: str, columns, rows, *, dialect: str, returning: str = "id") -> list:
+    """درج چند ردیف با یک دستور INSERT چندردیفی و بازگرداندن شناسه‌های درج‌شده.
+
+    برخلاف اجرای یک INSERT برای هر ردیف، کل ردیف‌ها در یک رفت‌وبرگشت (و در
+    تراکنش اتصال فعلی) ارسال می‌شوند؛ پس یا همه ذخیره می‌شوند یا هیچ‌کدام.
+
+    Args:
+        conn: اتصال DB-API که از `ConnectionPool.connection()` گرفته شده است.
+        table (str): نام جدول.
+        columns (Sequence[str]): نام ستون‌ها به ترتیب مقادیر هر ردیف.
+        rows (Sequence[Sequence]): مقادیر ردیف‌ها.
+        dialect (str): "sqlite" یا "postgres".
+        returning (str): ستونی که مقدار آن برای هر ردیف بازگردانده می‌شود.
+
+    Returns:
+        list: مقادیر ستون `returning` (شناسه‌ها) به ترتیب درج.
+    """
+    rows = [tuple(r) for r in rows]
+    if not rows:
+        return []
+    column_sql = ", ".join(columns)
+    cursor = conn.cursor()
+
+    if dialect == "postgres":
+        from psycopg2.extras import execute_values
+
+        result = execute_values(
+            cursor,
+            f"INSERT INTO {table} ({column_sql}) VALUES %s RETURNING {returning}",
+            rows,
+            page_size=len(rows),
+            fetch=True,
+        )
+        return sorted(r[0] for r in result)
+
+    row_sql = "(" + ", ".join("?" for _ in columns) + ")"
+    chunk = max(1, SQLITE_MAX_VARIABLES // len(columns))
+    ids = []
+    for i in range(0, len(rows), chunk):
+        part = rows[i:i + chunk]
+        cursor.execute(
+            f"INSERT INTO {table} ({column_sql}) VALUES "
+            + ", ".join(row_sql for _ in part)
+            + f" RETURNING {returning}",
+            [v for r in part for v in r],
+        )
+        ids.extend(r[0] for r in cursor.fetchall())
+    # ترتیب خروجی RETURNING تضمین‌شده نیست، ولی شناسه‌های یک دستور به ترتیب درج افزایشی‌اند
+    return sorted(ids)
+
+
+# --------------------------
+# رجیستری سراسری استخرها و کلاینت‌ها
+# --------------------------
+_REGISTRY_LOCK = threading.Lock()
+_POOLS = {}
+_CLIENTS = {}
+
+
+def _connect_sqlite(db_file):
+    # اتصال بین threadهای نشست‌ها دست‌به‌دست می‌شود، ولی هر بار فقط یک thread از آن استفاده می‌کند
+    conn = sqlite3.connect(str(db_file), timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def sqlite_pool(db_file, **options) -> ConnectionPool:
+    """استخر اتصال مشترک برای یک فایل SQLite (یک استخر برای هر مسیر در کل پردازه)."""
+    key = ("sqlite", str(db_file))
+    with _REGISTRY_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                lambda: _connect_sqlite(db_file), dialect="sqlite", **options
+            )
+            _POOLS[key] = pool
+        return pool
+
+
+def postgres_pool(dsn: str, **options) -> ConnectionPool:
+    """استخر اتصال مشترک psycopg2 برای یک DSN (یک استخر برای هر DSN در کل پردازه)."""
+    import psycopg2
+
+    key = ("postgres", dsn)
+    with _REGISTRY_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                lambda: psycopg2.connect(dsn), dialect="postgres", **options
+            )
+            _POOLS[key] = pool
+        return pool
+
+
+def supabase_client(url: str, key: str):
+    """کلاینت Supabase مشترک؛ فقط یک‌بار برای هر (url, key) ساخته می‌شود.
+
+    کلاینت‌های HTTP داخلی Supabase اتصال‌های keep-alive خود را نگه می‌دارند،
+    بنابراین استفادهٔ مجدد از یک نمونه هزینهٔ TLS handshake را هم حذف می‌کند.
+    """
+    from supabase import create_client
+
+    cache_key = (url, key)
+    with _REGISTRY_LOCK:
+        client = _CLIENTS.get(cache_key)
+        if client is None:
+            client = create_client(url, key)
+            _CLIENTS[cache_key] = client
+        return client
@@ -0,0 +1,101 @@
+"""همگام‌سازی افزایشی (delta) تاریخچهٔ هفتگی روی کش مشترک.
+
+برای هر کلید (نام کاربر یا None برای همهٔ کاربران) یک `HistorySnapshot` در کش
+نگه داشته می‌شود: DataFrameهای هفته‌ها و فعالیت‌ها به‌همراه بیشترین `id` خوانده‌شده
+از هر جدول (watermark). در تازه‌سازی فقط ردیف‌های با `id` بزرگ‌تر از watermark
+خوانده و به انتهای فریم‌ها اضافه می‌شوند؛ پس هزینهٔ هر تازه‌سازی متناسب با ردیف‌های
+جدید است نه کل تاریخچه.
+
+idها هنگام شروع insert گرفته می‌شوند نه هنگام commit؛ پس در Postgres ردیفی با id
+کوچک‌تر ممکن است بعد از ردیفی با id بزرگ‌تر commit شود و زیر watermark بماند. برای
+همین delta از `watermark - overlap` خوانده می‌شود و ردیف‌های تکراری با id کنار
+گذاشته می‌شوند. حذف یا ویرایش ردیف‌ها (و ردیف‌های دیرتر از پنجرهٔ overlap) با delta
+دیده نمی‌شوند؛ برای همین هر `reconcile_after` ثانیه یک بارگذاری کامل انجام می‌شود.
+"""
+import time
+from typing import NamedTuple
+
+import pandas as pd
+
+
+class HistorySnapshot(NamedTuple):
+    weeks: pd.DataFrame
+    activities: pd.DataFrame
+    week_watermark: int  # بیشترین user_weeks.id خوانده‌شده
+    activity_watermark: int  # بیشترین user_activities.id خوانده‌شده
+    synced_at: float  # زمان آخرین همگام‌سازی (کامل یا delta) بر حسب time.monotonic
+    reconciled_at: float  # زمان آخرین بارگذاری کامل
+
+
+def _max_id(df: pd.DataFrame, default: int = 0) -> int:
+    if df.empty:
+        return default
+    return max(int(df["id"].max()), default)
+
+
+def _append(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """افزودن ردیف‌های تازهٔ `new` به `old`؛ ردیف‌هایی که id آن‌ها قبلاً خوانده شده کنار گذاشته می‌شوند."""
+    if not new.empty and not old.empty:
+        new = new[~new["id"].isin(old["id"])]
+    if new.empty:
+        return old
+    if old.empty:
+        return new.reset_index(drop=True)
+    return pd.concat([old, new], ignore_index=True)
+
+
+def load_history(
+        cache,
+        key,
+        fetch_weeks,
+        fetch_activities,
+        *,
+        refresh_after: float,
+        reconcile_after: float,
+        overlap: int = 0,
+):
+    """هفته‌ها و فعالیت‌های یک کلید با بارگذاری کامل، delta یا مستقیم از کش.
+
+    Args:
+        cache (LRUCache): کش مشترک تاریخچه.
+        key: کلید کش (نام کاربر یا None).
+        fetch_weeks (callable): `fetch_weeks(after_id)` هفته‌های با id بزرگ‌تر از after_id
+            (یا همه، اگر None باشد) را برمی‌گرداند.
+        fetch_activities (callable): مانند `fetch_weeks` برای فعالیت‌ها.
+        refresh_after (float): اگر از آخرین همگام‌سازی بیش از این (ثانیه) گذشته باشد، delta گرفته می‌شود.
+        reconcile_after (float): اگر از آخرین بارگذاری کامل بیش از این گذشته باشد، بارگذاری کامل انجام می‌شود.
+        overlap (int): تعداد idهای زیر watermark که در delta دوباره خوانده می‌شوند تا ردیف‌های
+            دیر commit‌شده جا نمانند.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: (هفته‌ها، فعالیت‌ها)؛ بین نشست‌ها مشترک‌اند و
+            نباید درجا تغییر داده شوند.
+    """
+    generation = cache.generation
+    snapshot = cache.get(key)
+    now = time.monotonic()
+
+    if snapshot is None or now - snapshot.reconciled_at >= reconcile_after:
+        weeks = fetch_weeks(None)
+        activities = fetch_activities(None)
+        snapshot = HistorySnapshot(weeks, activities, _max_id(weeks), _max_id(activities), now, now)
+        cache.put(key, snapshot, generation=generation)
+    elif now - snapshot.synced_at >= refresh_after:
+        new_weeks = fetch_weeks(snapshot.week_watermark - overlap)
+        new_activities = fetch_activities(snapshot.activity_watermark - overlap)
+        snapshot = snapshot._replace(
+            weeks=_append(snapshot.weeks, new_weeks),
+            activities=_append(snapshot.activities, new_activities),
+            week_watermark=_max_id(new_weeks, snapshot.week_watermark),
+            activity_watermark=_max_id(new_activities, snapshot.activity_watermark),
+            synced_at=now,
+        )
+        cache.put(key, snapshot, generation=generation)
+
+    return snapshot.weeks, snapshot.activities
+
+
+def mark_stale(cache, *keys):
+    """علامت‌گذاری کلیدها برای گرفتن delta در خواندن بعدی (بعد از هر نوشتن صدا زده شود)."""
+    for key in keys:
+        cache.update(key, lambda snapshot: snapshot._replace(synced_at=float("-inf")))
@@ -0,0 +1,257 @@
+"""تبدیل تاریخ‌های شمسی (جلالی) ↔ میلادی، تکی و برداری (NumPy).
+
+هستهٔ تبدیل، شمارهٔ روز (ordinal) میلادی است، همان `datetime.date.toordinal()`.
+با یک جدول از پیش محاسبه‌شدهٔ ordinal اول فروردین هر سال، تبدیل فقط جمع و جستجوی
+دودویی روی آرایه‌ها است و برای هر تاریخ شیء `jdatetime.date` ساخته نمی‌شود.
+قاعدهٔ کبیسه همان قاعدهٔ ۳۳ساله‌ی `jdatetime` است و بازهٔ پشتیبانی‌شده هم مثل آن،
+سال‌های ۱ تا ۹۳۷۷ است (ر.ک. `benchmarks/bench_jalali.py` برای مقایسه با jdatetime).
+"""
+import re
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+MIN_YEAR = 1
+MAX_YEAR = 9377
+# سال‌هایی که باقی‌ماندهٔ تقسیمشان بر ۳۳ یکی از این‌هاست کبیسه‌اند (اسفند ۳۰ روزه)
+_LEAP_REMAINDERS = (1, 5, 9, 13, 17, 22, 26, 30)
+# ordinal میلادی ۱ فروردین سال ۱ (۲۱ مارس ۶۲۲)
+_EPOCH = date(622, 3, 21).toordinal()
+# ordinal میلادی ۱۹۷۰/۰۱/۰۱، مبدأ datetime64
+_UNIX_EPOCH = date(1970, 1, 1).toordinal()
+
+_YEARS = np.arange(MIN_YEAR, MAX_YEAR + 1)
+IS_LEAP = np.isin(_YEARS % 33, _LEAP_REMAINDERS)  # اندیس: سال - MIN_YEAR
+# ordinal اول فروردین هر سال؛ عنصر آخر اول فروردینِ سالِ بعد از MAX_YEAR است
+_NEW_YEAR = _EPOCH + np.concatenate(([0], np.cumsum(365 + IS_LEAP))).astype(np.int64)
+# فاصلهٔ روز اول هر ماه از اول سال
+_MONTH_OFFSET = np.array([0, 31, 62, 93, 124, 155, 186, 216, 246, 276, 306, 336], dtype=np.int64)
+
+MIN_ORDINAL = int(_NEW_YEAR[0])
+MAX_ORDINAL = int(_NEW_YEAR[-1]) - 1
+
+_JALALI_RE = re.compile(r"^\s*(\d{1,4})\s*/\s*(\d{1,2})\s*/\s*(\d{1,2})\s*$")
+
+
+# --------------------------
+# API برداری
+# --------------------------
+def month_length(year, month):
+    """تعداد روزهای ماه (آرایه‌ای)؛ برای سال یا ماه خارج از بازه صفر."""
+    year = np.asarray(year, dtype=np.int64)
+    month = np.asarray(month, dtype=np.int64)
+    in_range = (year >= MIN_YEAR) & (year <= MAX_YEAR) & (month >= 1) & (month <= 12)
+    leap = IS_LEAP[np.clip(year, MIN_YEAR, MAX_YEAR) - MIN_YEAR]
+    days = np.where(month <= 6, 31, np.where(month <= 11, 30, 29 + leap))
+    return np.where(in_range, days, 0)
+
+
+def is_valid_jalali(year, month, day):
+    """آیا (year, month, day) تاریخ شمسی معتبری است؟ (آرایه‌ای)"""
+    day = np.asarray(day, dtype=np.int64)
+    return (day >= 1) & (day <= month_length(year, month))
+
+
+def jalali_to_ordinal(year, month, day):
+    """تبدیل آرایه‌های سال/ماه/روز شمسی به ordinal میلادی.
+
+    Args:
+        year, month, day (array-like): اجزای تاریخ شمسی (قابل broadcast).
+
+    Returns:
+        np.ndarray: ordinal میلادی (int64)؛ برای تاریخ‌های نامعتبر -1.
+
+    Example:
+        >>> jalali_to_ordinal([1404, 1403], [7, 12], [1, 30])
+        array([739517, 739330])
+    """
+    year, month, day = np.broadcast_arrays(
+        np.asarray(year, dtype=np.int64), np.asarray(month, dtype=np.int64), np.asarray(day, dtype=np.int64)
+    )
+    valid = is_valid_jalali(year, month, day)
+    ordinal = (
+            _NEW_YEAR[np.clip(year, MIN_YEAR, MAX_YEAR) - MIN_YEAR]
+            + _MONTH_OFFSET[np.clip(month, 1, 12) - 1]
+            + day - 1
+    )
+    return np.where(valid, ordinal, -1)
+
+
+def ordinal_to_jalali(ordinal):
+    """تبدیل ordinal میلادی به آرایه‌های (سال، ماه، روز) شمسی.
+
+    Args:
+        ordinal (array-like): ordinal میلادی در بازهٔ [MIN_ORDINAL, MAX_ORDINAL].
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (سال، ماه، روز)؛ برای ordinal خارج از بازه (0, 0, 0).
+    """
+    ordinal = np.asarray(ordinal, dtype=np.int64)
+    valid = (ordinal >= MIN_ORDINAL) & (ordinal <= MAX_ORDINAL)
+    index = np.clip(np.searchsorted(_NEW_YEAR, ordinal, side="right") - 1, 0, len(_YEARS) - 1)
+    day_of_year = ordinal - _NEW_YEAR[index]
+    month = np.where(day_of_year < 186, day_of_year // 31 + 1, (day_of_year - 186) // 30 + 7)
+    month = np.clip(month, 1, 12)
+    day = day_of_year - _MONTH_OFFSET[month - 1] + 1
+    zero = np.zeros_like(ordinal)
+    return (
+        np.where(valid, index + MIN_YEAR, zero),
+        np.where(valid, month, zero),
+        np.where(valid, day, zero),
+    )
+
+
+def ordinal_to_datetime64(ordinal):
+    """ordinal میلادی → `datetime64[D]` (ordinal منفی → NaT)."""
+    ordinal = np.asarray(ordinal, dtype=np.int64)
+    days = (ordinal - _UNIX_EPOCH).astype("datetime64[D]")
+    return np.where(ordinal > 0, days, np.datetime64("NaT"))
+
+
+def datetime64_to_ordinal(values):
+    """`datetime64` (یا هر چیز قابل تبدیل با `np.asarray(..., "datetime64[D]")`) → ordinal میلادی؛ NaT → -1."""
+    days = np.asarray(values, dtype="datetime64[D]")
+    ordinal = days.astype(np.int64) + _UNIX_EPOCH
+    return np.where(np.isnat(days), -1, ordinal)
+
+
+def _digit_values(codes):
+    """مقدار عددی کدهای یونیکد رقم (لاتین، فارسی و عربی)؛ برای غیررقم -1."""
+    values = np.full(codes.shape, -1, dtype=np.int64)
+    for zero in (ord("0"), ord("۰"), ord("٠")):
+        is_digit = (codes >= zero) & (codes <= zero + 9)
+        values[is_digit] = codes[is_digit] - zero
+    return values
+
+
+# طولانی‌ترین شکل بدون فاصله "YYYY/MM/DD"؛ رشته‌های بلندتر از مسیر regex می‌گذرند
+_MAX_COMPACT_LENGTH = 10
+
+
+def split_jalali(strings) -> tuple:
+    """تجزیهٔ برداری رشته‌های "YYYY/MM/DD" به آرایه‌های سال/ماه/روز (نامعتبر → 0).
+
+    رشته‌های بدون فاصله (با یا بدون صفر پیشرو، با ارقام لاتین، فارسی یا عربی) ستون
+    به ستون روی کد نویسه‌ها خوانده می‌شوند؛ فقط بقیه (مثلاً با فاصله) از regex می‌گذرند.
+
+    Args:
+        strings (array-like | pd.Series): رشته‌های تاریخ شمسی.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (سال، ماه، روز) با dtype int64.
+    """
+    text = pd.Series(strings, dtype="object").fillna("").astype(str).to_numpy()
+    n = len(text)
+    width = _MAX_COMPACT_LENGTH + 1  # نویسهٔ اضافه برای تشخیص رشته‌های بلندتر
+    codes = text.astype(f"U{width}").view(np.uint32).reshape(n, width).astype(np.int64)
+    values = _digit_values(codes)
+
+    fields = np.zeros((3, n), dtype=np.int64)
+    lengths = np.zeros((3, n), dtype=np.int64)
+    field = np.zeros(n, dtype=np.int64)  # شمارهٔ بخشی که نویسهٔ فعلی در آن است
+    ok = codes[:, -1] == 0
+    rows = np.arange(n)
+    for column in range(_MAX_COMPACT_LENGTH):
+        code, value = codes[:, column], values[:, column]
+        is_digit = value >= 0
+        is_sep = code == ord("/")
+        ok &= is_digit | is_sep | (code == 0)
+        target = np.minimum(field, 2)
+        digit_rows = rows[is_digit]
+        fields[target[digit_rows], digit_rows] = fields[target[digit_rows], digit_rows] * 10 + value[digit_rows]
+        lengths[target[digit_rows], digit_rows] += 1
+        field += is_sep
+    ok &= (field == 2) & (lengths[0] >= 1) & (lengths[0] <= 4)
+    ok &= (lengths[1] >= 1) & (lengths[1] <= 2) & (lengths[2] >= 1) & (lengths[2] <= 2)
+    year, month, day = (np.where(ok, f, 0) for f in fields)
+
+    slow = np.flatnonzero(~ok & (text != ""))
+    if len(slow):
+        parts = pd.Series(text[slow]).str.extract(_JALALI_RE.pattern)
+        matched = parts[0].notna().to_numpy()
+        hit = slow[matched]
+        # int() ارقام فارسی را هم می‌پذیرد
+        year[hit], month[hit], day[hit] = (parts.loc[matched, i].map(int).to_numpy() for i in range(3))
+    return year, month, day
+
+
+def jalali_to_gregorian_series(strings) -> pd.Series:
+    """تبدیل برداری رشته‌های شمسی به تاریخ میلادی (`datetime64`)؛ نامعتبر → NaT.
+
+    Example:
+        >>> jalali_to_gregorian_series(pd.Series(["1404/07/01", "1404/13/01"]))
+        0   2025-09-23
+        1          NaT
+        dtype: datetime64[ns]
+    """
+    index = strings.index if isinstance(strings, pd.Series) else None
+    values = ordinal_to_datetime64(jalali_to_ordinal(*split_jalali(strings)))
+    return pd.Series(pd.to_datetime(values), index=index)
+
+
+def format_jalali(year, month, day) -> np.ndarray:
+    """ساخت برداری رشته‌های استاندارد "YYYY/MM/DD" از آرایه‌های سال/ماه/روز."""
+    year, month, day = (np.asarray(a, dtype=np.int64) for a in (year, month, day))
+    chars = np.empty((year.size, 10), dtype=np.uint8)
+    for column, (values, power) in enumerate([
+        (year, 1000), (year, 100), (year, 10), (year, 1), (None, 0),
+        (month, 10), (month, 1), (None, 0), (day, 10), (day, 1),
+    ]):
+        chars[:, column] = ord("/") if values is None else (values.ravel() // power) % 10 + ord("0")
+    return chars.view("S10").ravel().astype("U10")
+
+
+def gregorian_to_jalali_series(dates) -> pd.Series:
+    """تبدیل برداری تاریخ‌های میلادی به رشتهٔ استاندارد شمسی "YYYY/MM/DD"؛ نامعتبر → None."""
+    index = dates.index if isinstance(dates, pd.Series) else None
+    ordinal = datetime64_to_ordinal(pd.to_datetime(pd.Series(dates)).to_numpy())
+    year, month, day = ordinal_to_jalali(ordinal)
+    text = format_jalali(year, month, day).astype(object)
+    text[year == 0] = None
+    return pd.Series(text, index=index, dtype="object")
+
+
+# --------------------------
+# API تکی (برای ورودی فرم‌ها و مسیر نوشتن)
+# --------------------------
+def parse_jalali(text):
+    """تجزیه و اعتبارسنجی رشتهٔ شمسی "YYYY/MM/DD" (ماه و روز با یا بدون صفر پیشرو).
+
+    Returns:
+        tuple[int, int, int] | None: (سال، ماه، روز)؛ اگر ورودی نامعتبر باشد None.
+    """
+    match = _JALALI_RE.match(str(text or ""))
+    if not match:
+        return None
+    year, month, day = map(int, match.groups())
+    if not is_valid_jalali(year, month, day):
+        return None
+    return year, month, day
+
+
+def jalali_to_date(text):
+    """تبدیل رشتهٔ شمسی "YYYY/MM/DD" به `datetime.date` میلادی؛ اگر نامعتبر باشد None.
+
+    Example:
+        >>> jalali_to_date("1404/7/1")
+        datetime.date(2025, 9, 23)
+    """
+    parts = parse_jalali(text)
+    return date.fromordinal(int(jalali_to_ordinal(*parts))) if parts else None
+
+
+def canonical_jalali(text):
+    """شکل استاندارد نمایشی یک تاریخ شمسی با صفر پیشرو ("1404/7/1" → "1404/07/01").
+
+    Returns:
+        str | None: رشتهٔ استاندارد؛ اگر ورودی نامعتبر باشد None.
+    """
+    parts = parse_jalali(text)
+    return "%04d/%02d/%02d" % parts if parts else None
+
+
+def date_to_jalali(value: date) -> str:
+    """تبدیل `datetime.date` میلادی به رشتهٔ استاندارد شمسی "YYYY/MM/DD"."""
+    year, month, day = ordinal_to_jalali(value.toordinal())
+    return "%04d/%02d/%02d" % (int(year), int(month), int(day))
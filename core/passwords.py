@@ -0,0 +1,157 @@
+"""هش و بررسی رمز با bcrypt روی یک استخر thread محدود و مشترک در سطح پردازه.
+
+bcrypt عمداً پرهزینه است (ده‌ها تا صدها میلی‌ثانیه CPU برای هر عملیات). اگر روی
+thread اسکریپت هر نشست اجرا شود، موجی از ورودها همهٔ هسته‌ها را می‌گیرد و rerun
+بقیهٔ نشست‌ها معطل می‌ماند. اینجا همهٔ کارهای bcrypt به یک executor با تعداد
+worker محدود سپرده می‌شوند (bcrypt در حین کار GIL را آزاد می‌کند) و اگر صف از
+سقفش بیشتر شود، درخواست تازه به‌جای انتظار نامحدود با `HasherBusy` رد می‌شود.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+
+
+class HasherBusy(RuntimeError):
+    """وقتی صف کارهای bcrypt پر است یا پاسخ در زمان مشخص‌شده آماده نشود."""
+
+
+def hash_rounds(stored_hash: str):
+    """ضریب هزینهٔ یک هش bcrypt ("$2b$12$..." → 12)؛ اگر قابل خواندن نباشد None."""
+    parts = (stored_hash or "").split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """هش/بررسی bcrypt با worker محدود، سقف صف و آمار تأخیر.
+
+    Args:
+        rounds (int): ضریب هزینهٔ هش‌های جدید؛ هش‌های با ضریب دیگر در `verify_and_rehash`
+            دوباره ساخته می‌شوند.
+        max_workers (int): حداکثر عملیات bcrypt هم‌زمان؛ پیش‌فرض نصف هسته‌ها (حداقل ۱) تا
+            همیشه CPU برای rerun نشست‌ها باقی بماند.
+        max_queue (int): حداکثر کار منتظر (علاوه بر کارهای در حال اجرا).
+        timeout (float): حداکثر انتظار برای نتیجه بر حسب ثانیه.
+    """
+
+    def __init__(self, *, rounds: int = 12, max_workers: int = None, max_queue: int = 32, timeout: float = 30.0):
+        self.rounds = rounds
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) // 2)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0  # منتظر + در حال اجرا
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._rehashed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise HasherBusy("صف bcrypt پر است")
+            self._pending += 1
+        submitted = time.monotonic()
+
+        def job():
+            started = time.monotonic()
+            with self._lock:
+                self._running += 1
+            try:
+                return fn(*args)
+            finally:
+                finished = time.monotonic()
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self._completed += 1
+                    self._wait_total += started - submitted
+                    self._wait_max = max(self._wait_max, started - submitted)
+                    self._run_total += finished - started
+
+        try:
+            return self._executor.submit(job).result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HasherBusy("پاسخ bcrypt در زمان مشخص‌شده آماده نشد") from None
+
+    def _hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(self.rounds)).decode("utf-8")
+
+    @staticmethod
+    def _check(password: str, stored_hash: str) -> bool:
+        try:
+            return bcrypt.checkpw(password.encode("utf-8"), stored_hash.encode("utf-8"))
+        except ValueError:  # هش خراب یا غیر bcrypt
+            return False
+
+    def hash(self, password: str) -> str:
+        return self._run(self._hash, password)
+
+    def verify(self, password: str, stored_hash: str) -> bool:
+        return self._run(self._check, password, stored_hash)
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        return hash_rounds(stored_hash) != self.rounds
+
+    def verify_and_rehash(self, password: str, stored_hash: str):
+        """بررسی رمز و در صورت موفقیت، ساخت هش تازه اگر ضریب هش ذخیره‌شده با `rounds` فرق کند.
+
+        هر دو کار در یک نوبت از صف انجام می‌شوند.
+
+        Returns:
+            tuple[bool, str | None]: (درست بودن رمز، هش جدیدی که باید ذخیره شود یا None).
+        """
+        def job():
+            if not self._check(password, stored_hash):
+                return False, None
+            if not self.needs_rehash(stored_hash):
+                return True, None
+            return True, self._hash(password)
+
+        ok, new_hash = self._run(job)
+        if new_hash is not None:
+            with self._lock:
+                self._rehashed += 1
+        return ok, new_hash
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self._completed
+            return {
+                "rounds": self.rounds,
+                "workers": self.max_workers,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "max_queue": self.max_queue,
+                "completed": completed,
+                "rejected": self._rejected,
+                "rehashed": self._rehashed,
+                "avg_wait_ms": self._wait_total / completed * 1000 if completed else 0.0,
+                "max_wait_ms": self._wait_max * 1000,
+                "avg_run_ms": self._run_total / completed * 1000 if completed else 0.0,
+            }
+
+
+# --------------------------
+# نمونهٔ سراسری
+# --------------------------
+_HASHER_LOCK = threading.Lock()
+_HASHER = None
+
+
+def password_hasher(**options) -> PasswordHasher:
+    """هش‌کنندهٔ مشترک پردازه؛ `options` فقط در اولین فراخوانی استفاده می‌شوند."""
+    global _HASHER
+    with _HASHER_LOCK:
+        if _HASHER is None:
+            _HASHER = PasswordHasher(**options)
+        return _HASHER
@@ -0,0 +1,135 @@
+"""رجیستری stylesheetها: هر قطعهٔ CSS فقط یک بار در هر نشست مرورگر فرستاده می‌شود.
+
+Streamlit در هر rerun همهٔ عناصر را دوباره می‌فرستد و عنصری که در rerun بعدی تکرار
+نشود از صفحه حذف می‌شود؛ پس `<style>`ی که با `st.markdown` فرستاده شود باید در هر
+rerun (و برای CSS داخل حلقه‌ها، هر بار) دوباره روی websocket برود.
+
+اینجا هر قطعهٔ CSS یک بار در سطح پردازه کوچک‌سازی (minify) و با هش محتوا نام‌گذاری
+می‌شود. اسکریپت برای هر نشست فهرست هش‌های فرستاده‌شده را در `session_state` نگه
+می‌دارد و فقط قطعه‌هایی را که خود همین نشست ثبت می‌کند و هنوز نفرستاده، با یک iframe
+بی‌ارتفاع به سند اصلی صفحه اضافه می‌کند
+(`<style id="k2-style-<hash>">` در انتهای body، تا مثل قبل بعد از CSS خود Streamlit
+بیاید). آن استایل‌ها با rerun پاک نمی‌شوند، پس rerunهای بعدی فقط markup می‌فرستند.
+"""
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+
+_STYLE_TAG = re.compile(r"</?style[^>]*>", re.IGNORECASE)
+# توضیح، رشتهٔ نقل‌قول‌دار یا url(...)، به ترتیب ظاهر شدن در متن (تا ' داخل توضیح رشته حساب نشود)
+_TOKEN = re.compile(
+    r"""/\*.*?\*/|"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|url\(\s*(?:"[^"]*"|'[^']*'|[^)]*?)\s*\)""",
+    re.DOTALL | re.IGNORECASE,
+)
+_PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+_SPACE = re.compile(r"\s+")
+_AROUND = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(css: str) -> str:
+    """حذف تگ‌های style، توضیحات و فاصله‌های زائد یک قطعهٔ CSS.
+
+    رشته‌های نقل‌قول‌دار و `url(...)` دست نمی‌خورند (مثلاً فاصله و ویرگول در
+    `content: "a, b"` یا نام فایل فونت).
+    """
+    literals = []
+
+    def protect(match):
+        token = match.group(0)
+        if token.startswith("/*"):
+            return ""
+        literals.append(token)
+        return f"\x00{len(literals) - 1}\x00"
+
+    css = _TOKEN.sub(protect, _STYLE_TAG.sub("", css))
+    css = _AROUND.sub(r"\1", _SPACE.sub(" ", css)).replace(";}", "}").strip()
+    return _PLACEHOLDER.sub(lambda match: literals[int(match.group(1))], css)
+
+
+class StyleRegistry:
+    """قطعه‌های CSS نام‌دار، کوچک‌شده و هش‌شده، مشترک بین همهٔ نشست‌ها.
+
+    ترتیب قطعه‌ها ترتیب اولین ثبت آن‌هاست و با ثبت دوبارهٔ یک نام (مثلاً بعد از تغییر
+    CSS در توسعه) فقط محتوای آن عوض می‌شود.
+
+    Args:
+        max_minified (int): سقف تعداد CSSهای خام که نتیجهٔ کوچک‌سازی‌شان (LRU) نگه داشته می‌شود.
+    """
+
+    def __init__(self, *, max_minified: int = 256):
+        self._lock = threading.Lock()
+        self._fragments = {}  # نام -> (هش، CSS کوچک‌شده)
+        self.max_minified = max_minified
+        self._minified = OrderedDict()  # CSS خام -> (هش، CSS کوچک‌شده)
+        self._raw_bytes = {}  # نام -> اندازهٔ CSS خام
+
+    def register(self, name: str, css: str) -> str:
+        """ثبت (یا به‌روزرسانی) یک قطعه؛ هش محتوای کوچک‌شده را برمی‌گرداند."""
+        with self._lock:
+            entry = self._minified.get(css)
+            if entry is None:
+                minified = minify_css(css)
+                entry = (hashlib.sha256(minified.encode("utf-8")).hexdigest()[:12], minified)
+                self._minified[css] = entry
+                while len(self._minified) > self.max_minified:
+                    self._minified.popitem(last=False)
+            else:
+                self._minified.move_to_end(css)
+            self._fragments[name] = entry
+            self._raw_bytes[name] = len(css.encode("utf-8"))
+            return entry[0]
+
+    def pending(self, sent, names) -> list:
+        """[(هش، CSS)] قطعه‌های `names` (ثبت‌شده در همین نشست) که هششان در `sent` نیست."""
+        with self._lock:
+            entries = (self._fragments.get(name) for name in names)
+            return [entry for entry in entries if entry is not None and entry[0] not in sent]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "fragments": len(self._fragments),
+                "raw_bytes": sum(self._raw_bytes.values()),
+                "minified_bytes": sum(len(css.encode("utf-8")) for _, css in self._fragments.values()),
+            }
+
+
+def style_injector(fragments) -> str:
+    """HTML یک iframe که قطعه‌های داده‌شده را (اگر از قبل نباشند) به سند اصلی اضافه می‌کند.
+
+    Args:
+        fragments (list): زوج‌های (هش، CSS) از `StyleRegistry.pending`.
+
+    Returns:
+        str: ورودی `streamlit.components.v1.html`.
+    """
+    payload = json.dumps([[f"k2-style-{digest}", css] for digest, css in fragments], ensure_ascii=False)
+    payload = payload.replace("</", "<\\/")
+    return (
+        "<script>"
+        f"for (const [id, css] of {payload}) {{"
+        "if (parent.document.getElementById(id)) continue;"
+        "const style = parent.document.createElement('style');"
+        "style.id = id; style.textContent = css;"
+        "parent.document.body.appendChild(style);"
+        "}"
+        "</script>"
+    )
+
+
+# --------------------------
+# نمونهٔ سراسری
+# --------------------------
+_REGISTRY_LOCK = threading.Lock()
+_REGISTRY = None
+
+
+def style_registry() -> StyleRegistry:
+    """رجیستری مشترک پردازه."""
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = StyleRegistry()
+        return _REGISTRY
@@ -0,0 +1,186 @@
+"""محدودسازی تلاش‌های ورود با سطل توکن (token bucket) و قفل نمایی.
+
+هر کلید (مثلاً ("user", نام کاربر) یا ("client", IP)) یک سطل دارد که با نرخ ثابت پر
+می‌شود و هر تلاش یک توکن برمی‌دارد؛ سطل خالی یعنی تلاش رد می‌شود. جدا از آن، شکست‌های
+پشت‌سرهم هر کلید شمرده می‌شوند و بعد از `max_failures` شکست، کلید برای مدتی که با
+هر شکست بعدی دو برابر می‌شود قفل می‌شود. ورود موفق شمارندهٔ شکست را صفر می‌کند.
+
+وضعیت در حافظهٔ پردازه و مشترک بین همهٔ نشست‌هاست، با سقف تعداد کلید تا سیل نام‌های
+تصادفی حافظه را پر نکند. برای جا باز کردن فقط سطل‌هایی کنار گذاشته می‌شوند که چیزی
+را فراموش نمی‌کنند (پر، بی‌قفل و بی‌شکست؛ قدیمی‌ترین اول)، وگرنه قفل یک قربانی با
+پاشیدن کلیدهای تازه پاک می‌شد. اگر چنین سطلی نباشد، کلید تازه پذیرفته نمی‌شود و
+تلاشش رد می‌شود.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "failures", "locked_until")
+
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+        self.failures = 0
+        self.locked_until = 0.0
+
+
+class LoginThrottle:
+    """سطل‌های توکن و قفل نمایی برای کلیدهای دلخواه.
+
+    Args:
+        limits (dict): برای هر نوع کلید (عنصر اول کلید، مثلاً "user") زوج
+            (ظرفیت سطل، توکن در ثانیه).
+        max_failures (int): تعداد شکست پشت‌سرهم پیش از اولین قفل.
+        lockout (float): مدت اولین قفل بر حسب ثانیه؛ هر شکست بعدی آن را دو برابر می‌کند.
+        max_lockout (float): سقف مدت قفل.
+        max_keys (int): سقف تعداد کلیدهای نگه‌داشته‌شده.
+    """
+
+    def __init__(
+            self,
+            limits: dict,
+            *,
+            max_failures: int = 5,
+            lockout: float = 30.0,
+            max_lockout: float = 3600.0,
+            max_keys: int = 10_000,
+    ):
+        self.limits = dict(limits)
+        self.max_failures = max_failures
+        self.lockout = lockout
+        self.max_lockout = max_lockout
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._allowed = 0
+        self._throttled = 0
+        self._lockouts = 0
+        self._evictions = 0
+        self._refused = 0
+
+    def _evictable(self, key, bucket: _Bucket, now: float) -> bool:
+        """آیا حذف سطل چیزی را فراموش نمی‌کند: قفل نیست، دوباره پر شده و شکستی ندارد.
+
+        شکست‌های سطلی که `max_lockout` ثانیه تلاشی نداشته کهنه حساب می‌شوند تا سطل‌های
+        یک‌بار شکست‌خورده جدول را برای همیشه پر نکنند.
+        """
+        if bucket.locked_until > now:
+            return False
+        if bucket.failures and now - bucket.updated < self.max_lockout:
+            return False
+        capacity, rate = self.limits[key[0]]
+        return bucket.tokens + (now - bucket.updated) * rate >= capacity
+
+    def _bucket(self, key, now: float):
+        """سطل کلید، پرشده به اندازهٔ زمان گذشته (زیر قفل صدا زده می‌شود).
+
+        Returns:
+            _Bucket | None: None اگر کلید تازه باشد و جایی برایش باز نشود.
+        """
+        capacity, rate = self.limits[key[0]]
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                victim = next(
+                    (old for old, old_bucket in self._buckets.items()
+                     if self._evictable(old, old_bucket, now)),
+                    None,
+                )
+                if victim is None:
+                    self._refused += 1
+                    return None
+                del self._buckets[victim]
+                self._evictions += 1
+            bucket = _Bucket(capacity, now)
+            self._buckets[key] = bucket
+        else:
+            bucket.tokens = min(capacity, bucket.tokens + (now - bucket.updated) * rate)
+            bucket.updated = now
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def acquire(self, *keys) -> float:
+        """برداشتن یک توکن از سطل همهٔ کلیدها؛ پیش از هر کار پرهزینه صدا زده شود.
+
+        کلیدهای None نادیده گرفته می‌شوند. توکن فقط وقتی برداشته می‌شود که همهٔ کلیدها اجازه دهند.
+        اگر برای کلید تازه‌ای جا نباشد، تلاش به اندازهٔ پر شدن یک توکن آن نوع کلید رد می‌شود.
+
+        Returns:
+            float: ۰ اگر تلاش مجاز باشد؛ در غیر این صورت چند ثانیه بعد می‌توان دوباره تلاش کرد.
+        """
+        now = time.monotonic()
+        keys = [key for key in keys if key is not None]
+        with self._lock:
+            buckets = [(key, self._bucket(key, now)) for key in keys]
+            retry_after = 0.0
+            for key, bucket in buckets:
+                if bucket is None:
+                    retry_after = max(retry_after, 1 / self.limits[key[0]][1])
+                elif bucket.locked_until > now:
+                    retry_after = max(retry_after, bucket.locked_until - now)
+                elif bucket.tokens < 1:
+                    retry_after = max(retry_after, (1 - bucket.tokens) / self.limits[key[0]][1])
+            if retry_after:
+                self._throttled += 1
+                return retry_after
+            for _, bucket in buckets:
+                bucket.tokens -= 1
+            self._allowed += 1
+            return 0.0
+
+    def failure(self, *keys):
+        """ثبت یک شکست (مثلاً رمز اشتباه)؛ از `max_failures` به بعد کلید قفل می‌شود."""
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                if key is None:
+                    continue
+                bucket = self._bucket(key, now)
+                if bucket is None:
+                    continue
+                bucket.failures += 1
+                excess = bucket.failures - self.max_failures
+                if excess >= 0:
+                    bucket.locked_until = now + min(self.max_lockout, self.lockout * 2 ** excess)
+                    self._lockouts += 1
+
+    def success(self, *keys):
+        """صفر کردن شمارندهٔ شکست کلیدها بعد از ورود موفق."""
+        with self._lock:
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.failures = 0
+                    bucket.locked_until = 0.0
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "keys": len(self._buckets),
+                "max_keys": self.max_keys,
+                "locked": sum(1 for bucket in self._buckets.values() if bucket.locked_until > now),
+                "allowed": self._allowed,
+                "throttled": self._throttled,
+                "lockouts": self._lockouts,
+                "evictions": self._evictions,
+                "refused": self._refused,
+            }
+
+
+# --------------------------
+# نمونهٔ سراسری
+# --------------------------
+_THROTTLE_LOCK = threading.Lock()
+_THROTTLE = None
+
+
+def login_throttle(limits: dict, **options) -> LoginThrottle:
+    """محدودکنندهٔ مشترک پردازه؛ آرگومان‌ها فقط در اولین فراخوانی استفاده می‌شوند."""
+    global _THROTTLE
+    with _THROTTLE_LOCK:
+        if _THROTTLE is None:
+            _THROTTLE = LoginThrottle(limits, **options)
+        return _THROTTLE
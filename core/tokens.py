@@ -0,0 +1,142 @@
+"""توکن نشست امضاشده با HMAC برای «مرا به خاطر بسپار».
+
+با هر refresh مرورگر نشست Streamlit و `session_state` از نو ساخته می‌شود. به‌جای
+ورود دوباره (یک خواندن کاربر + یک bcrypt)، توکنی که هنگام ورود صادر شده از کوکی
+خوانده و فقط امضا، انقضا، فهرست ابطال و نسل توکن کاربر بررسی می‌شود؛ همه در
+حافظه و در حد میکروثانیه.
+
+ساختار توکن: `base64url(JSON ادعاها) + "." + base64url(HMAC-SHA256)`. ادعاها نام
+کاربر، نقش، نسل توکن کاربر (`users.token_generation`، با تغییر رمز یا نقش یکی زیاد می‌شود)،
+زمان انقضا و شناسهٔ تصادفی توکن‌اند.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class SessionTokens:
+    """صدور و اعتبارسنجی توکن‌های نشست.
+
+    فهرست ابطال (خروج کاربر) در حافظهٔ پردازه است و هر شناسه فقط تا انقضای خود
+    توکن نگه داشته می‌شود؛ ابطال همهٔ توکن‌های یک کاربر با بالا بردن نسل توکن او
+    (در پایگاه داده) انجام می‌شود.
+
+    Args:
+        secret (bytes): کلید HMAC؛ اگر None باشد یک کلید تصادفی برای همین پردازه ساخته
+            می‌شود (توکن‌ها با راه‌اندازی دوباره باطل می‌شوند).
+        ttl (float): عمر توکن بر حسب ثانیه.
+    """
+
+    def __init__(self, secret: bytes = None, *, ttl: float = 30 * 24 * 3600):
+        self._secret = secret or secrets.token_bytes(32)
+        self.ttl = ttl
+        self._revoked = {}  # شناسهٔ توکن -> زمان انقضا
+        self._lock = threading.Lock()
+        self._issued = 0
+        self._accepted = 0
+        self._rejected = 0
+
+    def _sign(self, payload: str) -> str:
+        # utf-8 تا payload دستکاری‌شده با نویسهٔ غیر ASCII به‌جای خطا فقط امضای نادرست بگیرد
+        return _b64encode(hmac.new(self._secret, payload.encode("utf-8"), hashlib.sha256).digest())
+
+    def issue(self, username: str, role: str, generation: int) -> str:
+        claims = {
+            "u": username,
+            "r": role,
+            "g": generation,
+            "e": int(time.time() + self.ttl),
+            "j": secrets.token_hex(8),
+        }
+        payload = _b64encode(json.dumps(claims, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            self._issued += 1
+        return f"{payload}.{self._sign(payload)}"
+
+    def _claims(self, token):
+        """ادعاهای یک توکن با امضای درست و منقضی‌نشده؛ در غیر این صورت None."""
+        if not token or token.count(".") != 1:
+            return None
+        payload, signature = token.split(".")
+        # compare_digest روی str غیر ASCII خطا می‌دهد؛ مقایسه روی bytes
+        if not hmac.compare_digest(signature.encode("utf-8"), self._sign(payload).encode("ascii")):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        if claims.get("e", 0) <= time.time():
+            return None
+        return claims
+
+    def verify(self, token, generation_of):
+        """اعتبارسنجی توکن.
+
+        Args:
+            token (str): مقدار کوکی.
+            generation_of (callable): `generation_of(username)` نسل فعلی توکن‌های کاربر،
+                یا None اگر کاربر وجود نداشته باشد.
+
+        Returns:
+            dict | None: {"username", "role"} اگر توکن معتبر باشد؛ در غیر این صورت None.
+        """
+        claims = self._claims(token)
+        valid = claims is not None
+        if valid:
+            with self._lock:
+                valid = claims["j"] not in self._revoked
+        if valid:
+            valid = generation_of(claims["u"]) == claims["g"]
+        with self._lock:
+            if valid:
+                self._accepted += 1
+            else:
+                self._rejected += 1
+        return {"username": claims["u"], "role": claims["r"]} if valid else None
+
+    def revoke(self, token):
+        """افزودن توکن به فهرست ابطال (مثلاً هنگام خروج)؛ توکن نامعتبر نادیده گرفته می‌شود."""
+        claims = self._claims(token)
+        if claims is None:
+            return
+        now = time.time()
+        with self._lock:
+            self._revoked = {jti: expires for jti, expires in self._revoked.items() if expires > now}
+            self._revoked[claims["j"]] = claims["e"]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "issued": self._issued,
+                "accepted": self._accepted,
+                "rejected": self._rejected,
+                "revoked": len(self._revoked),
+            }
+
+
+# --------------------------
+# نمونهٔ سراسری
+# --------------------------
+_TOKENS_LOCK = threading.Lock()
+_TOKENS = None
+
+
+def session_tokens(secret: bytes = None, **options) -> SessionTokens:
+    """صادرکنندهٔ مشترک پردازه؛ آرگومان‌ها فقط در اولین فراخوانی استفاده می‌شوند."""
+    global _TOKENS
+    with _TOKENS_LOCK:
+        if _TOKENS is None:
+            _TOKENS = SessionTokens(secret, **options)
+        return _TOKENS
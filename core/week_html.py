@@ -0,0 +1,361 @@
+"""HTML یک هفته در تاریخچه (هدر، کارت فعالیت‌ها، یادداشت‌ها و بازخورد) در یک رشته.
+
+قبلاً هر تکه با یک `st.markdown` جدا فرستاده می‌شد: برای هفته‌ای با n فعالیت حدود
+۲n+۳ عنصر Streamlit (هر کدام یک delta و یک گره DOM)، و `<div>` فهرست فعالیت‌ها که در
+یک عنصر باز و در عنصر دیگری بسته می‌شد اصلاً درست تو در تو نمی‌شد. اینجا همهٔ تکه‌ها
+در یک بافر جمع و با یک عنصر فرستاده می‌شوند.
+
+هفته‌های ذخیره‌شده تغییر نمی‌کنند، پس HTML هر هفته یک بار ساخته و در `WeekHtmlCache`
+(مشترک بین همهٔ نشست‌ها و rerunها) با کلید هش محتوای هفته نگه داشته می‌شود.
+
+قالب‌ها یک بار هنگام import فشرده می‌شوند (شکستن خط و تورفتگی حذف می‌شود تا Markdown
+هیچ خطی را بلوک کد نداند) و بعد فقط با `str.format` پر می‌شوند. همهٔ متن‌های کاربر
+(نام، یادداشت، بازخورد، نام کاربر و تاریخ‌ها) escape می‌شوند و شکستن خط در آن‌ها به
+`<br>` تبدیل می‌شود؛ یک خط خالی در یادداشت، بلوک HTML مارک‌داون را می‌بست و بقیهٔ
+هفته به‌صورت متن خام نمایش داده می‌شد.
+"""
+import hashlib
+import html
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from core.cache import named_cache
+
+
+def _compact(template: str) -> str:
+    return re.sub(r"\n\s*", "", template.strip())
+
+
+# --------------------------
+# استایل‌های نشان‌ها و نوار پیشرفت
+# --------------------------
+BADGE_GREEN = "background: rgba(34, 197, 94, 0.2); color: #4ade80; border: 1px solid rgba(34, 197, 94, 0.3);"
+BADGE_AMBER = "background: rgba(251, 191, 36, 0.2); color: #fbbf24; border: 1px solid rgba(251, 191, 36, 0.3);"
+BADGE_RED = "background: rgba(239, 68, 68, 0.2); color: #f87171; border: 1px solid rgba(239, 68, 68, 0.3);"
+BADGE_GRAY = "background: rgba(156, 163, 175, 0.2); color: #9ca3af; border: 1px solid rgba(156, 163, 175, 0.3);"
+
+BAR_GREEN = "background: linear-gradient(90deg, #10b981, #059669);"
+BAR_AMBER = "background: linear-gradient(90deg, #f59e0b, #d97706);"
+BAR_RED = "background: linear-gradient(90deg, #ef4444, #dc2626);"
+
+# --------------------------
+# قالب‌ها
+# --------------------------
+USER_BADGE = _compact("""
+    <div class="header-badge" style="background: rgba(34, 197, 94, 0.2); color: #4ade80;
+        border: 1px solid rgba(34, 197, 94, 0.3);">👤 {username}</div>
+""")
+
+SCORE_BADGE = _compact("""
+    <div class="header-badge" style="background: rgba(59, 130, 246, 0.2); color: #60a5fa;
+        border: 1px solid rgba(59, 130, 246, 0.3);">✨ {week_total}%</div>
+""")
+
+DIFF_BADGE = '<div class="header-badge" style="{style}">{emoji} {progress_diff}%</div>'
+
+HEADER = _compact("""
+    <div class="header-container">
+        <div class="header-top">
+            <div class="header-date">🗓️ {week_start} تا {week_end}</div>
+            <div class="header-badges">{user_badge}{score_badge}{diff_badge}</div>
+        </div>
+    </div>
+""")
+
+ACTIVITIES_OPEN = _compact("""
+    <div style="margin-bottom: 16px;">
+        <h4 style="color: #e2e8f0; margin: 0 0 16px 0; font-size: 18px; direction: rtl;">
+            📋 فعالیت‌ها ({count})
+        </h4>
+""")
+
+ACTIVITIES_CLOSE = "</div>"
+
+CARD = _compact("""
+    <div class="activity-card">
+        <div class="activity-header">
+            <div class="activity-name">{idx}. {name}</div>
+            <div class="activity-badge" style="{badge_style}">{emoji} {percent}%</div>
+        </div>
+        <div class="activity-stats">
+            <div class="activity-stat-item">🧗 انجام: {done}</div>
+            <div class="activity-stat-item">🎯 هدف: {target}</div>
+            <div class="activity-stat-item">{status} وضعیت: {status_text}</div>
+        </div>
+        <div class="activity-progress-container">
+            <div class="activity-progress-fill" style="width: {percent}%; {bar_style}">
+                <span class="activity-progress-text">{percent}%</span>
+            </div>
+        </div>
+    </div>
+""")
+
+NOTE = _compact("""
+    <div style="background: rgba(15, 23, 42, 0.6); border-radius: 8px; padding: 12px; margin-top: 8px;
+        border: 1px solid rgba(148, 163, 184, 0.2); font-size: 13px; color: #e2e8f0;
+        line-height: 1.6; direction: rtl;">📝 {note}</div>
+""")
+
+FEEDBACK = _compact("""
+    <div class="feedback-card">
+        <div class="feedback-header" style="display: flex; justify-content: space-between; align-items: center;">
+            <div>📝 بازخورد کلی هفته :</div>
+            <span class="feedback-sentiment-badge" style="{style}">{emoji} حس کلی: {sentiment}</span>
+        </div>
+        <div class="feedback-content">{feedback}</div>
+    </div>
+""")
+
+FEEDBACK_PLACEHOLDER = _compact("""
+    <div class="feedback-card">
+        <div class="feedback-header">📝 بازخورد کلی هفته</div>
+        <div class="feedback-placeholder">
+            💭 بازخوردی ثبت نشده است. تجربیاتت رو بنویس تا مسیرت بهتر بشه! (مثل چالش‌ها یا موفقیت‌های این هفته)
+        </div>
+    </div>
+""")
+
+POSITIVE_WORDS = ("عالی", "خوب", "موفق", "لذت", "پیشرفت", "انرژی", "افتخار")
+NEGATIVE_WORDS = ("سخت", "خسته", "فراموش", "مشکل", "افت")
+
+
+def _line_breaks(text: str) -> str:
+    return text.replace("\r\n", "\n").replace("\r", "\n").replace("\n", "<br>")
+
+
+def escape_text(text: str) -> str:
+    """`html.escape` یک متن کاربر با `<br>` به‌جای شکستن خط (امن داخل یک بلوک HTML)."""
+    return _line_breaks(html.escape(text))
+
+
+def feedback_sentiment(feedback: str):
+    """(حس کلی، ایموجی، استایل نشان) بازخورد هفته با جستجوی چند واژهٔ کلیدی."""
+    text = feedback.lower()
+    if any(word in text for word in POSITIVE_WORDS):
+        return "Positive", "🧗‍♂️", BADGE_GREEN
+    if any(word in text for word in NEGATIVE_WORDS):
+        return "Negative", "🧭", BADGE_AMBER
+    return "Neutral", "🪢", BADGE_GRAY
+
+
+def week_header_html(week, username: str = None, is_admin: bool = False) -> str:
+    progress_diff = int(week.get("progress_diff", 0))
+    if progress_diff > 0:
+        diff_style, diff_emoji = "background: rgba(34, 197, 94, 0.2); color: #4ade80; border: 1px solid rgba(34, 197, 94, 0.4);", "📈"
+    elif progress_diff < 0:
+        diff_style, diff_emoji = BADGE_RED, "📉"
+    else:
+        diff_style, diff_emoji = "background: rgba(156, 163, 184, 0.2); color: #94a3b8; border: 1px solid rgba(156, 163, 184, 0.3);", "🪨"
+    return HEADER.format(
+        week_start=html.escape(str(week["week_start"])),
+        week_end=html.escape(str(week["week_end"])),
+        user_badge=USER_BADGE.format(username=html.escape(username)) if is_admin and username else "",
+        score_badge=SCORE_BADGE.format(week_total=int(week.get("week_total_score", 0))),
+        diff_badge=DIFF_BADGE.format(style=diff_style, emoji=diff_emoji, progress_diff=progress_diff),
+    )
+
+
+def escape_html(values: pd.Series) -> np.ndarray:
+    """معادل برداری `escape_text` روی یک ستون (None/NaN → رشتهٔ خالی).
+
+    همهٔ مقدارها با NUL به هم چسبانده می‌شوند تا escape در یک گذر (C) روی کل ستون انجام
+    شود؛ NUL در escape دست نمی‌خورد، پس دوباره به همان تعداد تکه شکسته می‌شود.
+    """
+    text = values.fillna("").astype(str).tolist()
+    if not text:
+        return np.array([], dtype=object)
+    joined = "\0".join(text)
+    if joined.count("\0") != len(text) - 1:  # خود مقدارها NUL دارند
+        return np.array([escape_text(value) for value in text], dtype=object)
+    return np.array(escape_text(joined).split("\0"), dtype=object)
+
+
+def _int_column(activities: pd.DataFrame, column: str) -> np.ndarray:
+    if column not in activities:
+        return np.zeros(len(activities), dtype=np.int64)
+    return pd.to_numeric(activities[column], errors="coerce").fillna(0).to_numpy().astype(np.int64)
+
+
+def activity_attributes(activities: pd.DataFrame) -> dict:
+    """همهٔ ویژگی‌های نمایشی کارت‌ها در یک گذر برداری (بدون iterrows).
+
+    Returns:
+        dict: آرایه‌های هم‌طول name، note، percent، done، target، badge_style، emoji،
+            bar_style، status و status_text به ترتیب سطرهای `activities`.
+    """
+    percent = _int_column(activities, "percent")
+    done = _int_column(activities, "done")
+    target = _int_column(activities, "target")
+    tiers = [percent >= 80, percent >= 50]
+    complete = done >= target
+    empty = pd.Series([""] * len(activities), index=activities.index, dtype=object)
+    return {
+        "name": escape_html(activities.get("name", empty)),
+        "note": escape_html(activities.get("note", empty)),
+        "percent": percent,
+        "done": done,
+        "target": target,
+        "badge_style": np.select(tiers, [BADGE_GREEN, BADGE_AMBER], default=BADGE_RED),
+        "emoji": np.select(tiers, ["🧗‍♂️", "🧭"], default="🪢"),
+        "bar_style": np.select(tiers, [BAR_GREEN, BAR_AMBER], default=BAR_RED),
+        "status": np.where(complete, "✅", "🔄"),
+        "status_text": np.where(complete, "کامل", np.char.add(np.char.add(done.astype(str), "/"), target.astype(str))),
+    }
+
+
+def activity_cards_html(activities: pd.DataFrame) -> list:
+    """کارت (و یادداشت) هر فعالیت به ترتیب `saved_at_dt`."""
+    attrs = activity_attributes(activities.sort_values("saved_at_dt", ascending=True))
+    parts = []
+    for idx, name, note, percent, done, target, badge_style, emoji, bar_style, status, status_text in zip(
+            range(1, len(attrs["name"]) + 1), attrs["name"], attrs["note"], attrs["percent"].tolist(),
+            attrs["done"].tolist(), attrs["target"].tolist(), attrs["badge_style"], attrs["emoji"],
+            attrs["bar_style"], attrs["status"], attrs["status_text"],
+    ):
+        parts.append(CARD.format(
+            idx=idx, name=name, badge_style=badge_style, emoji=emoji, percent=percent, done=done,
+            target=target, status=status, status_text=status_text, bar_style=bar_style,
+        ))
+        if note:
+            parts.append(NOTE.format(note=note))
+    return parts
+
+
+def feedback_html(week) -> str:
+    feedback = str(week.get("week_feedback") or "").strip()
+    if not feedback:
+        return FEEDBACK_PLACEHOLDER
+    sentiment, emoji, style = feedback_sentiment(feedback)
+    return FEEDBACK.format(style=style, emoji=emoji, sentiment=sentiment, feedback=escape_text(feedback))
+
+
+def week_html_parts(week, activities: pd.DataFrame, username: str = None, is_admin: bool = False) -> list:
+    """تکه‌های HTML یک هفته به ترتیب نمایش (برای بنچمارک روش چندعنصری هم استفاده می‌شود)."""
+    return [
+        week_header_html(week, username, is_admin),
+        ACTIVITIES_OPEN.format(count=len(activities)),
+        *activity_cards_html(activities),
+        ACTIVITIES_CLOSE,
+        feedback_html(week),
+    ]
+
+
+def render_week_html(week, activities: pd.DataFrame, username: str = None, is_admin: bool = False) -> str:
+    """کل HTML یک هفته، برای یک `st.markdown(..., unsafe_allow_html=True)`.
+
+    Args:
+        week (Mapping): ردیف هفته با week_start، week_end، week_total_score، progress_diff و week_feedback.
+        activities (pd.DataFrame): فعالیت‌های هفته با name، target، done، percent، note و saved_at_dt.
+        username (str, اختیاری): نام کاربر، برای نشان کاربر در نمای ادمین.
+        is_admin (bool, اختیاری): نمایش نشان نام کاربر.
+
+    Returns:
+        str: HTML بدون شکستن خط.
+    """
+    return "".join(week_html_parts(week, activities, username, is_admin))
+
+
+# --------------------------
+# کش HTML هفته‌ها
+# --------------------------
+# فیلدهایی که در HTML هفته دیده می‌شوند (و در نتیجه در هش محتوا می‌آیند)
+HASHED_WEEK_FIELDS = ("week_start", "week_end", "week_total_score", "progress_diff", "week_feedback")
+HASHED_ACTIVITY_FIELDS = ("name", "target", "done", "percent", "note", "saved_at_dt")
+# ستون اختیاری هش از پیش محاسبه‌شدهٔ هر ردیف فعالیت (`activity_row_hashes`)
+ROW_HASH = "row_hash"
+
+WEEK_HTML_CACHE_BYTES = 16 * 1024 * 1024
+
+
+def activity_row_hashes(activities: pd.DataFrame) -> np.ndarray:
+    """هش uint64 هر ردیف فعالیت روی `HASHED_ACTIVITY_FIELDS`، در یک گذر برداری.
+
+    برای چند هفته بهتر است یک بار روی کل فریم فعالیت‌ها صدا زده و در ستون `ROW_HASH`
+    گذاشته شود؛ هش ۵ ردیف تقریباً هم‌هزینهٔ ساختن HTML همان هفته است.
+    """
+    if ROW_HASH in activities:
+        return activities[ROW_HASH].to_numpy(dtype=np.uint64)
+    columns = [column for column in HASHED_ACTIVITY_FIELDS if column in activities]
+    return pd.util.hash_pandas_object(activities[columns], index=False).to_numpy()
+
+
+def week_fingerprint(week, activities: pd.DataFrame, owner: str = None) -> str:
+    """هش محتوای هفته: فیلدهای نمایشی هفته، ردیف‌های فعالیت به ترتیب و نشان کاربر."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((*(week.get(field) for field in HASHED_WEEK_FIELDS), owner)).encode("utf-8"))
+    digest.update(np.ascontiguousarray(activity_row_hashes(activities)).tobytes())
+    return digest.hexdigest()
+
+
+class WeekHtmlCache:
+    """HTML رسم‌شدهٔ هفته‌ها روی یک `LRUCache` مشترک، با کلید (شناسهٔ هفته، کاربر نشان، هش محتوا).
+
+    چون کلید از محتوا ساخته می‌شود، هفتهٔ ویرایش‌شده هیچ‌وقت HTML قدیمی نمی‌گیرد؛ آخرین
+    هش هر (هفته، کاربر نشان) هم نگه داشته می‌شود تا مدخل قدیمی همان لحظه حذف شود و
+    تا بیرون رفتن از LRU جا نگیرد. مسیرهای نوشتن می‌توانند با `evict_week` هم
+    مدخل‌های یک هفته را صریحاً حذف کنند.
+
+    این نمایه خودش هم LRU با سقف `max_weeks` است؛ هفته‌ای که از آن بیرون برود فقط
+    ممکن است یک مدخل یتیم در کش جا بگذارد که هیچ‌وقت خوانده نمی‌شود و با LRU کش بیرون می‌رود.
+
+    Args:
+        cache (LRUCache): کش مشترک HTMLها.
+        max_weeks (int): سقف تعداد هفته‌های نمایهٔ آخرین هش.
+    """
+
+    def __init__(self, cache, *, max_weeks: int = 8192):
+        self.cache = cache
+        self.max_weeks = max_weeks
+        self._lock = threading.Lock()
+        self._latest = OrderedDict()  # week_id -> {owner: digest}
+
+    def render(self, week, activities: pd.DataFrame, username: str = None, is_admin: bool = False) -> str:
+        """مانند `render_week_html`، از کش اگر همین محتوا قبلاً رسم شده باشد."""
+        week_id = week.get("id")
+        owner = username if is_admin else None  # نشان کاربر فقط در نمای ادمین
+        digest = week_fingerprint(week, activities, owner)
+        with self._lock:
+            variants = self._latest.setdefault(week_id, {})
+            self._latest.move_to_end(week_id)
+            previous = variants.get(owner)
+            variants[owner] = digest
+            while len(self._latest) > self.max_weeks:
+                self._latest.popitem(last=False)
+        if previous is not None and previous != digest:
+            self.cache.invalidate((week_id, owner, previous))
+        return self.cache.get_or_load(
+            (week_id, owner, digest), lambda: render_week_html(week, activities, username, is_admin)
+        )
+
+    def evict_week(self, *week_ids):
+        """حذف همهٔ مدخل‌های هفته‌های داده‌شده (بعد از ویرایش یا حذف)."""
+        with self._lock:
+            keys = [
+                (week_id, owner, digest)
+                for week_id in week_ids
+                for owner, digest in self._latest.pop(week_id, {}).items()
+            ]
+        self.cache.invalidate(*keys)
+
+    def stats(self) -> dict:
+        stats = self.cache.stats()
+        with self._lock:
+            stats["weeks"] = len(self._latest)
+        return stats
+
+
+_CACHE_LOCK = threading.Lock()
+_CACHE = None
+
+
+def week_html_cache() -> WeekHtmlCache:
+    """کش HTML هفته‌ها، مشترک در کل پردازه."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = WeekHtmlCache(named_cache("week_html", max_bytes=WEEK_HTML_CACHE_BYTES, ttl=None))
+        return _CACHE
@@ -0,0 +1,123 @@
+"""نمایهٔ تقویمی هفته‌های شمسی (شنبه تا جمعه) با جستجوی O(1).
+
+هر هفته یک کلید عدد صحیح دارد که فقط از ordinal میلادی روزهایش به دست می‌آید
+(`week_key`)؛ پس کلید یک هفته به بازهٔ نمایه بستگی ندارد و بین نمایه‌ها، نشست‌ها و
+rerunها ثابت است. نمایه یک بار برای هر بازهٔ سال ساخته و مثل استخرها و کش‌های
+`core` در سطح پردازه نگه داشته می‌شود؛ بعد از آن تاریخ → هفته، کلید → (شروع، پایان)
+و هفتهٔ قبل همه جستجوی جدول‌اند و هیچ تجزیه یا تبدیلی تکرار نمی‌شود.
+"""
+import threading
+from datetime import date
+from typing import NamedTuple
+
+import numpy as np
+
+from core.jalali import canonical_jalali, format_jalali, jalali_to_ordinal, ordinal_to_jalali
+
+
+class Week(NamedTuple):
+    key: int
+    start: str  # شنبه، "YYYY/MM/DD" شمسی
+    end: str  # جمعه، "YYYY/MM/DD" شمسی
+    start_date: date
+    end_date: date
+
+    @property
+    def label(self) -> str:
+        return f"{self.start} تا {self.end}"
+
+
+def week_key(ordinal: int) -> int:
+    """کلید هفتهٔ شامل یک روز؛ `ordinal` همان `date.toordinal()` است.
+
+    ordinal ۱ (۱ ژانویهٔ سال ۱) دوشنبه است، پس شنبه‌ها ordinal ≡ ۶ (mod ۷) دارند و
+    `(ordinal + 1) // 7` برای هر شنبه تا جمعهٔ بعدش یک عدد ثابت می‌دهد.
+    """
+    return (ordinal + 1) // 7
+
+
+class WeekIndex:
+    """همهٔ هفته‌های شنبه‌شروعِ سال‌های شمسی `first_year` تا `last_year`.
+
+    هفته‌هایی که از مرز سال‌ها می‌گذرند کامل نگه داشته می‌شوند. کلیدها پیوسته‌اند،
+    پس هفتهٔ قبل و بعد با ±۱ به دست می‌آیند.
+
+    Args:
+        first_year (int): اولین سال شمسی.
+        last_year (int): آخرین سال شمسی.
+    """
+
+    def __init__(self, first_year: int, last_year: int):
+        first_day = int(jalali_to_ordinal(first_year, 1, 1))
+        last_day = int(jalali_to_ordinal(last_year + 1, 1, 1)) - 1
+        self.first_year, self.last_year = first_year, last_year
+        self.first_key, self.last_key = week_key(first_day), week_key(last_day)
+
+        keys = np.arange(self.first_key, self.last_key + 1, dtype=np.int64)
+        starts = keys * 7 - 1
+        start_text = format_jalali(*ordinal_to_jalali(starts)).tolist()
+        end_text = format_jalali(*ordinal_to_jalali(starts + 6)).tolist()
+        self._weeks = [
+            Week(int(key), start, end, date.fromordinal(int(ordinal)), date.fromordinal(int(ordinal) + 6))
+            for key, start, end, ordinal in zip(keys, start_text, end_text, starts)
+        ]
+        # روز شمسی (رشتهٔ استاندارد) → کلید هفته
+        days = np.arange(int(starts[0]), int(starts[-1]) + 7, dtype=np.int64)
+        self._day_keys = dict(zip(format_jalali(*ordinal_to_jalali(days)).tolist(), ((days + 1) // 7).tolist()))
+
+    def __len__(self) -> int:
+        return len(self._weeks)
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key):
+        """هفتهٔ یک کلید؛ اگر بیرون از بازهٔ نمایه باشد None."""
+        if key is None or not self.first_key <= key <= self.last_key:
+            return None
+        return self._weeks[key - self.first_key]
+
+    def week_of(self, value):
+        """هفتهٔ شامل یک روز (`datetime.date` یا رشتهٔ شمسی)؛ نامعتبر یا بیرون از بازه → None."""
+        if isinstance(value, date):
+            return self.get(week_key(value.toordinal()))
+        key = self._day_keys.get(value)
+        if key is None:
+            key = self._day_keys.get(canonical_jalali(value))
+        return None if key is None else self.get(key)
+
+    def current(self, today: date = None):
+        """هفتهٔ جاری (پیش‌فرض: امروز)."""
+        return self.week_of(today or date.today())
+
+    def previous(self, week):
+        """هفتهٔ تقویمی قبل از یک هفته (یا کلید هفته)."""
+        key = week.key if isinstance(week, Week) else week
+        return None if key is None else self.get(key - 1)
+
+    def keys(self, *, until=None, newest_first: bool = True) -> list:
+        """کلید هفته‌ها تا کلید `until` (پیش‌فرض: آخرین هفتهٔ نمایه)، برای selectbox."""
+        last = self.last_key if until is None else min(until, self.last_key)
+        keys = range(self.first_key, last + 1)
+        return list(reversed(keys)) if newest_first else list(keys)
+
+    def label(self, key) -> str:
+        week = self.get(key)
+        return week.label if week else str(key)
+
+
+# --------------------------
+# رجیستری سراسری نمایه‌ها
+# --------------------------
+_REGISTRY_LOCK = threading.Lock()
+_INDEXES = {}
+
+
+def week_index(first_year: int, last_year: int) -> WeekIndex:
+    """نمایهٔ مشترک هفته‌های یک بازهٔ سال (یک نمونه برای هر بازه در کل پردازه)."""
+    with _REGISTRY_LOCK:
+        index = _INDEXES.get((first_year, last_year))
+        if index is None:
+            index = WeekIndex(first_year, last_year)
+            _INDEXES[(first_year, last_year)] = index
+        return index
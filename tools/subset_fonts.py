@@ -0,0 +1,177 @@
+"""ساخت زیرمجموعه‌های فونت Vazir برای وب (مرحلهٔ build، نه زمان اجرا).
+
+از هر فونت دو زیرمجموعه با `unicode-range` ساخته می‌شود:
+
+* `fa`: نویسه‌های رشته‌های رابط کاربری (از literalهای K2.py و main*.py) به‌علاوهٔ
+  بازهٔ قابل تنظیم محتوای کاربر (پیش‌فرض: الفبای فارسی، اعراب، ارقام و نشانه‌گذاری
+  فارسی و ASCII). این همان فایلی است که صفحهٔ اول به آن نیاز دارد.
+* `ext`: بقیهٔ نویسه‌های فونت (لاتین تکمیلی، نمادها، حروف عربی غیرفارسی و ...)؛
+  مرورگر آن را فقط وقتی دانلود می‌کند که صفحه واقعاً یکی از این نویسه‌ها را داشته باشد.
+
+اتصال حروف عربی فقط درون یک فایل فونت کار می‌کند؛ به همین خاطر همهٔ حروف فارسی در
+`fa` می‌مانند و شکل‌های متنی آن‌ها (GSUB) کامل در همان فایل نگه داشته می‌شوند.
+hinting پیش‌فرض حذف می‌شود (مرورگرهای موبایل از آن استفاده نمی‌کنند).
+
+خروجی‌ها (woff2 و woff به‌عنوان جایگزین) و فایل manifest کنار فونت در پوشهٔ `subset/`
+نوشته و در مخزن commit می‌شوند؛ `core.assets.font_face_css` اگر manifest با فونت
+فعلی جور باشد از آن‌ها استفاده می‌کند. نیازمند `pip install fonttools brotli`.
+
+    python -m tools.subset_fonts                 # ساخت دوباره و چاپ گزارش اندازه
+    python -m tools.subset_fonts --check         # کد خروج ۱ اگر زیرمجموعه‌ها کهنه باشند
+    python -m tools.subset_fonts --range "U+0600-06FF,U+200C"
+"""
+import argparse
+import ast
+import io
+import json
+import pathlib
+import sys
+
+from fontTools import subset
+from fontTools.ttLib import TTFont
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from core.assets import content_hash, subset_manifest_path  # noqa: E402
+
+FONTS = [ROOT / "static" / "fonts" / "vazir" / "Vazir-Medium"]
+SOURCES = [ROOT / "K2.py", ROOT / "main.py", ROOT / "main_render.py"]
+FORMATS = {".woff2": "woff2", ".woff": "woff"}
+
+# محتوای کاربر: ASCII، گیومه، نشانه‌گذاری و الفبای فارسی، اعراب، ارقام فارسی و عربی،
+# نیم‌فاصله و نشانه‌های جهت، خط تیره و سه‌نقطه
+USER_CONTENT_RANGE = (
+    "U+0020-007E,U+00A0,U+00AB,U+00BB,U+00D7,U+060C,U+061B,U+061F,U+0621-0655,"
+    "U+0660-066C,U+067E,U+0686,U+0698,U+06A9,U+06AF,U+06C0,U+06CC,U+06F0-06F9,"
+    "U+200C-200F,U+2013-2014,U+2026"
+)
+
+
+def parse_unicode_range(text: str) -> set:
+    """"U+0600-06FF,U+200C" → مجموعهٔ codepointها."""
+    codepoints = set()
+    for part in filter(None, (item.strip() for item in text.split(","))):
+        first, _, last = part.upper().removeprefix("U+").partition("-")
+        codepoints.update(range(int(first, 16), int(last or first, 16) + 1))
+    return codepoints
+
+
+def format_unicode_range(codepoints) -> str:
+    """مجموعهٔ codepointها → مقدار فشردهٔ `unicode-range` در CSS."""
+    runs = []
+    for codepoint in sorted(codepoints):
+        if runs and codepoint == runs[-1][1] + 1:
+            runs[-1][1] = codepoint
+        else:
+            runs.append([codepoint, codepoint])
+    return ",".join(f"U+{first:X}" if first == last else f"U+{first:X}-{last:X}" for first, last in runs)
+
+
+def ui_characters(sources) -> set:
+    """همهٔ نویسه‌های literalهای رشته‌ای (از جمله بخش‌های ثابت f-stringها) در فایل‌های منبع."""
+    characters = set()
+    for path in sources:
+        for node in ast.walk(ast.parse(path.read_text(encoding="utf-8"))):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                characters.update(map(ord, node.value))
+    return characters
+
+
+def build_subset(source: pathlib.Path, codepoints: set, flavor: str, keep_hinting: bool):
+    """(bytes فونت، تعداد glyph) زیرمجموعهٔ `codepoints` با همهٔ ویژگی‌های OpenType."""
+    options = subset.Options()
+    options.layout_features = ["*"]
+    options.hinting = keep_hinting
+    options.drop_tables += ["FFTM", "MATH"]
+    font = TTFont(source)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    font.flavor = flavor
+    buffer = io.BytesIO()
+    font.save(buffer)
+    return buffer.getvalue(), len(font.getGlyphOrder())
+
+
+def plan(stem: pathlib.Path, ui: set, user_range: set) -> list:
+    """[(نام زیرمجموعه، codepointها)] برای یک فونت."""
+    available = set(TTFont(stem.with_suffix(".ttf")).getBestCmap())
+    primary = (ui | user_range) & available
+    return [("fa", primary), ("ext", available - primary)]
+
+
+def build(stem: pathlib.Path, ui: set, user_range: set, keep_hinting: bool) -> dict:
+    """ساخت زیرمجموعه‌های یک فونت، نوشتن فایل‌ها و manifest؛ manifest را برمی‌گرداند."""
+    source = stem.with_suffix(".ttf")
+    out_dir = subset_manifest_path(stem).parent
+    out_dir.mkdir(exist_ok=True)
+    subsets = []
+    for name, codepoints in plan(stem, ui, user_range):
+        if not codepoints:
+            continue
+        entry = {"name": name, "unicode_range": format_unicode_range(codepoints), "files": {}, "bytes": {}}
+        for suffix, flavor in FORMATS.items():
+            data, glyphs = build_subset(source, codepoints, flavor, keep_hinting)
+            filename = f"{stem.name}.{name}{suffix}"
+            (out_dir / filename).write_bytes(data)
+            entry["files"][suffix] = filename
+            entry["bytes"][suffix] = len(data)
+            entry["glyphs"] = glyphs
+        subsets.append(entry)
+    manifest = {"source": source.name, "source_hash": content_hash(source), "subsets": subsets}
+    subset_manifest_path(stem).write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return manifest
+
+
+def report(stem: pathlib.Path, manifest: dict, ui: set):
+    """جدول اندازهٔ فونت کامل در برابر زیرمجموعه‌ها."""
+    available = set(TTFont(stem.with_suffix(".ttf")).getBestCmap())
+    missing = sorted(c for c in ui - available if c > 0x20 and not 0xFE00 <= c <= 0xFE0F)
+    print(f"\n{stem.name}")
+    print(f"{'file':<28}{'glyphs':>8}{'woff2':>10}{'woff':>10}")
+    full = {suffix: stem.with_suffix(suffix).stat().st_size for suffix in FORMATS}
+    print(f"{'(full font)':<28}{len(TTFont(stem.with_suffix('.ttf')).getGlyphOrder()):>8}"
+          f"{full['.woff2']:>10,}{full['.woff']:>10,}")
+    for entry in manifest["subsets"]:
+        print(f"{stem.name + '.' + entry['name']:<28}{entry['glyphs']:>8}"
+              f"{entry['bytes']['.woff2']:>10,}{entry['bytes']['.woff']:>10,}")
+    first = manifest["subsets"][0]["bytes"][".woff2"]
+    print(f"first paint (woff2): {full['.woff2']:,} -> {first:,} bytes ({1 - first / full['.woff2']:.0%} smaller)")
+    if missing:
+        # معمولاً ایموجی‌ها؛ با فونت بعدی در font-family نمایش داده می‌شوند
+        print(f"UI characters not in the font: {len(missing)} ({''.join(map(chr, missing[:20]))} ...)")
+
+
+def is_stale(stem: pathlib.Path, ui: set, user_range: set) -> bool:
+    """آیا manifest نیست، با فونت فعلی جور نیست یا بازه‌هایش با رشته‌های فعلی فرق دارد؟"""
+    path = subset_manifest_path(stem)
+    if not path.is_file():
+        return True
+    manifest = json.loads(path.read_text(encoding="utf-8"))
+    if manifest.get("source_hash") != content_hash(stem.with_suffix(".ttf")):
+        return True
+    expected = [format_unicode_range(codepoints) for _, codepoints in plan(stem, ui, user_range) if codepoints]
+    return expected != [entry["unicode_range"] for entry in manifest["subsets"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--range", default=USER_CONTENT_RANGE, help="بازهٔ یونیکد محتوای کاربر در زیرمجموعهٔ اول")
+    parser.add_argument("--keep-hinting", action="store_true", help="نگه داشتن دستورهای hinting")
+    parser.add_argument("--check", action="store_true", help="فقط بررسی به‌روز بودن زیرمجموعه‌ها")
+    args = parser.parse_args()
+
+    ui = ui_characters(SOURCES)
+    user_range = parse_unicode_range(args.range)
+    if args.check:
+        stale = [stem.name for stem in FONTS if is_stale(stem, ui, user_range)]
+        for name in stale:
+            print(f"{name}: subsets are stale; run python -m tools.subset_fonts")
+        sys.exit(1 if stale else 0)
+    for stem in FONTS:
+        report(stem, build(stem, ui, user_range, args.keep_hinting), ui)
+
+
+if __name__ == "__main__":
+    main()